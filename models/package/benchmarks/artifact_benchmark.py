@@ -0,0 +1,77 @@
+import glob
+import os
+import sys
+import tempfile
+import time
+import joblib
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.data_loader import load_excel_data
+from functions.model_artifacts import CODECS, load_artifact, save_artifact
+
+DEFAULT_DATA = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data', 'BASE DE DATOS PCC_cleaned.xlsx')
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+DEFAULT_PIPELINES = sorted(glob.glob(os.path.join(MODELS_DIR, 'regressions', 'results', 'reg*', '*_pipeline.joblib')) +
+                           glob.glob(os.path.join(MODELS_DIR, 'classifier', 'results', 'classf2', '*_pipeline.joblib')))
+DEFAULT_CODECS = [codec for codec in ("zlib", "lzma", "zstd", "lz4") if codec in CODECS]
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def _predictions(model, X):
+    pipeline = model["pipeline"] if isinstance(model, dict) else model
+    method = getattr(pipeline, "predict_proba", None) or pipeline.predict
+    return np.asarray(method(X), dtype=np.float64)
+
+
+def benchmark_artifact(pipeline_path: str, df, codecs=DEFAULT_CODECS, level: int = 3, n_sample: int = 2000):
+    """
+    Compara tamaño y tiempos de guardado / carga del .joblib actual contra el artefacto versionado
+    con cada códec, y verifica que las predicciones del modelo cargado coincidan.
+
+    Retorna:
+    - lista de dicts (una fila por formato) con size_kb, save_ms, load_ms y las rutas convertidas a float32
+    """
+    model = joblib.load(pipeline_path)
+    pipeline = model["pipeline"] if isinstance(model, dict) else model
+    features = list(pipeline.named_steps["preprocessor"].features)
+    X_sample = df[features].sample(min(n_sample, len(df)), random_state=0)
+    expected = _predictions(model, X_sample)
+    name = os.path.basename(pipeline_path).replace('_pipeline.joblib', '')
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.joblib")
+        _, save_ms = _timed(joblib.dump, model, path)
+        _, load_ms = _timed(joblib.load, path)
+        results.append({"format": "joblib", "size_kb": os.path.getsize(path) / 1024, "save_ms": save_ms,
+                        "load_ms": load_ms, "float32": []})
+
+        for codec in codecs:
+            path = os.path.join(tmp, f"model_{codec}.cadm")
+            manifest, save_ms = _timed(save_artifact, {name: model}, path, codec=codec, level=level, X_sample=X_sample)
+            loaded, load_ms = _timed(load_artifact, path, name)
+            if not np.allclose(_predictions(loaded, X_sample), expected, rtol=1e-5, atol=1e-6):
+                raise AssertionError(f"Predictions changed after saving {name} with {codec}.")
+            results.append({"format": f"cadm/{codec}", "size_kb": os.path.getsize(path) / 1024, "save_ms": save_ms,
+                            "load_ms": load_ms, "float32": manifest["models"][name]["float32"]})
+
+    print(f"\n{os.path.relpath(pipeline_path, MODELS_DIR)}")
+    print(f"{'formato':<14}{'KB':>10}{'guardar ms':>12}{'cargar ms':>11}  float32")
+    for row in results:
+        print(f"{row['format']:<14}{row['size_kb']:>10.1f}{row['save_ms']:>12.1f}{row['load_ms']:>11.1f}  "
+              f"{', '.join(row['float32']) or '-'}")
+    return results
+
+
+if __name__ == "__main__":
+    pipeline_paths = sys.argv[1:] or DEFAULT_PIPELINES
+    df = load_excel_data(DEFAULT_DATA)
+    for pipeline_path in pipeline_paths:
+        benchmark_artifact(pipeline_path, df)
@@ -0,0 +1,86 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.linear_model import Ridge
+from sklearn.metrics import root_mean_squared_error
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.data_preparation import prepare_regression_data
+from functions.encoding import matrix_nbytes
+from training_benchmark import REGRESSION_FEATURES, generate_synthetic_data
+
+# Con referencia (columna de alta cardinalidad) el one-hot denso sería inviable
+FEATURES = {**REGRESSION_FEATURES, 'referencia': 'categorical'}
+
+CONFIGS = [
+    ("ordinal", 'ordinal', None),
+    ("onehot", 'onehot', None),
+    ("onehot min_freq=20", 'onehot', {'min_frequency': 20}),
+    ("hashing 512", 'hashing', {'n_hash_features': 512}),
+    ("target (fuera de fold)", 'target', None),
+    ("onehot + target ref.", {'referencia': 'target', 'usuario': 'target'}, None),
+]
+
+
+def _measure(func, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def benchmark_encodings(n_rows: int = 200_000, dtype=np.float64, random_state: int = 42):
+    """
+    Compara las codificaciones de FeatureEncoder contra la ordinal: memoria de X_train (CSR vs
+    denso), pico de memoria y tiempo de prepare_regression_data, tiempo de ajuste de Ridge y RMSE
+    en test (Ridge es el caso que el orden ficticio de OrdinalEncoder perjudica).
+
+    Retorna:
+    - lista de dicts (una fila por configuración)
+    """
+    df = generate_synthetic_data(n_rows, random_state)
+    rows = []
+    for label, encoding, params in CONFIGS:
+        (X_train, X_test, y_train, y_test, encoder, _), prep_s, prep_peak = _measure(
+            prepare_regression_data, df, FEATURES, 'duracion_min', dtype=dtype, encoding=encoding,
+            encoding_params=params)
+        start = time.perf_counter()
+        model = Ridge(alpha=1.0).fit(X_train, y_train)
+        fit_s = time.perf_counter() - start
+        rows.append({
+            "encoding": label,
+            "columns": X_train.shape[1],
+            "x_train_mb": matrix_nbytes(X_train) / 2**20,
+            "dense_mb": X_train.shape[0] * X_train.shape[1] * np.dtype(dtype).itemsize / 2**20,
+            "prepare_s": prep_s,
+            "prepare_peak_mb": prep_peak,
+            "fit_s": fit_s,
+            "rmse_test": root_mean_squared_error(y_test, model.predict(X_test)),
+        })
+
+    print(f"Filas: {n_rows} ({np.dtype(dtype).name}), modelo: Ridge")
+    print(f"{'codificación':<24}{'columnas':>9}{'X MB':>9}{'denso MB':>10}{'prep s':>8}{'pico MB':>9}"
+          f"{'fit s':>8}{'RMSE test':>11}")
+    for row in rows:
+        print(f"{row['encoding']:<24}{row['columns']:>9}{row['x_train_mb']:>9.1f}{row['dense_mb']:>10.1f}"
+              f"{row['prepare_s']:>8.2f}{row['prepare_peak_mb']:>9.1f}{row['fit_s']:>8.2f}{row['rmse_test']:>11.2f}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de codificaciones (ordinal vs one-hot / hashing / target).")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--float32", action="store_true")
+    args = parser.parse_args()
+    benchmark_encodings(args.rows, np.float32 if args.float32 else np.float64)
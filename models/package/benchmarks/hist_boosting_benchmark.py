@@ -0,0 +1,80 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import root_mean_squared_error
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.data_preparation import prepare_regression_data
+from functions.hist_boosting import FeatureBinner, make_hist_gradient_boosting
+from functions.model_evaluation import evaluate_regression_models
+from training_benchmark import REGRESSION_FEATURES, generate_synthetic_data
+
+HIST_GRID = {'learning_rate': [0.05, 0.1], 'max_leaf_nodes': [31, 63]}
+
+
+def _timed_fit(model, X_train, y_train, X_test, y_test):
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    seconds = time.perf_counter() - start
+    return seconds, root_mean_squared_error(y_test, model.predict(X_test))
+
+
+def _timed_search(models, X_train, y_train, n_jobs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        evaluate_regression_models(models, X_train, y_train, cv=3, n_jobs=n_jobs)
+    return time.perf_counter() - start
+
+
+def benchmark_hist_boosting(n_rows: int = 200_000, n_jobs: int = -1, random_state: int = 42):
+    """
+    Compara GradientBoosting y RandomForest (códigos ordinales) contra HistGradientBoosting con
+    categóricas nativas y early stopping: tiempo de ajuste y RMSE en test, y tiempo de la búsqueda
+    de evaluate_regression_models con X original o binned una sola vez (FeatureBinner).
+
+    Retorna:
+    - dict {"fits": [...], "search": {...}}
+    """
+    df = generate_synthetic_data(n_rows, random_state)
+    with contextlib.redirect_stdout(io.StringIO()):
+        X_train, X_test, y_train, y_test, encoder, _ = prepare_regression_data(df, REGRESSION_FEATURES, 'duracion_min')
+
+    binner = FeatureBinner(REGRESSION_FEATURES)
+    X_train_binned = binner.fit_transform(X_train)
+    X_test_binned = binner.transform(X_test)
+
+    fits = []
+    for label, model, train, test in [
+        ("GradientBoosting", GradientBoostingRegressor(random_state=random_state), X_train, X_test),
+        ("RandomForest", RandomForestRegressor(n_estimators=100, n_jobs=n_jobs, random_state=random_state), X_train, X_test),
+        ("HistGB nativo", make_hist_gradient_boosting(REGRESSION_FEATURES, encoder), X_train, X_test),
+        ("HistGB nativo binned", make_hist_gradient_boosting(REGRESSION_FEATURES, encoder), X_train_binned, X_test_binned),
+    ]:
+        seconds, rmse = _timed_fit(model, train, y_train, test, y_test)
+        fits.append({"model": label, "fit_s": seconds, "rmse_test": rmse, "n_iter": getattr(model, "n_iter_", None)})
+
+    grid = {'HistGradientBoosting': {'model': make_hist_gradient_boosting(REGRESSION_FEATURES, encoder), 'params': HIST_GRID}}
+    search = {"original": _timed_search(grid, X_train, y_train, n_jobs),
+              "binned": _timed_search(grid, X_train_binned, y_train, n_jobs)}
+
+    print(f"Filas: {n_rows}")
+    print(f"{'modelo':<24}{'ajuste s':>10}{'RMSE test':>11}{'iteraciones':>13}")
+    for row in fits:
+        print(f"{row['model']:<24}{row['fit_s']:>10.2f}{row['rmse_test']:>11.2f}{row['n_iter'] or '-':>13}")
+    print(f"Búsqueda HistGB ({len(HIST_GRID['learning_rate']) * len(HIST_GRID['max_leaf_nodes'])} candidatos x 3 folds): "
+          f"X original {search['original']:.1f} s, X binned {search['binned']:.1f} s")
+    return {"fits": fits, "search": search}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de HistGradientBoosting contra los ensambles de los notebooks.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+    benchmark_hist_boosting(args.rows, args.n_jobs)
@@ -0,0 +1,79 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.data_preparation import prepare_regression_data
+from training_benchmark import REGRESSION_FEATURES, generate_synthetic_data
+
+
+def copying_prepare_regression_data(df, feature_types: dict, target_column: str, test_size: float = 0.2, random_state: int = 42):
+    """
+    Referencia con las copias de la versión anterior de prepare_regression_data
+    (df.copy(), selección .copy(), train_test_split sobre DataFrames y codificación en el lugar).
+    """
+    df_copy = df.copy()
+    categorical_features = [feat for feat, ftype in feature_types.items() if ftype == 'categorical']
+    numeric_features = [feat for feat, ftype in feature_types.items() if ftype == 'numeric' and feat != target_column]
+    X = df_copy[list(feature_types.keys())].copy()
+    y = df_copy[target_column].copy()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
+    X_train[categorical_features] = encoder.fit_transform(X_train[categorical_features])
+    X_test[categorical_features] = encoder.transform(X_test[categorical_features])
+    scaler = StandardScaler()
+    X_train[numeric_features] = scaler.fit_transform(X_train[numeric_features])
+    X_test[numeric_features] = scaler.transform(X_test[numeric_features])
+    return X_train, X_test, y_train, y_test, encoder, scaler
+
+
+def _peak_memory(func, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def benchmark_preparation(n_rows: int = 1_000_000, random_state: int = 42):
+    """
+    Compara el pico de memoria (tracemalloc) de prepare_regression_data contra la versión con copias
+    y verifica que ambas produzcan los mismos datos.
+    """
+    df = generate_synthetic_data(n_rows, random_state)
+    dataset_mb = df.memory_usage(deep=True).sum() / 2**20
+
+    reference, ref_seconds, ref_peak = _peak_memory(copying_prepare_regression_data, df, REGRESSION_FEATURES, 'duracion_min')
+    lean, lean_seconds, lean_peak = _peak_memory(prepare_regression_data, df, REGRESSION_FEATURES, 'duracion_min')
+    lean32, lean32_seconds, lean32_peak = _peak_memory(prepare_regression_data, df, REGRESSION_FEATURES, 'duracion_min', dtype=np.float32)
+
+    for expected, actual in zip(reference[:4], lean[:4]):
+        assert expected.index.equals(actual.index)
+        np.testing.assert_array_equal(np.asarray(expected, dtype=float), np.asarray(actual, dtype=float))
+
+    print(f"Filas: {n_rows} (dataset en memoria: {dataset_mb:.1f} MB)")
+    print(f"{'':<28}{'pico MB':>10}{'x dataset':>12}{'segundos':>10}")
+    for label, peak, seconds in [("con copias", ref_peak, ref_seconds), ("buffers float64", lean_peak, lean_seconds),
+                                 ("buffers float32", lean32_peak, lean32_seconds)]:
+        print(f"{label:<28}{peak:>10.1f}{peak / dataset_mb:>12.2f}{seconds:>10.2f}")
+    return {"n_rows": n_rows, "dataset_mb": dataset_mb, "copying_peak_mb": ref_peak,
+            "lean_peak_mb": lean_peak, "lean_float32_peak_mb": lean32_peak}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de memoria de prepare_regression_data.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    benchmark_preparation(args.rows)
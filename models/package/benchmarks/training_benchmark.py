@@ -0,0 +1,271 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.data_loader import load_csv_chunks
+from functions.data_preparation import prepare_classification_data, prepare_regression_data, select_features_ols
+from functions.model_evaluation import evaluate_regression_models
+from functions.model_transformer import CustomPreprocessor
+from functions.save_models import save_pipeline_models
+
+STAGES = ["load", "prepare_regression", "prepare_classification", "feature_selection", "grid_search", "save", "inference"]
+
+REGRESSION_FEATURES = {
+    'maquina': 'categorical',
+    'seccion': 'categorical',
+    'proceso': 'categorical',
+    'usuario': 'categorical',
+    'fabricadas': 'numeric',
+    'turno': 'categorical',
+}
+
+CLASSIFICATION_FEATURES = {
+    'fabricadas': 'numeric',
+    'referencia': 'categorical',
+    'maquina': 'categorical',
+    'proceso': 'categorical',
+    'estado': 'categorical',
+}
+
+
+def benchmark_models():
+    """
+    Grilla pequeña y representativa de los notebooks (lineal, regularizado y ensamble).
+    """
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.linear_model import LinearRegression, Ridge
+    return {
+        'LinearRegression': {'model': LinearRegression(), 'params': {}},
+        'Ridge': {'model': Ridge(), 'params': {'alpha': [0.1, 1.0]}},
+        'GradientBoosting': {'model': GradientBoostingRegressor(random_state=42), 'params': {'n_estimators': [20], 'max_depth': [3]}},
+    }
+
+
+def generate_synthetic_data(n_rows: int, random_state: int = 42) -> pd.DataFrame:
+    """
+    Genera registros sintéticos con el esquema de producción (pedido, maquina, seccion, proceso,
+    usuario, fabricadas, duracion_min, turno, ...). La duración depende de la máquina, el turno y
+    las unidades fabricadas para que los modelos tengan señal que aprender.
+
+    Parámetros:
+    - n_rows: número de filas (10k a 10M)
+    - random_state: semilla
+
+    Retorna:
+    - DataFrame con las columnas del Excel limpio
+    """
+    rng = np.random.default_rng(random_state)
+
+    n_machines = 40
+    sections = np.array(['Prensa', 'Troqueladora', 'Pegadora de Cajas', 'Guillotina', 'Corte', 'Estampado'])
+    processes = np.array(['Imprimir', 'Barnizar', 'Troquelar', 'Pegar', 'Cortar', 'Estampar', 'Empacar'])
+    machines = np.array([f"MAQ{i:03d} - Maquina {i}" for i in range(n_machines)])
+    machine_section = rng.integers(0, len(sections), n_machines)
+    machine_process = rng.integers(0, len(processes), n_machines)
+    machine_speed = rng.uniform(20, 200, n_machines)  # piezas por minuto
+    users = np.array([f"usuario{i:03d}" for i in range(120)])
+    references = np.array([f"PT-{i:010d}" for i in range(3000)])
+    shifts = np.array(['Mañana', 'Tarde', 'Noche'])
+    states = np.array(['play', 'stop'])
+
+    machine = rng.integers(0, n_machines, n_rows)
+    shift = rng.integers(0, len(shifts), n_rows)
+    state = (rng.random(n_rows) < 0.3).astype(np.int8)
+    fabricadas = np.where(state == 1, 0, rng.lognormal(7, 1.2, n_rows).round())
+    shift_factor = np.array([1.0, 1.1, 1.3])[shift]
+    duracion_min = np.where(
+        state == 1,
+        rng.exponential(15, n_rows),
+        fabricadas / machine_speed[machine] * shift_factor + rng.exponential(10, n_rows),
+    ).round(2)
+    start = pd.Timestamp('2023-08-01') + pd.to_timedelta(np.sort(rng.integers(0, 365 * 24 * 3600, n_rows)), unit='s')
+
+    df = pd.DataFrame({
+        'pedido': rng.integers(20000, 30000, n_rows),
+        'op': rng.integers(5000, 10000, n_rows),
+        'referencia': references[rng.integers(0, len(references), n_rows)],
+        'maquina': machines[machine],
+        'seccion': sections[machine_section[machine]],
+        'proceso': processes[machine_process[machine]],
+        'usuario': users[rng.integers(0, len(users), n_rows)],
+        'estado': states[state],
+        'fabricadas': fabricadas,
+        'fecha_inicio': start,
+        'fecha_fin': start + pd.to_timedelta(duracion_min, unit='m'),
+        'duracion_min': duracion_min,
+        'hora_inicio': start.hour,
+        'turno': shifts[shift],
+    })
+    return df
+
+
+@contextlib.contextmanager
+def _measure(results: dict, stage: str, quiet: bool = True):
+    """
+    Mide tiempo de pared y pico de memoria (tracemalloc) de una etapa.
+    Los procesos hijos del pool de joblib no se incluyen en el pico.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with _silenced(quiet):
+            yield
+    finally:
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[stage] = {"seconds": round(seconds, 4), "peak_mb": round(peak / 2**20, 2)}
+
+
+def _silenced(quiet: bool = True):
+    return contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+
+
+def _environment():
+    import sklearn
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmark(n_rows: int, stages: list = None, n_jobs: int = -1, max_search_rows: int = None,
+                  random_state: int = 42, quiet: bool = True) -> dict:
+    """
+    Ejecuta el flujo de entrenamiento completo sobre datos sintéticos y mide cada etapa por separado:
+    load, prepare_regression, prepare_classification, feature_selection, grid_search, save e inference.
+
+    Parámetros:
+    - n_rows: filas sintéticas
+    - stages: etapas a ejecutar (por defecto todas; las que dependen de otra la ejecutan sin medirla)
+    - n_jobs: procesos para la búsqueda de modelos
+    - max_search_rows: submuestra de entrenamiento para feature_selection y grid_search (None = todas)
+
+    Retorna:
+    - dict con n_rows y {etapa: {"seconds", "peak_mb"}}
+    """
+    stages = STAGES if stages is None else stages
+    timings = {}
+    # Las etapas no pedidas igual se ejecutan si otra depende de ellas, pero sin medirlas
+    measure = lambda stage: _measure(timings, stage, quiet) if stage in stages else _silenced(quiet)
+
+    df = generate_synthetic_data(n_rows, random_state)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'production.csv')
+        df.to_csv(csv_path, index=False)
+        del df
+
+        with measure("load"):
+            df = load_csv_chunks(csv_path)
+
+        with measure("prepare_regression"):
+            X_train, X_test, y_train, y_test, encoder, scaler = prepare_regression_data(df, REGRESSION_FEATURES, 'duracion_min')
+
+        if "prepare_classification" in stages:
+            with measure("prepare_classification"):
+                prepare_classification_data(df, CLASSIFICATION_FEATURES, 'estado')
+
+        if max_search_rows is not None and len(X_train) > max_search_rows:
+            X_search, y_search = X_train.iloc[:max_search_rows], y_train.iloc[:max_search_rows]
+        else:
+            X_search, y_search = X_train, y_train
+
+        if "feature_selection" in stages:
+            with measure("feature_selection"):
+                select_features_ols(X_search, y_search, return_table=True)
+
+        best_models = None
+        if any(stage in stages for stage in ("grid_search", "save", "inference")):
+            with measure("grid_search"):
+                _, _, _, best_models = evaluate_regression_models(benchmark_models(), X_search, y_search, n_jobs=n_jobs)
+
+        if any(stage in stages for stage in ("save", "inference")):
+            preprocessor = CustomPreprocessor(encoder, scaler, REGRESSION_FEATURES)
+            model_dir = os.path.join(tmp_dir, 'pipelines')
+            with measure("save"):
+                save_pipeline_models(preprocessor, best_models, model_dir)
+
+        if "inference" in stages:
+            X_raw = df.loc[X_test.index, list(REGRESSION_FEATURES)]
+            with measure("inference"):
+                pipeline = joblib.load(os.path.join(model_dir, 'GradientBoosting_pipeline.joblib'))
+                pipeline.predict(X_raw)
+
+    return {"n_rows": n_rows, "stages": timings}
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.2) -> list:
+    """
+    Compara dos resultados de run_benchmarks y lista las etapas que empeoraron más que `threshold`
+    (fracción) en tiempo o en pico de memoria.
+    """
+    regressions = []
+    baseline_runs = {run["n_rows"]: run["stages"] for run in baseline["runs"]}
+    for run in current["runs"]:
+        for stage, metrics in run["stages"].items():
+            before = baseline_runs.get(run["n_rows"], {}).get(stage)
+            if before is None:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                if before[metric] > 0 and metrics[metric] > before[metric] * (1 + threshold):
+                    regressions.append({"n_rows": run["n_rows"], "stage": stage, "metric": metric,
+                                        "baseline": before[metric], "current": metrics[metric]})
+    return regressions
+
+
+def run_benchmarks(scales: list, **kwargs) -> dict:
+    runs = []
+    for n_rows in scales:
+        print(f"Benchmark: {n_rows} filas")
+        run = run_benchmark(n_rows, **kwargs)
+        for stage, metrics in run["stages"].items():
+            print(f"  {stage:<24}{metrics['seconds']:>10.3f} s{metrics['peak_mb']:>12.1f} MB")
+        runs.append(run)
+    return {"environment": _environment(), "runs": runs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de entrenamiento del paquete de modelos.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=None)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--max-search-rows", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Archivo JSON con los resultados")
+    parser.add_argument("--baseline", default=None, help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.rows, stages=args.stages, n_jobs=args.n_jobs, max_search_rows=args.max_search_rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_results(json.load(f), results, args.threshold)
+        for regression in regressions:
+            print(f"Regresión: {regression}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import joblib
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.data_loader import load_excel_data
+
+DEFAULT_DATA = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data', 'BASE DE DATOS PCC_cleaned.xlsx')
+DEFAULT_PIPELINE = os.path.join(os.path.dirname(__file__), '..', '..', 'regressions', 'results', 'reg1', 'GradientBoosting_pipeline.joblib')
+
+
+def benchmark_transform(preprocessor, df, n_rows: int = 1000):
+    """
+    Compara la latencia por fila de CustomPreprocessor.transform (camino pandas)
+    contra transform_records (modo compilado) y verifica que ambos resultados sean idénticos.
+
+    Parámetros:
+    - preprocessor: CustomPreprocessor ya entrenado
+    - df: DataFrame con las columnas de preprocessor.features
+    - n_rows: número de peticiones de una fila a simular
+
+    Retorna:
+    - dict con la latencia media por fila (µs) de cada camino y el speedup
+    """
+    rows = df[list(preprocessor.features.keys())].head(n_rows).to_dict('records')
+
+    # Salida idéntica bit a bit sobre todas las filas
+    expected = preprocessor.transform(df.head(n_rows))
+    compiled = preprocessor.transform_records(rows)
+    if not np.array_equal(expected, compiled, equal_nan=True):
+        raise AssertionError("Compiled transform differs from the pandas transform.")
+
+    start = time.perf_counter()
+    for row in rows:
+        preprocessor.transform([row])
+    pandas_us = (time.perf_counter() - start) / len(rows) * 1e6
+
+    start = time.perf_counter()
+    for row in rows:
+        preprocessor.transform_records(row)
+    compiled_us = (time.perf_counter() - start) / len(rows) * 1e6
+
+    results = {
+        "pandas_us_per_row": pandas_us,
+        "compiled_us_per_row": compiled_us,
+        "speedup": pandas_us / compiled_us,
+    }
+    print(f"pandas:   {pandas_us:10.1f} µs/fila")
+    print(f"compiled: {compiled_us:10.1f} µs/fila")
+    print(f"speedup:  {results['speedup']:10.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    pipeline_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PIPELINE
+    pipeline = joblib.load(pipeline_path)
+    if isinstance(pipeline, dict):
+        pipeline = pipeline["pipeline"]
+    benchmark_transform(pipeline.named_steps["preprocessor"], load_excel_data(DEFAULT_DATA))
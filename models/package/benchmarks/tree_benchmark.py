@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import joblib
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.data_loader import load_excel_data
+from functions.tree_compiler import compile_model
+
+DEFAULT_DATA = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data', 'BASE DE DATOS PCC_cleaned.xlsx')
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+DEFAULT_PIPELINES = [
+    os.path.join(MODELS_DIR, 'regressions', 'results', 'reg1', 'GradientBoosting_pipeline.joblib'),
+    os.path.join(MODELS_DIR, 'regressions', 'results', 'reg2', 'GradientBoosting_pipeline.joblib'),
+    os.path.join(MODELS_DIR, 'classifier', 'results', 'classf2', 'RandomForest_pipeline.joblib'),
+    os.path.join(MODELS_DIR, 'classifier', 'results', 'classf2', 'GradientBoosting_pipeline.joblib'),
+]
+BATCH_SIZES = (1, 100, 10_000)
+
+
+def _latency_ms(func, X, repeats: int):
+    func(X)  # calentamiento
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(X)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def benchmark_trees(pipeline, df, batch_sizes=BATCH_SIZES, rtol: float = 1e-9, atol: float = 1e-9):
+    """
+    Compara la latencia de predict (y predict_proba en clasificación) del modelo de sklearn contra
+    CompiledTreeEnsemble sobre los mismos datos ya transformados por CustomPreprocessor, y verifica
+    que ambas salidas coincidan dentro de la tolerancia.
+
+    Parámetros:
+    - pipeline: Pipeline (o dict {"pipeline", "target_encoder"}) con un modelo de árboles como último paso
+    - df: DataFrame con las columnas del preprocesador
+    - batch_sizes: tamaños de lote a medir (las filas se repiten si df es más chico)
+
+    Retorna:
+    - lista de dicts con la latencia por lote (ms) de cada camino y el speedup
+    """
+    if isinstance(pipeline, dict):
+        pipeline = pipeline["pipeline"]
+    preprocessor, model = pipeline.steps[0][1], pipeline.steps[-1][1]
+    compiled = compile_model(model)
+    is_classifier = hasattr(model, "predict_proba")
+    method = "predict_proba" if is_classifier else "predict"
+
+    X = np.asarray(preprocessor.transform(df))
+    expected, actual = getattr(model, method)(X), getattr(compiled, method)(X)
+    if not np.allclose(expected, actual, rtol=rtol, atol=atol):
+        raise AssertionError(f"Compiled {method} differs from sklearn (max diff {np.max(np.abs(expected - actual)):.3g}).")
+    if is_classifier and not np.array_equal(model.predict(X), compiled.predict(X)):
+        raise AssertionError("Compiled predict differs from sklearn.")
+
+    results = []
+    print(f"{type(model).__name__} ({method}, {len(X)} filas verificadas)")
+    print(f"{'lote':>8}{'sklearn ms':>14}{'compilado ms':>14}{'speedup':>10}")
+    for batch_size in batch_sizes:
+        batch = X[np.arange(batch_size) % len(X)]
+        repeats = max(1, 2000 // batch_size)
+        sklearn_ms = _latency_ms(getattr(model, method), batch, repeats)
+        compiled_ms = _latency_ms(getattr(compiled, method), batch, repeats)
+        results.append({"model": type(model).__name__, "batch_size": batch_size, "sklearn_ms": sklearn_ms,
+                        "compiled_ms": compiled_ms, "speedup": sklearn_ms / compiled_ms})
+        print(f"{batch_size:>8}{sklearn_ms:>14.3f}{compiled_ms:>14.3f}{sklearn_ms / compiled_ms:>9.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    pipeline_paths = sys.argv[1:] or DEFAULT_PIPELINES
+    df = load_excel_data(DEFAULT_DATA)
+    for pipeline_path in pipeline_paths:
+        print(f"\n{os.path.relpath(pipeline_path, MODELS_DIR)}")
+        benchmark_trees(joblib.load(pipeline_path), df)
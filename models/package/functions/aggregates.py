@@ -0,0 +1,277 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Columnas del esquema original (Excel / tabla raw) -> esquema limpio
+RAW_COLUMNS = {'Fecha inicio': 'fecha_inicio', 'Sección': 'seccion', 'Maquina': 'maquina', 'Usuario': 'usuario',
+               'Estado': 'estado', 'Duración [min]': 'duracion_min', 'Fabricadas': 'fabricadas', 'Turno': 'turno'}
+
+# Grano de la tabla base: todo rollup se obtiene sumando sus medidas
+KEY_COLUMNS = ['dia', 'turno', 'seccion', 'maquina', 'usuario']
+MEASURE_COLUMNS = ['play_min', 'stop_min', 'registros_play', 'registros_stop', 'fabricadas']
+
+# Turnos por hora de inicio y minutos que cubre cada uno en un día calendario
+SHIFT_HOURS = {'Mañana': range(6, 12), 'Tarde': range(12, 21), 'Noche': list(range(0, 6)) + list(range(21, 24))}
+SHIFT_MINUTES = {shift: len(hours) * 60 for shift, hours in SHIFT_HOURS.items()}
+MINUTES_PER_DAY = 1440
+
+# Rollups que se materializan al guardar: {nombre_archivo: llaves}
+ROLLUPS = {
+    'dia_maquina': ['dia', 'seccion', 'maquina'],
+    'dia_turno_maquina': ['dia', 'turno', 'seccion', 'maquina'],
+    'dia_seccion': ['dia', 'seccion'],
+    'dia_usuario': ['dia', 'usuario'],
+    'turno_usuario': ['turno', 'usuario'],
+    'maquina': ['seccion', 'maquina'],
+}
+
+
+def shift_from_hour(hours) -> pd.Series:
+    """
+    Turno (Mañana / Tarde / Noche) a partir de la hora de inicio, con la misma división que el dataset limpio.
+    """
+    lookup = np.empty(24, dtype=object)
+    for shift, shift_hours in SHIFT_HOURS.items():
+        lookup[list(shift_hours)] = shift
+    hours = pd.Series(hours)
+    return pd.Series(lookup[hours.to_numpy(dtype=int)], index=hours.index)
+
+
+def summarize_records(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Resume registros PLAY/STOP en la tabla base (día, turno, sección, máquina, usuario).
+
+    Acepta el esquema limpio (fecha_inicio, estado, duracion_min, ...) o el original
+    ('Fecha inicio', 'Estado', 'Duración [min]', ...). Cada registro se asigna al día y turno de
+    su fecha de inicio; si no hay columna turno se deriva de la hora.
+
+    Retorna:
+    - DataFrame con KEY_COLUMNS + play_min, stop_min, registros_play, registros_stop, fabricadas
+    """
+    df = df.rename(columns={k: v for k, v in RAW_COLUMNS.items() if k in df.columns})
+    start = pd.to_datetime(df['fecha_inicio'])
+    estado = df['estado'].astype(str).str.lower()
+    is_play, is_stop = (estado == 'play').to_numpy(), (estado == 'stop').to_numpy()
+    minutes = pd.to_numeric(df['duracion_min'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    fabricadas = pd.to_numeric(df['fabricadas'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    turno = df['turno'] if 'turno' in df.columns else shift_from_hour(start.dt.hour)
+
+    records = pd.DataFrame({
+        'dia': start.dt.normalize().to_numpy(),
+        'turno': np.asarray(turno, dtype=object),
+        'seccion': np.asarray(df['seccion'], dtype=object),
+        'maquina': np.asarray(df['maquina'], dtype=object),
+        'usuario': np.asarray(df['usuario'], dtype=object),
+        'play_min': np.where(is_play, minutes, 0.0),
+        'stop_min': np.where(is_stop, minutes, 0.0),
+        'registros_play': is_play.astype(np.int64),
+        'registros_stop': is_stop.astype(np.int64),
+        'fabricadas': fabricadas,
+    })
+    return records.groupby(KEY_COLUMNS, sort=False, dropna=False, as_index=False)[MEASURE_COLUMNS].sum()
+
+
+def _compact(base: pd.DataFrame) -> pd.DataFrame:
+    # Llaves de texto como categóricas y orden estable: archivos columnar más chicos
+    base = base.sort_values(KEY_COLUMNS, ignore_index=True)
+    for col in KEY_COLUMNS[1:]:
+        base[col] = base[col].astype('category')
+    for col in ['registros_play', 'registros_stop']:
+        base[col] = base[col].astype(np.int32)
+    return base
+
+
+def add_metrics(table: pd.DataFrame, keys: list, base: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega a un rollup las métricas derivadas (no sumables):
+    - ocupacion_pct: minutos PLAY / minutos disponibles de las máquinas del grupo x 100. Los minutos
+      disponibles son 1440 por cada (día, máquina) con registros, o los minutos del turno si el
+      rollup es por turno (igual que la ocupación diaria del EDA: duración PLAY / 1440).
+    - play_pct: minutos PLAY / (PLAY + STOP) x 100
+    - unidades_por_min: fabricadas / minutos PLAY
+    """
+    slot_keys = list(dict.fromkeys(keys + ['dia', 'maquina'] + (['turno'] if 'turno' in keys else [])))
+    slots = base[slot_keys].drop_duplicates()
+    if 'turno' in keys:
+        slot_minutes = slots['turno'].astype(object).map(SHIFT_MINUTES).fillna(0).to_numpy(dtype=np.float64)
+    else:
+        slot_minutes = np.full(len(slots), float(MINUTES_PER_DAY))
+    available = slots.assign(minutos_disponibles=slot_minutes).groupby(keys, observed=True, dropna=False,
+                                                                          as_index=False)['minutos_disponibles'].sum()
+    table = table.merge(available, on=keys, how='left')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['ocupacion_pct'] = table['play_min'] / table['minutos_disponibles'] * 100
+        table['play_pct'] = table['play_min'] / (table['play_min'] + table['stop_min']) * 100
+        table['unidades_por_min'] = (table['fabricadas'] / table['play_min']).where(table['play_min'] > 0)
+    return table
+
+
+class ProductionRollups:
+    """
+    Agregados materializados de ocupación y productividad.
+
+    La tabla base guarda solo medidas sumables (minutos PLAY/STOP, registros, fabricadas) por día,
+    turno, sección, máquina y usuario, así que los registros nuevos se incorporan sumando su
+    resumen al acumulado, sin volver a leer los logs. Los rollups (por día y máquina, por usuario,
+    ...) y sus métricas se calculan desde la base y se guardan como Parquet.
+
+    Para no contar dos veces un registro reenviado se guarda el hash de cada registro agregado
+    (record_keys, 8 bytes por registro) en lugar de un watermark de fecha: los registros que
+    llegan tarde o comparten la fecha del último registro se agregan igual.
+    """
+
+    def __init__(self, base: pd.DataFrame = None, watermark=None, record_keys=None, key_columns: list = None):
+        self.base = _compact(base) if base is not None else _compact(pd.DataFrame(columns=KEY_COLUMNS + MEASURE_COLUMNS))
+        self.watermark = pd.Timestamp(watermark) if watermark is not None else None
+        self.key_columns = key_columns
+        if record_keys is None and base is not None and len(base):
+            # Agregados guardados antes de record_keys: solo se puede deduplicar por el watermark
+            self.record_keys = None
+        else:
+            self.record_keys = np.unique(np.asarray(record_keys if record_keys is not None else [], dtype=np.uint64))
+
+    def _record_keys(self, df: pd.DataFrame, columns: list = None) -> np.ndarray:
+        # Hash por registro sobre columns (por defecto todas las columnas de df, p.ej. op y pedido
+        # distinguen registros de la misma máquina y hora), con tipos normalizados para que no
+        # dependa de cómo se leyó el archivo: fechas como datetime, números como float y el resto como texto
+        columns = sorted(columns or df.columns, key=str)
+        keys = {}
+        for col in columns:
+            values = df[col]
+            if col == 'fecha_inicio' or pd.api.types.is_datetime64_any_dtype(values):
+                keys[col] = pd.to_datetime(values)
+            elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                keys[col] = values.astype(np.float64)
+            else:
+                keys[col] = values.astype(str)
+        return pd.util.hash_pandas_object(pd.DataFrame(keys), index=False).to_numpy(dtype=np.uint64)
+
+    def update(self, df: pd.DataFrame, skip_seen: bool = True):
+        """
+        Incorpora registros nuevos.
+
+        Parámetros:
+        - df: registros con el esquema limpio u original
+        - skip_seen: ignora los registros ya agregados en una actualización anterior (según
+          key_columns, por defecto todas las columnas) y las filas idénticas repetidas dentro de
+          df, para poder reenviar ventanas solapadas sin contar doble. Los registros atrasados
+          (fecha anterior al watermark) que no se habían visto sí se agregan.
+
+        Retorna:
+        - self
+        """
+        df = df.rename(columns={k: v for k, v in RAW_COLUMNS.items() if k in df.columns})
+        keys = self._record_keys(df, self.key_columns)
+        if skip_seen:
+            if self.record_keys is None and self.watermark is not None:
+                keep = (pd.to_datetime(df['fecha_inicio']) > self.watermark).to_numpy()
+            elif self.record_keys is not None:
+                # Dentro de df solo se descartan las filas idénticas en todas las columnas
+                rows = keys if not self.key_columns else self._record_keys(df)
+                keep = ~np.isin(keys, self.record_keys) & ~pd.Index(rows).duplicated()
+            else:
+                keep = np.ones(len(df), dtype=bool)
+            df, keys = df[keep], keys[keep]
+        if df.empty:
+            return self
+
+        partial = summarize_records(df)
+        if len(self.base):
+            combined = pd.concat([self.base.astype({col: object for col in KEY_COLUMNS[1:]}), partial], ignore_index=True)
+            partial = combined.groupby(KEY_COLUMNS, sort=False, dropna=False, as_index=False)[MEASURE_COLUMNS].sum()
+        self.base = _compact(partial)
+        if self.record_keys is not None:
+            self.record_keys = np.union1d(self.record_keys, keys)
+        latest = pd.to_datetime(df['fecha_inicio']).max()
+        self.watermark = latest if self.watermark is None else max(self.watermark, latest)
+        return self
+
+    def rollup(self, keys: list, start=None, end=None) -> pd.DataFrame:
+        """
+        Agrega la tabla base por keys (subconjunto de KEY_COLUMNS) y calcula las métricas.
+
+        Parámetros:
+        - keys: p.ej. ['dia', 'seccion', 'maquina'] o ['turno', 'usuario']
+        - start, end: rango de días (inclusive) opcional
+        """
+        unknown = set(keys) - set(KEY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown rollup keys: {sorted(unknown)}. Valid keys: {KEY_COLUMNS}.")
+        base = self.base
+        if start is not None:
+            base = base[base['dia'] >= pd.Timestamp(start)]
+        if end is not None:
+            base = base[base['dia'] <= pd.Timestamp(end)]
+        table = base.groupby(keys, observed=True, dropna=False, as_index=False)[MEASURE_COLUMNS].sum()
+        return add_metrics(table, list(keys), base)
+
+    def save(self, directory: str, rollups: dict = None, compression: str = 'zstd') -> dict:
+        """
+        Escribe la tabla base y los rollups como Parquet (uno por archivo), los hashes de los
+        registros agregados (record_keys.parquet) y un manifest.json con el watermark y el número
+        de filas de cada archivo.
+
+        Retorna:
+        - manifiesto escrito
+        """
+        os.makedirs(directory, exist_ok=True)
+        rollups = ROLLUPS if rollups is None else rollups
+        files = {'base': self.base}
+        files.update({name: self.rollup(keys) for name, keys in rollups.items()})
+        for name, table in files.items():
+            table.to_parquet(os.path.join(directory, f"{name}.parquet"), index=False, compression=compression)
+        if self.record_keys is not None:
+            pd.DataFrame({'key': self.record_keys}).to_parquet(os.path.join(directory, 'record_keys.parquet'),
+                                                               index=False, compression=compression)
+
+        manifest = {
+            'updated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'watermark': self.watermark.isoformat() if self.watermark is not None else None,
+            'key_columns': self.key_columns,
+            'rollups': {name: {'keys': KEY_COLUMNS if name == 'base' else rollups[name], 'rows': len(table)}
+                        for name, table in files.items()},
+        }
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        summary = ', '.join(f"{name} ({info['rows']} filas)" for name, info in manifest['rollups'].items())
+        print(f"Rollups guardados en {directory}: {summary}")
+        return manifest
+
+    @classmethod
+    def load(cls, directory: str):
+        """
+        Retoma los agregados guardados con save (tabla base, watermark y hashes de registros).
+        """
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+        keys_path = os.path.join(directory, 'record_keys.parquet')
+        record_keys = pd.read_parquet(keys_path)['key'].to_numpy() if os.path.exists(keys_path) else None
+        return cls(pd.read_parquet(os.path.join(directory, 'base.parquet')), manifest['watermark'], record_keys,
+                   manifest.get('key_columns'))
+
+
+def update_rollups(directory: str, df: pd.DataFrame, key_columns: list = None, **save_kwargs) -> ProductionRollups:
+    """
+    Carga los agregados de directory (si existen), incorpora los registros de df y vuelve a guardar.
+    key_columns (p.ej. ['op', 'pedido', 'fecha_inicio']) identifica un registro al crear los agregados;
+    por defecto el registro completo (todas las columnas de df).
+    """
+    if os.path.exists(os.path.join(directory, 'manifest.json')):
+        rollups = ProductionRollups.load(directory)
+    else:
+        rollups = ProductionRollups(key_columns=key_columns)
+    rollups.update(df)
+    rollups.save(directory, **save_kwargs)
+    return rollups
+
+
+def read_rollup(directory: str, name: str, columns: list = None, filters=None) -> pd.DataFrame:
+    """
+    Lee un rollup guardado. filters usa la sintaxis de pyarrow (p.ej. [('seccion', '==', 'Prensa')])
+    y se aplica al leer, sin cargar el archivo completo.
+    """
+    return pd.read_parquet(os.path.join(directory, f"{name}.parquet"), columns=columns, filters=filters)
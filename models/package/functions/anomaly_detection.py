@@ -0,0 +1,263 @@
+import numpy as np
+import pandas as pd
+
+METHODS = ('percentile', 'iqr', 'mad')
+
+# Constante que vuelve la MAD comparable con la desviación estándar en datos normales
+MAD_TO_STD = 1.4826
+
+
+def _group_codes(df: pd.DataFrame, grouped_columns: list) -> np.ndarray:
+    """
+    Código entero de grupo por fila (sin copiar el DataFrame). Las filas con alguna llave nula
+    reciben -1: como en el groupby original quedan fuera de todo grupo y nunca se marcan.
+    """
+    codes = df.groupby(grouped_columns, observed=True, sort=False, dropna=True).ngroup()
+    return codes.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _thresholds_by_code(values: pd.Series, codes: np.ndarray, method: str, low_pct: float, high_pct: float, k: float):
+    """
+    Límites (lower, upper, scale) como arreglos indexados por código de grupo (las filas con
+    código -1 no participan).
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got '{method}'.")
+    valid = codes >= 0
+    values, codes = values[valid], codes[valid]
+    grouped = values.groupby(codes)
+
+    if method == 'percentile':
+        bounds = grouped.quantile([low_pct, high_pct]).unstack(level=-1)
+        lower, upper = bounds[low_pct], bounds[high_pct]
+        scale = upper - lower
+    elif method == 'iqr':
+        k = 1.5 if k is None else k
+        quartiles = grouped.quantile([0.25, 0.75]).unstack(level=-1)
+        scale = quartiles[0.75] - quartiles[0.25]
+        lower, upper = quartiles[0.25] - k * scale, quartiles[0.75] + k * scale
+    else:
+        k = 3.5 if k is None else k
+        median = grouped.median()
+        mad = (values - median.to_numpy()[codes]).abs().groupby(codes).median()
+        scale = mad * MAD_TO_STD
+        lower, upper = median - k * scale, median + k * scale
+
+    # Reindexar por si algún código no tiene valores válidos (todo NaN)
+    n_groups = codes.max() + 1 if len(codes) else 0
+    as_array = lambda s: s.reindex(range(n_groups)).to_numpy(dtype=float)
+    return as_array(lower), as_array(upper), as_array(scale)
+
+
+def group_thresholds(df: pd.DataFrame, grouped_columns: list, column: str, method: str = 'percentile',
+                     low_pct: float = 0.05, high_pct: float = 0.95, k: float = None) -> pd.DataFrame:
+    """
+    Límites de anomalía por grupo.
+
+    - percentile: [q(low_pct), q(high_pct)]
+    - iqr: [Q1 - k*IQR, Q3 + k*IQR] (k = 1.5 por defecto)
+    - mad: mediana ± k*MAD escalada (z robusto, k = 3.5 por defecto)
+
+    Parámetros:
+    - df: DataFrame con grouped_columns y column
+    - grouped_columns: columnas de agrupación
+    - column: columna numérica a evaluar
+    - method: 'percentile', 'iqr' o 'mad'
+
+    Retorna:
+    - DataFrame con grouped_columns + lower, upper y scale (escala usada para los scores)
+    """
+    codes = _group_codes(df, grouped_columns)
+    lower, upper, scale = _thresholds_by_code(df[column], codes, method, low_pct, high_pct, k)
+    in_group = np.flatnonzero(codes >= 0)
+    _, first = np.unique(codes[in_group], return_index=True)
+    keys = df[grouped_columns].iloc[in_group[first]].reset_index(drop=True)
+    return keys.assign(lower=lower, upper=upper, scale=scale)
+
+
+def anomaly_scores(df: pd.DataFrame, grouped_columns: list = ['maquina', 'turno'], column: str = 'duracion_min',
+                   method: str = 'percentile', low_pct: float = 0.05, high_pct: float = 0.95, k: float = None) -> pd.Series:
+    """
+    Score de anomalía por fila: cuánto se sale el valor de los límites de su grupo, en unidades
+    de la escala del método (rango de percentiles, IQR o MAD escalada). Es 0 dentro de los
+    límites, positivo por encima y negativo por debajo.
+
+    Los límites se calculan una vez por grupo y se llevan a las filas con el código de grupo
+    (indexación NumPy), sin merge ni copia del DataFrame.
+
+    Retorna:
+    - Series float alineada con df.index
+    """
+    codes = _group_codes(df, grouped_columns)
+    lower, upper, scale = _thresholds_by_code(df[column], codes, method, low_pct, high_pct, k)
+    # El código -1 (llave nula) cae en el NaN agregado al final: sin límites, score 0
+    lower, upper, scale = (np.append(a, np.nan)[codes] for a in (lower, upper, scale))
+
+    values = df[column].to_numpy(dtype=float)
+    excess = np.where(values > upper, values - upper, np.where(values < lower, values - lower, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Grupos sin dispersión (escala 0): cualquier desvío es infinitamente anómalo
+        scores = np.where(scale > 0, excess / scale, np.sign(excess) * np.inf)
+    scores[excess == 0] = 0.0
+    return pd.Series(scores, index=df.index, name=f"{column}_anomaly_score")
+
+
+def anomaly_mask(df: pd.DataFrame, grouped_columns: list = ['maquina', 'turno'], column: str = 'duracion_min',
+                 method: str = 'percentile', low_pct: float = 0.05, high_pct: float = 0.95, k: float = None) -> pd.Series:
+    """
+    Máscara booleana (alineada con df.index) de valores fuera de los límites de su grupo.
+    Ver anomaly_scores para los métodos disponibles.
+    """
+    scores = anomaly_scores(df, grouped_columns, column, method, low_pct, high_pct, k)
+    return (scores != 0).rename(None)
+
+
+class StreamingQuantileSketch:
+    """
+    Sketches de cuantiles por grupo (p.ej. por maquina y turno) para detectar anomalías en modo
+    incremental: cada chunk nuevo se marca contra la historia resumida, sin volver a leerla.
+
+    Cada grupo guarda un histograma con buckets logarítmicos (como DDSketch): el error relativo
+    de cualquier cuantil es del orden de relative_accuracy y la memoria es fija por grupo
+    (~1000 contadores con los valores por defecto). Los sketches se pueden combinar con merge.
+
+    Métodos soportados: 'percentile' e 'iqr' (la MAD necesita una segunda pasada sobre los datos).
+    """
+
+    def __init__(self, grouped_columns: list = ['maquina', 'turno'], duration_column_name: str = 'duracion_min',
+                 low_pct: float = 0.05, high_pct: float = 0.95, method: str = 'percentile', k: float = 1.5,
+                 relative_accuracy: float = 0.01, min_value: float = 1e-3, max_value: float = 1e6, min_count: int = 30):
+        if method not in ('percentile', 'iqr'):
+            raise ValueError("StreamingQuantileSketch supports method 'percentile' or 'iqr'.")
+        self.grouped_columns = list(grouped_columns)
+        self.duration_column_name = duration_column_name
+        self.low_pct = low_pct
+        self.high_pct = high_pct
+        self.method = method
+        self.k = k
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.min_count = min_count
+
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        # Bucket 0 acumula los valores <= min_value (p.ej. duraciones 0); el resto empieza en 1
+        self._offset = int(np.floor(np.log(min_value) / self._log_gamma)) - 1
+        self.n_buckets = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._offset + 1
+        self.groups = None  # MultiIndex con las llaves de grupo vistas
+        self.counts = np.zeros((0, self.n_buckets), dtype=np.int64)
+
+    def _buckets(self, values: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            index = np.ceil(np.log(np.clip(values, self.min_value, self.max_value)) / self._log_gamma) - self._offset
+        index[values <= self.min_value] = 0
+        return index.astype(np.int64)
+
+    def _bucket_values(self) -> np.ndarray:
+        index = np.arange(self.n_buckets) + self._offset
+        values = 2 * self.gamma ** index / (self.gamma + 1)
+        values[0] = 0.0
+        return values
+
+    def _group_index(self, chunk: pd.DataFrame, add: bool) -> np.ndarray:
+        """
+        Fila del sketch para cada registro (-1 si el grupo no se ha visto y add=False, o si
+        alguna llave es nula: esas filas no forman grupo, igual que en anomaly_mask).
+        """
+        key_frame = chunk[self.grouped_columns]
+        null_key = key_frame.isna().any(axis=1).to_numpy()
+        keys = pd.MultiIndex.from_frame(key_frame.astype(object))
+        if self.groups is None:
+            self.groups = keys[:0]
+        index = self.groups.get_indexer(keys)
+        if add and ((index < 0) & ~null_key).any():
+            new_keys = keys[(index < 0) & ~null_key].unique()
+            self.groups = self.groups.append(new_keys)
+            self.counts = np.vstack([self.counts, np.zeros((len(new_keys), self.n_buckets), dtype=np.int64)])
+            index = self.groups.get_indexer(keys)
+        index[null_key] = -1
+        return index
+
+    def update(self, chunk: pd.DataFrame):
+        """
+        Agrega las duraciones de un chunk a los sketches de sus grupos.
+        """
+        values = chunk[self.duration_column_name].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        rows = self._group_index(chunk.loc[valid] if not valid.all() else chunk, add=True)
+        grouped = rows >= 0
+        flat = rows[grouped] * self.n_buckets + self._buckets(values[valid][grouped])
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+        return self
+
+    def merge(self, other: "StreamingQuantileSketch"):
+        """
+        Combina otro sketch con los mismos parámetros (p.ej. calculado en paralelo por archivo).
+        """
+        if other.n_buckets != self.n_buckets or other.gamma != self.gamma:
+            raise ValueError("Sketches must share relative_accuracy, min_value and max_value to be merged.")
+        if other.groups is None:
+            return self
+        rows = self._group_index(other.groups.to_frame(index=False), add=True)
+        np.add.at(self.counts, rows, other.counts)
+        return self
+
+    def quantiles(self, q) -> pd.DataFrame:
+        """
+        Cuantiles aproximados por grupo.
+
+        Retorna:
+        - DataFrame indexado por grupo con una columna por cuantil y 'count'
+        """
+        q = np.atleast_1d(q)
+        cumulative = self.counts.cumsum(axis=1)
+        total = cumulative[:, -1] if len(cumulative) else np.zeros(0, dtype=np.int64)
+        bucket_values = self._bucket_values()
+        result = {}
+        for quantile in q:
+            rank = quantile * np.maximum(total - 1, 0)
+            bucket = (cumulative > rank[:, None]).argmax(axis=1)
+            result[quantile] = np.where(total > 0, bucket_values[bucket], np.nan)
+        result['count'] = total
+        return pd.DataFrame(result, index=self.groups)
+
+    def thresholds(self) -> pd.DataFrame:
+        """
+        Límites lower/upper por grupo según el método; los grupos con menos de min_count
+        registros no tienen límites (NaN) y nunca se marcan.
+        """
+        if self.method == 'percentile':
+            table = self.quantiles([self.low_pct, self.high_pct])
+            lower, upper = table[self.low_pct], table[self.high_pct]
+        else:
+            table = self.quantiles([0.25, 0.75])
+            iqr = table[0.75] - table[0.25]
+            lower, upper = table[0.25] - self.k * iqr, table[0.75] + self.k * iqr
+        enough = table['count'] >= self.min_count
+        return pd.DataFrame({'lower': lower.where(enough), 'upper': upper.where(enough), 'count': table['count']})
+
+    def flag(self, chunk: pd.DataFrame, update: bool = False) -> pd.Series:
+        """
+        Marca los registros de un chunk fuera de los límites de su grupo según la historia acumulada.
+
+        Parámetros:
+        - chunk: DataFrame con grouped_columns y la columna de duración
+        - update: si es True, después de marcar agrega el chunk a los sketches
+
+        Retorna:
+        - Series booleana alineada con chunk.index
+        """
+        mask = np.zeros(len(chunk), dtype=bool)
+        if self.groups is not None and len(self.groups):
+            rows = self._group_index(chunk, add=False)
+            thresholds = self.thresholds()
+            known = rows >= 0
+            lower = thresholds['lower'].to_numpy()[rows[known]]
+            upper = thresholds['upper'].to_numpy()[rows[known]]
+            values = chunk[self.duration_column_name].to_numpy(dtype=float)[known]
+            # Las comparaciones con NaN (grupos sin suficiente historia) son False
+            mask[known] = (values < lower) | (values > upper)
+        if update:
+            self.update(chunk)
+        return pd.Series(mask, index=chunk.index)
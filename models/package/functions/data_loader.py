@@ -1,18 +1,216 @@
+import datetime
+import hashlib
+import json
+import os
 import pandas as pd
 
-def load_excel_data(filepath: str) -> pd.DataFrame:
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # El cache es opcional: sin pyarrow se lee el Excel directamente
+    pq = None
+
+# Columnas que se guardan como categóricas / fechas en el cache (esquema limpio y esquema original)
+CATEGORICAL_COLUMNS = ['maquina', 'seccion', 'proceso', 'usuario', 'Maquina', 'Sección', 'Proceso', 'Usuario']
+DATE_COLUMNS = ['fecha_inicio', 'fecha_fin', 'dia_inicio', 'dia_fin', 'Fecha inicio', 'Fecha fin']
+
+# Columnas adicionales que se leen por chunks como categóricas / numéricas compactas
+STREAM_CATEGORICAL_COLUMNS = CATEGORICAL_COLUMNS + ['referencia', 'estado', 'turno', 'Referencia', 'Estado']
+STREAM_NUMERIC_COLUMNS = ['fabricadas', 'duracion_min', 'duracion_sec', 'Fabricadas', 'Duración [min]']
+
+# Filas por row group: permite saltar bloques completos al filtrar por rango de fechas
+CACHE_ROW_GROUP_SIZE = 5000
+
+
+def _file_hash(filepath: str) -> str:
+    sha = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _cache_paths(filepath: str, cache_dir: str = None):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(filepath)), '.cache')
+    base = os.path.join(cache_dir, os.path.basename(filepath))
+    return base + '.parquet', base + '.json'
+
+
+def _cache_is_valid(filepath: str, cache_file: str, meta_file: str) -> bool:
+    """
+    El cache es válido si el mtime y tamaño del archivo fuente no cambiaron o,
+    si cambiaron, el hash del contenido sigue siendo el mismo.
+    """
+    if not (os.path.exists(cache_file) and os.path.exists(meta_file)):
+        return False
+    with open(meta_file) as f:
+        meta = json.load(f)
+    stat = os.stat(filepath)
+    if meta.get('mtime') == stat.st_mtime and meta.get('size') == stat.st_size:
+        return True
+    if meta.get('sha256') != _file_hash(filepath):
+        return False
+    # Mismo contenido con otro mtime (copia, checkout): se actualizan los metadatos
+    meta.update(mtime=stat.st_mtime, size=stat.st_size)
+    with open(meta_file, 'w') as f:
+        json.dump(meta, f)
+    return True
+
+
+def _apply_cache_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tipos compactos para el cache: categóricas para las columnas repetidas y datetime64 para fechas.
+    """
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            try:
+                df[col] = pd.to_datetime(df[col])
+            except (ValueError, TypeError):
+                pass  # Se deja la columna como está si no es una fecha homogénea
+    return df
+
+
+def build_excel_cache(filepath: str, cache_dir: str = None) -> pd.DataFrame:
+    """
+    Lee el Excel, aplica los tipos del cache y lo guarda como Parquet junto a sus metadatos
+    (mtime, tamaño y hash SHA-256 del archivo fuente).
+
+    Args:
+        filepath (str): Ruta al archivo Excel.
+        cache_dir (str): Carpeta del cache (por defecto '.cache' junto al Excel).
+
+    Returns:
+        pd.DataFrame: DataFrame tipado, o el DataFrame original si no se pudo crear el cache.
+    """
+    df = pd.read_excel(filepath)
+    if pq is None:
+        return df
+
+    cache_file, meta_file = _cache_paths(filepath, cache_dir)
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    if os.path.exists(meta_file):
+        os.remove(meta_file)  # Sin metadatos el cache anterior queda invalidado
+    stat = os.stat(filepath)
+    try:
+        typed_df = _apply_cache_types(df.copy())
+        typed_df.to_parquet(cache_file, engine='pyarrow', index=True, row_group_size=CACHE_ROW_GROUP_SIZE)
+    except Exception as e:
+        # Columnas con tipos mezclados (p.ej. el Excel sin limpiar) no se pueden guardar en Parquet
+        print(f"Aviso: no se pudo crear el cache de {filepath}: {e}")
+        return df
+    with open(meta_file, 'w') as f:
+        json.dump({'source': os.path.abspath(filepath), 'mtime': stat.st_mtime,
+                   'size': stat.st_size, 'sha256': _file_hash(filepath)}, f)
+    print(f"Cache creado en {cache_file}")
+    return typed_df
+
+
+def _without_categories(df: pd.DataFrame) -> pd.DataFrame:
+    # Las categóricas vuelven a object: un groupby con varias claves categóricas usa
+    # observed=False por defecto y genera el producto cartesiano de los grupos
+    categorical_columns = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    return df.astype({col: object for col in categorical_columns}) if categorical_columns else df
+
+
+def _date_bounds(date_range: tuple) -> list:
+    """
+    Condiciones (operador, valor) de date_range. Un fin sin hora ('2024-09-30' o un date)
+    incluye todo ese día: se compara como < al día siguiente en vez de <= a la medianoche.
+    """
+    start, end = date_range
+    bounds = []
+    if start is not None:
+        bounds.append(('>=', pd.Timestamp(start)))
+    if end is not None:
+        date_only = (isinstance(end, str) and len(end.strip()) <= 10) or \
+            (isinstance(end, datetime.date) and not isinstance(end, datetime.datetime))
+        bounds.append(('<', pd.Timestamp(end) + pd.Timedelta(days=1)) if date_only else ('<=', pd.Timestamp(end)))
+    return bounds
+
+
+def read_excel_cache(cache_file: str, columns: list = None, date_range: tuple = None,
+                     date_column: str = 'fecha_inicio', categorical: bool = False) -> pd.DataFrame:
+    """
+    Lee el cache Parquet con proyección de columnas y filtro por rango de fechas.
+    Los row groups fuera del rango se descartan por sus estadísticas min/max sin leerse.
+
+    Args:
+        cache_file (str): Ruta al archivo Parquet.
+        columns (list): Columnas a leer (None = todas).
+        date_range (tuple): (inicio, fin) inclusivo; cualquiera de los dos puede ser None. Un fin
+            sin hora (p.ej. '2024-09-30') incluye todo ese día.
+        date_column (str): Columna de fecha sobre la que se filtra.
+        categorical (bool): Conservar las columnas categóricas del cache (si no, quedan como object).
+
+    Returns:
+        pd.DataFrame: DataFrame con el índice original de las filas.
+    """
+    filters = None
+    if date_range is not None:
+        filters = [(date_column, op, value) for op, value in _date_bounds(date_range)] or None
+    table = pq.read_table(cache_file, columns=columns, filters=filters, use_pandas_metadata=True)
+    df = table.to_pandas()
+    return df if categorical else _without_categories(df)
+
+
+def _select(df: pd.DataFrame, columns: list = None, date_range: tuple = None,
+            date_column: str = 'fecha_inicio') -> pd.DataFrame:
+    # Equivalente en pandas de la proyección y el filtro del cache
+    if date_range is not None:
+        dates = pd.to_datetime(df[date_column])
+        mask = pd.Series(True, index=df.index)
+        for op, value in _date_bounds(date_range):
+            mask &= (dates >= value) if op == '>=' else (dates < value) if op == '<' else (dates <= value)
+        df = df[mask]
+    if columns is not None:
+        df = df[columns]
+    return df
+
+
+def load_excel_data(filepath: str, use_cache: bool = True, columns: list = None, date_range: tuple = None,
+                    date_column: str = 'fecha_inicio', cache_dir: str = None,
+                    categorical: bool = False) -> pd.DataFrame:
     """
     Carga un archivo Excel y devuelve un DataFrame.
 
+    La primera carga convierte el Excel a un cache Parquet tipado; las siguientes leen el cache,
+    que se reconstruye cuando cambia el mtime o el hash del archivo fuente.
+
     Args:
         filepath (str): Ruta al archivo Excel.
+        use_cache (bool): Usar el cache Parquet (requiere pyarrow).
+        columns (list): Columnas a cargar (None = todas).
+        date_range (tuple): (inicio, fin) inclusivo para filtrar por date_column; un fin sin hora
+            (p.ej. '2024-09-30') incluye todo ese día.
+        date_column (str): Columna de fecha usada por date_range.
+        cache_dir (str): Carpeta del cache (por defecto '.cache' junto al Excel).
+        categorical (bool): Devolver maquina, seccion, proceso y usuario como categóricas (menos
+            memoria). Los groupby sobre varias de ellas deben usar observed=True.
 
     Returns:
         pd.DataFrame: DataFrame con los datos cargados.
     """
     try:
-        df = pd.read_excel(filepath)
-        print(f"Archivo cargado correctamente desde {filepath}")
+        if not use_cache or pq is None:
+            df = _select(pd.read_excel(filepath), columns, date_range, date_column)
+            print(f"Archivo cargado correctamente desde {filepath}")
+            return df
+
+        cache_file, meta_file = _cache_paths(filepath, cache_dir)
+        if not _cache_is_valid(filepath, cache_file, meta_file):
+            # Primera carga: se usa el DataFrame ya tipado en memoria en lugar de releer el cache
+            df = _select(build_excel_cache(filepath, cache_dir), columns, date_range, date_column)
+            if not categorical:
+                df = _without_categories(df)
+            print(f"Archivo cargado correctamente desde {filepath}")
+            return df
+
+        df = read_excel_cache(cache_file, columns=columns, date_range=date_range, date_column=date_column,
+                              categorical=categorical)
+        print(f"Archivo cargado correctamente desde {filepath} (cache)")
         return df
     except FileNotFoundError:
         print(f"Error: El archivo {filepath} no fue encontrado.")
@@ -39,4 +237,106 @@ def load_csv_data(filepath: str) -> pd.DataFrame:
         raise
     except Exception as e:
         print(f"Error inesperado al cargar el archivo {filepath}: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+def iter_csv_data(filepath: str, chunksize: int = 100_000, categories: dict = None,
+                  date_columns: list = None, categorical_columns: list = None, numeric_columns: list = None,
+                  date_format: str = None, numeric_dtype: str = 'float64', **read_csv_kwargs):
+    """
+    Lee un CSV por chunks con memoria constante y entrega cada chunk ya tipado:
+    - fechas parseadas una vez por chunk (vectorizado)
+    - Fabricadas / Duración convertidas a numeric_dtype (float64 como load_excel_data; 'float32'
+      reduce la memoria a la mitad pero pierde precisión en enteros mayores a 2**24)
+    - columnas de texto repetidas como categóricas con un diccionario compartido entre chunks
+
+    El diccionario compartido solo crece (las categorías nuevas se agregan al final), por lo que
+    el código de una categoría es el mismo en todos los chunks y pd.concat conserva el tipo
+    categórico si se alinean las categorías al diccionario final.
+
+    Args:
+        filepath (str): Ruta al archivo CSV.
+        chunksize (int): Filas por chunk.
+        categories (dict): {columna: lista de categorías}; se actualiza en el lugar. Permite
+            continuar la lectura de otro archivo con los mismos códigos.
+        date_columns (list): Columnas de fecha (por defecto DATE_COLUMNS presentes).
+        categorical_columns (list): Columnas categóricas (por defecto STREAM_CATEGORICAL_COLUMNS presentes).
+        numeric_columns (list): Columnas numéricas a compactar (por defecto STREAM_NUMERIC_COLUMNS presentes).
+        date_format (str): Formato de fecha opcional para pd.to_datetime.
+        numeric_dtype (str): Tipo de las columnas numéricas ('float64' o 'float32').
+        **read_csv_kwargs: Argumentos adicionales para pd.read_csv.
+
+    Yields:
+        pd.DataFrame: chunk tipado, con el índice continuo respecto al archivo.
+    """
+    if categories is None:
+        categories = {}
+    try:
+        reader = pd.read_csv(filepath, chunksize=chunksize, **read_csv_kwargs)
+    except FileNotFoundError:
+        print(f"Error: El archivo {filepath} no fue encontrado.")
+        raise
+
+    with reader:
+        for chunk in reader:
+            dates = DATE_COLUMNS if date_columns is None else date_columns
+            for col in [c for c in dates if c in chunk.columns]:
+                chunk[col] = pd.to_datetime(chunk[col], format=date_format, errors='coerce')
+
+            numerics = STREAM_NUMERIC_COLUMNS if numeric_columns is None else numeric_columns
+            for col in [c for c in numerics if c in chunk.columns]:
+                chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype(numeric_dtype)
+
+            categoricals = STREAM_CATEGORICAL_COLUMNS if categorical_columns is None else categorical_columns
+            for col in [c for c in categoricals if c in chunk.columns]:
+                known = categories.setdefault(col, [])
+                new_values = pd.Index(chunk[col].dropna().unique()).difference(known)
+                known.extend(new_values.tolist())
+                chunk[col] = pd.Categorical(chunk[col], categories=known)
+
+            yield chunk
+
+
+def concat_chunks(chunks, ignore_index: bool = False) -> pd.DataFrame:
+    """
+    Concatena chunks conservando las columnas categóricas: las categorías se alinean a la unión
+    (en orden de aparición) para que pd.concat no las convierta a object. Con los chunks de
+    iter_csv_data la unión es el diccionario compartido, así que los códigos no cambian.
+
+    Args:
+        chunks (iterable): DataFrames con las mismas columnas.
+        ignore_index (bool): Renumerar el índice del resultado.
+
+    Returns:
+        pd.DataFrame: DataFrame concatenado (vacío si no hay chunks).
+    """
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            union = pd.Index([])
+            for chunk in chunks:
+                union = union.append(chunk[col].cat.categories.difference(union, sort=False))
+            for chunk in chunks:
+                chunk[col] = chunk[col].cat.set_categories(union)
+    return pd.concat(chunks, ignore_index=ignore_index)
+
+
+def load_csv_chunks(filepath: str, chunksize: int = 100_000, **kwargs) -> pd.DataFrame:
+    """
+    Carga un CSV completo a través de iter_csv_data: el resultado ocupa la memoria de los
+    tipos compactos y las columnas categóricas comparten el diccionario final.
+
+    Args:
+        filepath (str): Ruta al archivo CSV.
+        chunksize (int): Filas por chunk.
+        **kwargs: Argumentos de iter_csv_data.
+
+    Returns:
+        pd.DataFrame: DataFrame tipado con los datos cargados.
+    """
+    df = concat_chunks(iter_csv_data(filepath, chunksize=chunksize, **kwargs))
+    if len(df.columns):
+        print(f"Archivo cargado correctamente desde {filepath}")
+    return df
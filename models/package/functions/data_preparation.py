@@ -2,25 +2,111 @@ import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
-from sklearn.linear_model import LassoCV
+from sklearn.metrics import r2_score
 import statsmodels.api as sm
+from .anomaly_detection import StreamingQuantileSketch, anomaly_mask
+from .data_loader import concat_chunks
+from .encoding import FeatureEncoder
+from .feature_selection import as_arrays, lasso_path_cv, logit_pvalues, ols_pvalues
+def _encode_split(df, columns, categorical_features, numeric_features, train_idx, test_idx, scale_numeric, dtype):
+    """
+    Codifica y escala directamente sobre dos buffers NumPy preasignados (train y test) en el orden
+    de columns. Solo se leen de df las columnas necesarias y las filas de cada partición; no se
+    copia el DataFrame completo. Las columnas de columns que no son categóricas ni numéricas
+    se copian sin transformar, como antes.
+
+    Retorna:
+    - X_train, X_test: DataFrames sobre los buffers (con el índice original de df)
+    - encoder: OrdinalEncoder entrenado o None
+    - scaler: StandardScaler entrenado o None
+    """
+    positions = {col: i for i, col in enumerate(columns)}
+    X_train = np.empty((len(train_idx), len(columns)), dtype=dtype)
+    X_test = np.empty((len(test_idx), len(columns)), dtype=dtype)
+
+    # Encode categorical features
+    if categorical_features:
+        cat_positions = [positions[col] for col in categorical_features]
+        encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
+        X_train[:, cat_positions] = encoder.fit_transform(df[categorical_features].iloc[train_idx])
+        X_test[:, cat_positions] = encoder.transform(df[categorical_features].iloc[test_idx])
+    else:
+        encoder = None
+
+    # Scale numeric features
+    if numeric_features:
+        num_positions = [positions[col] for col in numeric_features]
+        if scale_numeric:
+            scaler = StandardScaler()
+            X_train[:, num_positions] = scaler.fit_transform(df[numeric_features].iloc[train_idx])
+            X_test[:, num_positions] = scaler.transform(df[numeric_features].iloc[test_idx])
+        else:
+            scaler = None
+            X_train[:, num_positions] = df[numeric_features].iloc[train_idx].to_numpy(dtype=dtype)
+            X_test[:, num_positions] = df[numeric_features].iloc[test_idx].to_numpy(dtype=dtype)
+    else:
+        scaler = None
+
+    # Passthrough: todas las posiciones del buffer quedan escritas (np.empty no inicializa)
+    encoded = set(categorical_features) | set(numeric_features)
+    passthrough = [col for col in columns if col not in encoded]
+    if passthrough:
+        pass_positions = [positions[col] for col in passthrough]
+        X_train[:, pass_positions] = df[passthrough].iloc[train_idx].to_numpy(dtype=dtype)
+        X_test[:, pass_positions] = df[passthrough].iloc[test_idx].to_numpy(dtype=dtype)
+
+    X_train = pd.DataFrame(X_train, index=df.index[train_idx], columns=columns, copy=False)
+    X_test = pd.DataFrame(X_test, index=df.index[test_idx], columns=columns, copy=False)
+    return X_train, X_test, encoder, scaler
+
+
+def _encode_split_configurable(df, columns, feature_types, train_idx, test_idx, y_train, scale_numeric, dtype,
+                               encoding, encoding_params):
+    """
+    Variante de _encode_split con FeatureEncoder (one-hot / hashing / target encoding). El target
+    encoding del train es fuera de fold, así que necesita y_train; las medias del encoder se
+    calculan con todo el train, así que una CV posterior sobre X_train con target encoding da
+    puntajes optimistas.
+
+    Retorna:
+    - X_train, X_test: matrices CSR si alguna columna es one-hot o hashing, si no arreglos NumPy
+    - encoder: FeatureEncoder entrenado (incluye el escalado de las numéricas)
+    - scaler: StandardScaler del encoder o None
+    """
+    encoder = FeatureEncoder({col: feature_types[col] for col in columns}, encoding=encoding,
+                             scale_numeric=scale_numeric, dtype=dtype, **(encoding_params or {}))
+    X_train = encoder.fit_transform(df[columns].iloc[train_idx], y_train)
+    X_test = encoder.transform(df[columns].iloc[test_idx])
+    return X_train, X_test, encoder, encoder.scaler_
+
+
 def prepare_regression_data(
     df,
     feature_types: dict,
     target_column: str,
     test_size: float = 0.2,
     random_state: int = 42,
-    scale_numeric: bool = True
+    scale_numeric: bool = True,
+    dtype=np.float64,
+    encoding='ordinal',
+    encoding_params: dict = None
 ):
     """
     Prepare data for regression modeling:
-    - Split into features and target
+    - Split into features and target (by index arrays, without copying the DataFrame)
     - Encode categorical features with OrdinalEncoder
     - Scale numeric features with StandardScaler (optional)
-    - Add constant: Adds a constant to the dataset (optional)
+    - Features ('categorical' or 'numeric') are written into preallocated dtype buffers
+      (float64 by default; float32 halves the memory of X)
+    - encoding: 'ordinal' (default) or 'onehot', 'hashing', 'target' (or a dict {column: encoding}),
+      see functions.encoding.FeatureEncoder; encoding_params are passed to FeatureEncoder
+      (e.g. {'min_frequency': 20} or {'n_hash_features': 512}). With 'target' the encoder is fitted on
+      the whole train set, so cross-validation on X_train is optimistically biased (use FeatureEncoder
+      inside the Pipeline for unbiased CV scores)
+    - The target column is dropped from the features even if it is listed in feature_types
     Returns:
-    - X_train, X_test, y_train, y_test: prepared data splits
-    - encoder: fitted OrdinalEncoder or None
+    - X_train, X_test, y_train, y_test: prepared data splits (sparse CSR X with one-hot / hashing)
+    - encoder: fitted OrdinalEncoder, FeatureEncoder (encoding != 'ordinal') or None
     - scaler: fitted StandardScaler or None
     """
     if target_column not in df.columns:
@@ -29,34 +115,25 @@ def prepare_regression_data(
     if not pd.api.types.is_numeric_dtype(df[target_column]):
         raise ValueError(f"Target column '{target_column}' must be numeric for regression.")
 
-    df_copy = df.copy()
-
-    categorical_features = [feat for feat, ftype in feature_types.items() if ftype == 'categorical']
+    columns = [feat for feat in feature_types if feat != target_column] # Ensure target is not in features
+    categorical_features = [feat for feat, ftype in feature_types.items() if ftype == 'categorical' and feat != target_column]
     numeric_features = [feat for feat, ftype in feature_types.items() if ftype == 'numeric' and feat != target_column]
 
-    X = df_copy[list(feature_types.keys())].copy()
-    y = df_copy[target_column].copy()
-
-    # Split dataset first
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=random_state
+    # Split dataset first (same partition as splitting the DataFrame itself)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(df)), test_size=test_size, random_state=random_state
     )
 
-    # Encode categorical features
-    if categorical_features:
-        encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
-        X_train[categorical_features] = encoder.fit_transform(X_train[categorical_features])
-        X_test[categorical_features] = encoder.transform(X_test[categorical_features])
-    else:
-        encoder = None
-
-    # Scale numeric features
-    if scale_numeric and numeric_features:
-        scaler = StandardScaler()
-        X_train[numeric_features] = scaler.fit_transform(X_train[numeric_features])
-        X_test[numeric_features] = scaler.transform(X_test[numeric_features])
+    y_train = df[target_column].iloc[train_idx]
+    y_test = df[target_column].iloc[test_idx]
+    if encoding == 'ordinal':
+        X_train, X_test, encoder, scaler = _encode_split(
+            df, columns, categorical_features, numeric_features, train_idx, test_idx, scale_numeric, dtype
+        )
     else:
-        scaler = None
+        X_train, X_test, encoder, scaler = _encode_split_configurable(
+            df, columns, feature_types, train_idx, test_idx, y_train, scale_numeric, dtype, encoding, encoding_params
+        )
 
     print(f"Data prepared: {X_train.shape[0]} training samples, {X_test.shape[0]} test samples.")
     print(f"Categorical features encoded: {categorical_features}")
@@ -68,71 +145,64 @@ def prepare_classification_data(
     test_size: float = 0.2,
     random_state: int = 42,
     scale_numeric: bool = True,
-    stratify:bool= True
+    stratify:bool= True,
+    dtype=np.float64,
+    encoding='ordinal',
+    encoding_params: dict = None
 ):
     """
     Prepare data for classification modeling:
-    - Split into features and target
+    - Split into features and target (by index arrays, without copying the DataFrame)
     - Encode categorical features with OrdinalEncoder
     - Encode target variable with OrdinalEncoder if categorical
     - Scale numeric features with StandardScaler (optional)
     - Stratify bool
+    - Features ('categorical' or 'numeric') are written into preallocated dtype buffers
+    - encoding / encoding_params: categorical encoding as in prepare_regression_data (same CV bias
+      caveat for 'target')
 
     Returns:
-    - X_train, X_test, y_train, y_test: prepared data splits (arrays)
-    - encoder_X: fitted OrdinalEncoder for X categorical features or None
+    - X_train, X_test, y_train, y_test: prepared data splits (arrays, sparse CSR X with one-hot / hashing)
+    - encoder_X: fitted OrdinalEncoder (or FeatureEncoder) for X categorical features or None
     - encoder_y: fitted OrdinalEncoder for y or None
     - scaler: fitted StandardScaler or None
     """
     if target_column not in df.columns:
         raise ValueError(f"Target column '{target_column}' must be in the DataFrame.")
 
-    df_copy = df.copy()
-
+    columns = [feat for feat in feature_types if feat != target_column] # Ensure target is not in features
     categorical_features = [feat for feat, ftype in feature_types.items() if ftype == 'categorical' and feat != target_column]
     numeric_features = [feat for feat, ftype in feature_types.items() if ftype == 'numeric' and feat != target_column]
 
-    X = df_copy[list(feature_types.keys())].copy()
-    if target_column in X.columns:
-        X = X.drop(columns=[target_column]) # Ensure target is not in features
-    y = df_copy[target_column].copy()
+    y = df[target_column]
 
     # Split dataset
-    if(stratify):
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=random_state, stratify=y
-        )
-    else:
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=random_state
-        )
-
-    # Encode categorical features in X
-    if categorical_features:
-        encoder_X = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
-        X_train[categorical_features] = encoder_X.fit_transform(X_train[categorical_features])
-        X_test[categorical_features] = encoder_X.transform(X_test[categorical_features])
-    else:
-        encoder_X = None
+    train_idx, test_idx = train_test_split(
+        np.arange(len(df)), test_size=test_size, random_state=random_state, stratify=y if stratify else None
+    )
 
     # Encode target variable y if categorical (non-numeric)
+    y_train = np.asarray(y.iloc[train_idx])
+    y_test = np.asarray(y.iloc[test_idx])
     if not pd.api.types.is_numeric_dtype(y):
         encoder_y = OrdinalEncoder()
         # OrdinalEncoder expects 2D array for y, reshape:
-        y_train_enc = encoder_y.fit_transform(y_train.values.reshape(-1,1)).ravel()
-        y_test_enc = encoder_y.transform(y_test.values.reshape(-1,1)).ravel()
+        y_train_enc = encoder_y.fit_transform(y_train.reshape(-1,1)).ravel()
+        y_test_enc = encoder_y.transform(y_test.reshape(-1,1)).ravel()
     else:
         encoder_y = None
-        y_train_enc = y_train.values
-        y_test_enc = y_test.values
-
-    # Scale numeric features in X
-    if scale_numeric and numeric_features:
-        scaler = StandardScaler()
-        X_train[numeric_features] = scaler.fit_transform(X_train[numeric_features])
-        X_test[numeric_features] = scaler.transform(X_test[numeric_features])
+        y_train_enc = y_train
+        y_test_enc = y_test
+
+    # Encode categorical features in X
+    if encoding == 'ordinal':
+        X_train, X_test, encoder_X, scaler = _encode_split(
+            df, columns, categorical_features, numeric_features, train_idx, test_idx, scale_numeric, dtype
+        )
     else:
-        scaler = None
+        X_train, X_test, encoder_X, scaler = _encode_split_configurable(
+            df, columns, feature_types, train_idx, test_idx, y_train_enc, scale_numeric, dtype, encoding, encoding_params
+        )
 
     print(f"Data prepared: {X_train.shape[0]} training samples, {X_test.shape[0]} test samples.")
     print(f"Categorical features encoded: {categorical_features}")
@@ -140,45 +210,39 @@ def prepare_classification_data(
         print("Target variable encoded.")
 
     return X_train, X_test, y_train_enc, y_test_enc, encoder_X, encoder_y, scaler
-def select_features_lasso(X_train, y_train, feature_names=None, X_test=None, y_test=None, alpha_values=None, verbose=True):
+def select_features_lasso(X_train, y_train, feature_names=None, X_test=None, y_test=None, alpha_values=None, verbose=True, n_jobs=-1):
     """
-    Selects features using Lasso regression (LassoCV with cross-validation).
+    Selects features using Lasso regression (cross-validated Lasso path, see feature_selection.lasso_path_cv).
 
     Parameters:
     - X_train: training features (DataFrame or array)
     - y_train: training target (Series or array)
     - feature_names: list of feature names (optional if X_train is a DataFrame)
     - X_test, y_test: optional for evaluating R² on test set
-    - alpha_values: list of alpha values for LassoCV
+    - alpha_values: list of alpha values
     - verbose: whether to print information
+    - n_jobs: processes for the CV folds
 
     Returns:
     - selected_features: list of selected feature names
     """
-    if isinstance(X_train, pd.DataFrame):
-        feature_names = X_train.columns.tolist()
-    elif feature_names is None:
+    if not isinstance(X_train, pd.DataFrame) and feature_names is None:
         raise ValueError("feature_names must be provided if X_train is not a DataFrame.")
 
-    lasso = LassoCV(cv=5, random_state=0, alphas=alpha_values)
-    lasso.fit(X_train, y_train)
-
-    coef_series = pd.Series(lasso.coef_, index=feature_names)
-    selected_features = coef_series[coef_series != 0].index.tolist()
+    lasso = lasso_path_cv(X_train, y_train, feature_names=feature_names, alphas=alpha_values, cv=5, n_jobs=n_jobs, verbose=verbose)
+    selected_features = lasso["selected"]
 
-    if verbose:
-        print("Lasso coefficients:")
-        print(coef_series)
-        print("\nSelected features by Lasso:")
-        print(selected_features)
-        if X_test is not None and y_test is not None:
-            print(f"\nR² on test set: {lasso.score(X_test, y_test):.4f}")
+    if verbose and X_test is not None and y_test is not None:
+        y_pred = np.asarray(X_test, dtype=np.float64) @ lasso["coef"].to_numpy() + lasso["intercept"]
+        print(f"\nR² on test set: {r2_score(y_test, y_pred):.4f}")
 
     return selected_features
-def select_features_ols(X_train, y_train, feature_names=None, p_threshold=0.05,constant = True):
+def select_features_ols(X_train, y_train, feature_names=None, p_threshold=0.05,constant = True, verbose=True, return_table=False):
     
     """
-    Select significant features based on OLS p-values.
+    Select significant features based on OLS p-values. With return_table=True the p-values are
+    computed in NumPy from one Cholesky factorization (see feature_selection.OLSStatistics)
+    without fitting statsmodels.
 
     Parameters:
     - X_train: DataFrame or array of training features
@@ -186,82 +250,73 @@ def select_features_ols(X_train, y_train, feature_names=None, p_threshold=0.05,c
     - feature_names: list of feature names (if X_train is array)
     - p_threshold: p-value threshold for significance
     - Constant: bool - Add the constant to the OLS model
+    - verbose: print the p-values and the selected features
+    - return_table: return the NumPy coefficient table instead of the statsmodels results
 
     Returns:
     - significant_features: list of features with p-value <= threshold without the const
-    - ols_result: statsmodels RegressionResults object
+    - ols_result: statsmodels RegressionResults object, or with return_table=True a DataFrame
+      with coef, std_err, t and p_value per variable
     """
-    if not isinstance(X_train, pd.DataFrame):
-        if feature_names is None:
-            feature_names = [f"var{i}" for i in range(X_train.shape[1])]
-        X_train_df = pd.DataFrame(X_train, columns=feature_names)
+    if return_table:
+        result = ols_pvalues(X_train, y_train, feature_names=feature_names, constant=constant)
+        p_values = result["p_value"]
     else:
-        X_train_df = X_train.copy()
-
-    # Reset index for alignment
-    X_train_df = X_train_df.reset_index(drop=True)
-    y_train_series = pd.Series(y_train).reset_index(drop=True)
-
-    # Add constant term for intercept
-    if(constant):
-        X_train_df = sm.add_constant(X_train_df)
-
-    model = sm.OLS(y_train_series, X_train_df)
-    result = model.fit()
+        # Arreglos NumPy con la constante (sin copiar ni reindexar el DataFrame)
+        X, y, names = as_arrays(X_train, y_train, feature_names, constant)
+        result = sm.OLS(y, pd.DataFrame(X, columns=names, copy=False)).fit()
+        p_values = result.pvalues
 
-    p_values = result.pvalues.drop("const", errors='ignore')
+    p_values = p_values.drop("const", errors='ignore')
     significant_features = p_values[p_values <= p_threshold].index.tolist()
 
-    print("P-values:")
-    print(p_values)
-    print("\nSignificant features (p <= {:.2f}):".format(p_threshold))
-    print(significant_features)
+    if verbose:
+        print("P-values:")
+        print(p_values)
+        print("\nSignificant features (p <= {:.2f}):".format(p_threshold))
+        print(significant_features)
 
     return significant_features, result
-def select_features_logistic(X_train, y_train, feature_names=None, p_threshold=0.05):
+def select_features_logistic(X_train, y_train, feature_names=None, p_threshold=0.05, verbose=True, return_table=False):
     """
-    Select significant features based on Logistic Regression p-values.
+    Select significant features based on Logistic Regression p-values. With return_table=True
+    the model is fitted by Newton-Raphson in NumPy (see feature_selection.logit_pvalues)
+    without statsmodels.
 
     Parameters:
     - X_train: array or DataFrame of training features
     - y_train: array or Series of target binary/categorical variable (already codificada numéricamente)
     - feature_names: list of feature names (if X_train is array)
     - p_threshold: p-value threshold for significance
+    - verbose: print the p-values and the selected features
+    - return_table: return the NumPy coefficient table instead of the statsmodels results
 
     Returns:
     - significant_features: list of features with p-value <= threshold
-    - logit_result: statsmodels LogitResults object
+    - logit_result: statsmodels LogitResults object, or with return_table=True a DataFrame
+      with coef, std_err, z and p_value per variable
     """
-    # Si X_train es array, pasarlo a DataFrame con nombres de columnas
-    if not isinstance(X_train, pd.DataFrame):
-        if feature_names is None:
-            feature_names = [f"var{i}" for i in range(X_train.shape[1])]
-        X_train_df = pd.DataFrame(X_train, columns=feature_names)
+    if return_table:
+        result = logit_pvalues(X_train, y_train, feature_names=feature_names)
+        p_values = result["p_value"]
     else:
-        X_train_df = X_train.copy()
-
-    y_train_series = pd.Series(y_train).reset_index(drop=True)
-    X_train_df = X_train_df.reset_index(drop=True)
-
-    # Añadir constante para el intercepto
-    X_train_df = sm.add_constant(X_train_df)
-
-    # Ajustar modelo logístico
-    model = sm.Logit(y_train_series, X_train_df)
-    result = model.fit(disp=False)
+        X, y, names = as_arrays(X_train, y_train, feature_names)
+        result = sm.Logit(y, pd.DataFrame(X, columns=names, copy=False)).fit(disp=False)
+        p_values = result.pvalues
 
     # Obtener p-values y filtrar por p_threshold
-    p_values = result.pvalues.drop("const", errors="ignore")
+    p_values = p_values.drop("const", errors="ignore")
     significant_features = p_values[p_values <= p_threshold].index.tolist()
 
-    print("Logistic Regression p-values:")
-    print(p_values)
-    print(f"\nSignificant features (p <= {p_threshold}):")
-    print(significant_features)
+    if verbose:
+        print("Logistic Regression p-values:")
+        print(p_values)
+        print(f"\nSignificant features (p <= {p_threshold}):")
+        print(significant_features)
 
     return significant_features, result
 
-def select_features_multinomial_logit(X_train, y_train, feature_names=None, p_threshold=0.05):
+def select_features_multinomial_logit(X_train, y_train, feature_names=None, p_threshold=0.05, verbose=True):
     """
     Selecciona variables significativas basado en el test de p-values en MNLogit.
 
@@ -270,57 +325,141 @@ def select_features_multinomial_logit(X_train, y_train, feature_names=None, p_th
     - y_train: Series o array con variable objetivo multiclase
     - feature_names: lista de nombres de columnas (si X_train es array)
     - p_threshold: umbral de p-valor para seleccionar
+    - verbose: imprime los p-values y las variables seleccionadas
 
     Retorna:
     - significant_features: lista de variables con p-value bajo threshold en al menos una clase
     - result: objeto de resultados de MNLogit
     """
+    # Arreglos NumPy con la constante (sin copiar ni reindexar el DataFrame)
+    X, y, names = as_arrays(X_train, y_train, feature_names)
 
-    if not isinstance(X_train, pd.DataFrame):
-        if feature_names is None:
-            feature_names = [f"var{i}" for i in range(X_train.shape[1])]
-        X_train_df = pd.DataFrame(X_train, columns=feature_names)
-    else:
-        X_train_df = X_train.copy()
-
-    y_train_series = pd.Series(y_train).reset_index(drop=True)
-    X_train_df = X_train_df.reset_index(drop=True)
-
-    # Añadir constante
-    X_train_df = sm.add_constant(X_train_df)
-
-    model = sm.MNLogit(y_train_series, X_train_df)
+    model = sm.MNLogit(y, X)
     result = model.fit(disp=False)
 
     # pvalues es DataFrame con columnas = clases, filas = variables
-    pvalues = result.pvalues.drop("const", errors="ignore")
+    pvalues = pd.DataFrame(result.pvalues, index=names).drop("const", errors="ignore")
 
     # Queremos las variables con p-value <= threshold en al menos una clase
     mask = (pvalues <= p_threshold).any(axis=1)
     significant_features = pvalues.index[mask].tolist()
 
-    print("P-values por variable y clase:")
-    print(pvalues)
-    print("\nVariables significativas (p <= {:.2f} en al menos una clase):".format(p_threshold))
-    print(significant_features)
+    if verbose:
+        print("P-values por variable y clase:")
+        print(pvalues)
+        print("\nVariables significativas (p <= {:.2f} en al menos una clase):".format(p_threshold))
+        print(significant_features)
 
     return significant_features, result
 
 # Supongamos que tu DataFrame es df y tiene columnas 'maquina', 'turno' y 'duracion_min'
 
-def detectar_anomalias_duracion(df, grouped_columns=['maquina', 'turno'], duration_column_name='duracion_min', low_pct=0.05, high_pct=0.95,anomalies_column='anomalía_duracion'):
-    # Calcular percentiles 5 y 95 para cada grupo
-    percentiles = df.groupby(grouped_columns)[duration_column_name].quantile([low_pct, high_pct]).unstack(level=-1)
+def detectar_anomalias_duracion(df, grouped_columns=['maquina', 'turno'], duration_column_name='duracion_min', low_pct=0.05, high_pct=0.95,anomalies_column='anomalía_duracion', percentiles=None, method='percentile', k=None, return_mask=False):
+    """
+    Marca como anomalía las duraciones fuera de los límites de su grupo (por defecto percentiles 5 y 95
+    por maquina y turno). Los límites se llevan a las filas por código de grupo, sin merge: el resultado
+    no arrastra columnas pct_low/pct_high.
+
+    Parámetros:
+    - method: 'percentile', 'iqr' o 'mad' (ver functions.anomaly_detection)
+    - percentiles: límites ya calculados (p.ej. con calcular_percentiles_duracion); reemplazan a
+      low_pct / high_pct y solo se pueden usar con method='percentile' y sin k
+    - return_mask: si es True retorna solo la máscara booleana (sin copiar df)
+
+    Las filas con alguna llave de grupo nula nunca se marcan.
+
+    Retorna:
+    - df con la columna anomalies_column, o la máscara si return_mask=True
+    """
+    if percentiles is not None and (method != 'percentile' or k is not None):
+        raise ValueError("percentiles can only be used with method='percentile' and k=None.")
+    if percentiles is not None:
+        # Límites externos: se indexan por llave de grupo en lugar de unirlos con merge
+        keys = pd.MultiIndex.from_frame(df[grouped_columns].astype(object))
+        limits = percentiles.set_index(grouped_columns)[['pct_low', 'pct_high']]
+        limits.index = pd.MultiIndex.from_frame(limits.index.to_frame(index=False).astype(object))
+        rows = limits.index.get_indexer(keys)
+        rows[df[grouped_columns].isna().any(axis=1).to_numpy()] = -1
+        low = np.append(limits['pct_low'].to_numpy(dtype=float), np.nan)[rows]
+        high = np.append(limits['pct_high'].to_numpy(dtype=float), np.nan)[rows]
+        values = df[duration_column_name].to_numpy(dtype=float)
+        mask = pd.Series((values < low) | (values > high), index=df.index)
+    else:
+        mask = anomaly_mask(df, grouped_columns, duration_column_name, method, low_pct, high_pct, k)
+
+    if return_mask:
+        return mask
+    return df.assign(**{anomalies_column: mask})
+
+
+def calcular_percentiles_duracion(chunks, grouped_columns=['maquina', 'turno'], duration_column_name='duracion_min', low_pct=0.05, high_pct=0.95,
+                                  approximate=False, relative_accuracy=0.01):
+    """
+    Calcula los percentiles de duración por grupo consumiendo chunks (por ejemplo de iter_csv_data).
+
+    Por defecto los percentiles son exactos: de cada chunk se retienen las columnas de agrupación y
+    la duración (con sus tipos compactos), por lo que esas columnas completas quedan en memoria.
+    Con approximate=True cada chunk se agrega a un StreamingQuantileSketch por grupo y se descarta:
+    la memoria es constante (fija por grupo) y el error relativo de cada percentil es del orden de
+    relative_accuracy.
+
+    Parámetros:
+    - chunks: iterable de DataFrames
+    - grouped_columns: columnas de agrupación
+    - duration_column_name: columna de duración
+    - low_pct, high_pct: percentiles inferior y superior
+    - approximate: usar sketches de cuantiles en lugar de retener las columnas
+    - relative_accuracy: precisión relativa de los sketches (solo con approximate=True)
+
+    Retorna:
+    - DataFrame con grouped_columns + ['pct_low', 'pct_high'], listo para detectar_anomalias_duracion(percentiles=...)
+    """
+    if approximate:
+        sketch = StreamingQuantileSketch(grouped_columns, duration_column_name, low_pct, high_pct,
+                                         relative_accuracy=relative_accuracy)
+        for chunk in chunks:
+            sketch.update(chunk)
+        if sketch.groups is None:
+            return pd.DataFrame(columns=list(grouped_columns) + ['pct_low', 'pct_high'])
+        percentiles = sketch.quantiles([low_pct, high_pct])[[low_pct, high_pct]]
+    else:
+        data = concat_chunks((chunk[grouped_columns + [duration_column_name]] for chunk in chunks), ignore_index=True)
+        percentiles = data.groupby(grouped_columns, observed=True)[duration_column_name].quantile([low_pct, high_pct]).unstack(level=-1)
     percentiles.columns = ['pct_low', 'pct_high']
-    percentiles = percentiles.reset_index()
+    return percentiles.reset_index()
+
 
-    # Unir percentiles al DataFrame original
-    df = df.merge(percentiles, on=grouped_columns, how='left')
+def agregar_por_chunks(chunks, grouped_columns, value_columns):
+    """
+    Agrega valores por grupo de forma incremental: cada chunk se resume (suma, conteo, mínimo, máximo)
+    y se combina con el acumulado, por lo que nunca se tiene el archivo completo en memoria.
 
-    # Definir anomalia si duracion < pct_low o > pct_high
-    df[anomalies_column] = (df[duration_column_name] < df['pct_low']) | (df[duration_column_name] > df['pct_high'])
+    Parámetros:
+    - chunks: iterable de DataFrames
+    - grouped_columns: columnas de agrupación (p.ej. ['seccion', 'maquina'])
+    - value_columns: columnas numéricas a agregar (p.ej. ['duracion_min', 'fabricadas'])
 
-    return df
+    Retorna:
+    - DataFrame con grouped_columns y, por cada columna, <col>_sum, <col>_count, <col>_min, <col>_max y <col>_mean
+    """
+    how = {}
+    for col in value_columns:
+        how.update({f"{col}_sum": 'sum', f"{col}_count": 'sum', f"{col}_min": 'min', f"{col}_max": 'max'})
+
+    total = None
+    for chunk in chunks:
+        partial = chunk.groupby(grouped_columns, observed=True)[value_columns].agg(['sum', 'count', 'min', 'max'])
+        partial.columns = [f"{col}_{stat}" for col, stat in partial.columns]
+        partial = partial.reset_index()
+        if total is not None:
+            partial = pd.concat([total, partial], ignore_index=True)
+        total = partial.groupby(grouped_columns, observed=True, as_index=False).agg(how)
+
+    if total is None:
+        return pd.DataFrame(columns=grouped_columns + list(how))
+    for col in value_columns:
+        total[f"{col}_mean"] = total[f"{col}_sum"] / total[f"{col}_count"]
+    return total
 
 
 
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler, TargetEncoder
+
+ENCODINGS = ('ordinal', 'onehot', 'hashing', 'target')
+# Codificaciones que producen columnas dispersas (la salida completa pasa a CSR)
+SPARSE_ENCODINGS = ('onehot', 'hashing')
+
+
+class FeatureEncoder(BaseEstimator, TransformerMixin):
+    """
+    Codificación configurable de las features categóricas + escalado de las numéricas.
+
+    - 'ordinal': OrdinalEncoder (códigos enteros, como prepare_*_data por defecto)
+    - 'onehot': OneHotEncoder disperso; min_frequency agrupa las categorías raras en una columna
+    - 'hashing': FeatureHasher con n_hash_features columnas compartidas por las columnas 'hashing'
+      (memoria fija aunque aparezcan categorías nuevas)
+    - 'target': TargetEncoder; fit_transform usa cross fitting (cada fila se codifica con las
+      medias de los otros folds) y transform usa las medias de todo el train. Si el encoder se
+      ajusta sobre todo el train antes de una validación cruzada (como prepare_*_data), las
+      medias de transform ya vieron el target de los folds de validación y los puntajes de CV
+      quedan sesgados de forma optimista; para una CV sin sesgo se pone dentro del Pipeline
+
+    Si alguna columna usa 'onehot' o 'hashing' la salida es una matriz CSR y las numéricas se
+    escalan sin centrar (StandardScaler(with_mean=False)) para no llenar de valores la matriz.
+
+    Parámetros:
+    - features: dict {columna: 'categorical' | 'numeric'} (mismo formato que CustomPreprocessor)
+    - encoding: codificación para todas las categóricas, o dict {columna: codificación}
+      (las columnas que no estén en el dict usan 'onehot')
+    - scale_numeric: escala las numéricas con StandardScaler
+    """
+
+    def __init__(self, features, encoding='onehot', n_hash_features=256, min_frequency=None, target_type='auto',
+                 cv=5, smooth='auto', random_state=42, scale_numeric=True, dtype=np.float64):
+        self.features = features
+        self.encoding = encoding
+        self.n_hash_features = n_hash_features
+        self.min_frequency = min_frequency
+        self.target_type = target_type
+        self.cv = cv
+        self.smooth = smooth
+        self.random_state = random_state
+        self.scale_numeric = scale_numeric
+        self.dtype = dtype
+
+    def _method(self, col):
+        method = self.encoding.get(col, 'onehot') if isinstance(self.encoding, dict) else self.encoding
+        if method not in ENCODINGS:
+            raise ValueError(f"Unknown encoding '{method}' for '{col}'. Valid encodings: {ENCODINGS}.")
+        return method
+
+    def _columns(self, method):
+        return [col for col in self.cat_cols_ if self._method(col) == method]
+
+    def _hash_input(self, X):
+        # Cada fila como ["columna=valor", ...] para que el mismo valor en dos columnas no colisione
+        tokens = [(col + '=') + X[col].astype(str).to_numpy(dtype=object) for col in self.hashing_cols_]
+        return zip(*tokens)
+
+    def _fit(self, X, y):
+        X = pd.DataFrame(X)
+        # Derivadas en fit (no en __init__) para que set_params / clone cambien features de verdad
+        self.cat_cols_ = [col for col, t in self.features.items() if t == 'categorical']
+        self.num_cols_ = [col for col, t in self.features.items() if t == 'numeric']
+        self.ordinal_cols_ = self._columns('ordinal')
+        self.target_cols_ = self._columns('target')
+        self.onehot_cols_ = self._columns('onehot')
+        self.hashing_cols_ = self._columns('hashing')
+        self.sparse_output_ = any(self._method(col) in SPARSE_ENCODINGS for col in self.cat_cols_)
+        if self.target_cols_ and y is None:
+            raise ValueError("Target encoding requires y.")
+
+        # Vocabulario visto en el train de cada categórica (lo usa p. ej. la API para el formulario)
+        self.categories_ = [np.array(sorted(pd.unique(X[col].dropna().astype(object)), key=str), dtype=object)
+                            for col in self.cat_cols_]
+
+        self.ordinal_encoder_ = None
+        if self.ordinal_cols_:
+            self.ordinal_encoder_ = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1,
+                                                   dtype=self.dtype).fit(X[self.ordinal_cols_])
+        self.onehot_encoder_ = None
+        if self.onehot_cols_:
+            self.onehot_encoder_ = OneHotEncoder(
+                handle_unknown='infrequent_if_exist' if self.min_frequency else 'ignore',
+                min_frequency=self.min_frequency, sparse_output=True, dtype=self.dtype,
+            ).fit(X[self.onehot_cols_].astype(object))
+        self.hasher_ = None
+        if self.hashing_cols_:
+            self.hasher_ = FeatureHasher(n_features=self.n_hash_features, input_type='string', dtype=self.dtype)
+        self.scaler_ = None
+        if self.num_cols_ and self.scale_numeric:
+            self.scaler_ = StandardScaler(with_mean=not self.sparse_output_).fit(X[self.num_cols_])
+
+        target_block = None
+        self.target_encoder_ = None
+        if self.target_cols_:
+            self.target_encoder_ = TargetEncoder(target_type=self.target_type, smooth=self.smooth, cv=self.cv,
+                                                 shuffle=True, random_state=self.random_state)
+            target_block = self.target_encoder_.fit_transform(X[self.target_cols_].astype(object), np.asarray(y))
+        return X, target_block
+
+    def fit(self, X, y=None):
+        self._fit(X, y)
+        return self
+
+    def fit_transform(self, X, y=None, **fit_params):
+        # El train se codifica fuera de fold (sin filtrar su propio target en la codificación)
+        X, target_block = self._fit(X, y)
+        return self._transform(X, target_block)
+
+    def transform(self, X):
+        X = pd.DataFrame(X)
+        target_block = None
+        if self.target_encoder_ is not None:
+            target_block = self.target_encoder_.transform(X[self.target_cols_].astype(object))
+        return self._transform(X, target_block)
+
+    def _transform(self, X, target_block):
+        """
+        Bloques en orden: ordinales, target, numéricas (densos), one-hot y hashing (dispersos);
+        get_feature_names_out da los nombres en el mismo orden.
+        """
+        blocks = []
+        if self.ordinal_encoder_ is not None:
+            blocks.append(self.ordinal_encoder_.transform(X[self.ordinal_cols_]))
+        if target_block is not None:
+            blocks.append(target_block)
+        if self.num_cols_:
+            X_num = X[self.num_cols_]
+            blocks.append(self.scaler_.transform(X_num) if self.scaler_ is not None else X_num.to_numpy(dtype=np.float64))
+        if self.onehot_encoder_ is not None:
+            blocks.append(self.onehot_encoder_.transform(X[self.onehot_cols_].astype(object)))
+        if self.hasher_ is not None:
+            blocks.append(self.hasher_.transform(self._hash_input(X)))
+
+        if self.sparse_output_:
+            return sp.hstack([sp.csr_matrix(block, dtype=self.dtype) if not sp.issparse(block) else block
+                              for block in blocks], format='csr', dtype=self.dtype)
+        return np.hstack([np.asarray(block, dtype=self.dtype) for block in blocks])
+
+    def get_feature_names_out(self, input_features=None):
+        names = list(self.ordinal_cols_)
+        if self.target_encoder_ is not None:
+            names += list(self.target_encoder_.get_feature_names_out())
+        names += self.num_cols_
+        if self.onehot_encoder_ is not None:
+            names += list(self.onehot_encoder_.get_feature_names_out())
+        names += [f"hash_{i}" for i in range(self.n_hash_features)] if self.hasher_ is not None else []
+        return np.array(names, dtype=object)
+
+
+def matrix_nbytes(X) -> int:
+    """
+    Bytes que ocupa X (para matrices CSR: datos + índices + punteros de fila).
+    """
+    if sp.issparse(X):
+        X = X.tocsr()
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return np.asarray(X).nbytes
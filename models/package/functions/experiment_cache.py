@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from functools import lru_cache
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy
+import scipy.sparse as sp
+import sklearn
+from sklearn.base import clone
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fits (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    model TEXT,
+    estimator TEXT,
+    params TEXT,
+    fold INTEGER,
+    n_train INTEGER,
+    score REAL,
+    fit_time REAL,
+    score_time REAL,
+    path TEXT,
+    created_at REAL
+)
+"""
+
+
+def dataset_fingerprint(X, y=None) -> str:
+    """
+    Hash del contenido de X (valores, columnas y tipos) y de y. Cambia si cambian los datos, el
+    orden de las filas o las features seleccionadas.
+    """
+    digest = hashlib.sha256()
+    for data in (X, y):
+        if data is None:
+            continue
+        if sp.issparse(data):
+            data = data.tocsr()
+            digest.update(f"sparse{data.dtype}{data.shape}".encode())
+            for array in (data.data, data.indices, data.indptr):
+                digest.update(np.ascontiguousarray(array).tobytes())
+        elif isinstance(data, (pd.DataFrame, pd.Series)):
+            frame = data.to_frame() if isinstance(data, pd.Series) else data
+            digest.update(json.dumps([[str(col), str(dtype)] for col, dtype in frame.dtypes.items()]).encode())
+            digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        else:
+            array = np.ascontiguousarray(data)
+            digest.update(f"{array.dtype}{array.shape}".encode())
+            digest.update(array.tobytes() if array.dtype != object else joblib.hash(array).encode())
+    return digest.hexdigest()
+
+
+def library_versions() -> dict:
+    """
+    Versiones de las librerías que determinan el resultado de un ajuste y el formato de lo guardado.
+    """
+    return {module.__name__: module.__version__ for module in (sklearn, np, pd, scipy, joblib)}
+
+
+@lru_cache(maxsize=None)
+def _source_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _package_module(name):
+    module = sys.modules.get(name or "")
+    path = getattr(module, "__file__", None)
+    if path and os.path.dirname(os.path.abspath(path)) == _PACKAGE_DIR:
+        return module
+    return None
+
+
+def _package_sources(estimator) -> dict:
+    # Hash del código de los módulos de este paquete que definen alguna pieza del estimador
+    # (CustomPreprocessor, FeatureEncoder, ...) y de los módulos del paquete que estos importan:
+    # un cambio en ese código invalida el caché
+    objects = [estimator] + list(estimator.get_params(deep=True).values())
+    pending = [_package_module(type(obj).__module__) for obj in objects]
+    sources = {}
+    while pending:
+        module = pending.pop()
+        if module is None or module.__name__ in sources:
+            continue
+        sources[module.__name__] = _source_hash(module.__file__)
+        pending.extend(_package_module(value.__name__ if isinstance(value, type(sys)) else getattr(value, "__module__", None))
+                       for value in vars(module).values())
+    return dict(sorted(sources.items()))
+
+
+def estimator_fingerprint(estimator, params: dict) -> str:
+    """
+    Hash de la configuración completa del estimador con params aplicados (clase, hiperparámetros
+    y pasos del pipeline, incluido el dict de features del preprocesador), de las versiones de las
+    librerías y del código de los transformadores propios que usa.
+    """
+    configured = clone(estimator).set_params(**params)
+    return joblib.hash((configured, library_versions(), _package_sources(configured)))
+
+
+def fold_fingerprint(train, test=None) -> str:
+    # Los índices de cada fold reflejan el splitter, su semilla y el submuestreo de halving
+    digest = hashlib.sha256(np.asarray(train, dtype=np.int64).tobytes())
+    if test is not None:
+        digest.update(b"|")
+        digest.update(np.asarray(test, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+class ExperimentCache:
+    """
+    Caché local de ajustes de la selección de modelos, direccionado por contenido.
+
+    Cada ajuste (modelo, params, fold) se guarda con una clave que combina el fingerprint del
+    dataset, el del estimador con sus params (y las versiones de librerías y del código propio),
+    los índices del fold y el scorer. El índice es una
+    base SQLite (score y tiempos) y las predicciones fuera de fold (y los modelos finales) van en
+    archivos joblib, así que una corrida repetida o una grilla ampliada solo ajusta las
+    combinaciones nuevas.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(key[:2], f"{key}.joblib")
+
+    def _load(self, row):
+        path = os.path.join(self.directory, row[-1])
+        if not os.path.exists(path):
+            return None
+        return joblib.load(path)
+
+    def get(self, key: str):
+        """
+        Retorna:
+        - (score, y_pred, y_proba, fit_time, score_time) como _fit_and_score, o None si no está
+        """
+        row = self._conn.execute("SELECT score, fit_time, score_time, path FROM fits WHERE key = ? AND kind = 'fold'",
+                                 (key,)).fetchone()
+        payload = self._load(row) if row is not None else None
+        if payload is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        score, fit_time, score_time, _ = row
+        y_pred, y_proba = payload
+        return (np.nan if score is None else score), y_pred, y_proba, fit_time, score_time
+
+    def put(self, key: str, result, model: str = None, estimator=None, params: dict = None, fold: int = None,
+            n_train: int = None):
+        score, y_pred, y_proba, fit_time, score_time = result
+        self._write(key, "fold", (y_pred, y_proba), model, estimator, params, fold, n_train,
+                    None if np.isnan(score) else float(score), fit_time, score_time)
+
+    def get_model(self, key: str):
+        row = self._conn.execute("SELECT path FROM fits WHERE key = ? AND kind = 'model'", (key,)).fetchone()
+        fitted = self._load(row) if row is not None else None
+        if fitted is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return fitted
+
+    def put_model(self, key: str, fitted, model: str = None, params: dict = None, n_train: int = None):
+        self._write(key, "model", fitted, model, fitted, params, None, n_train, None, None, None)
+
+    def _write(self, key, kind, payload, model, estimator, params, fold, n_train, score, fit_time, score_time):
+        path = self._path(key)
+        os.makedirs(os.path.join(self.directory, key[:2]), exist_ok=True)
+        tmp_path = os.path.join(self.directory, f"{path}.tmp")
+        joblib.dump(payload, tmp_path, compress=3)
+        os.replace(tmp_path, os.path.join(self.directory, path))
+        estimator_name = None
+        if estimator is not None:
+            final = estimator.steps[-1][1] if hasattr(estimator, "steps") else estimator
+            estimator_name = f"{type(final).__module__}.{type(final).__name__}"
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO fits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (key, kind, model, estimator_name, json.dumps(params, sort_keys=True, default=str),
+                                fold, n_train, score, fit_time, score_time, path, time.time()))
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Contenido del índice (sin las predicciones), p. ej. para ver qué combinaciones ya se ajustaron.
+        """
+        return pd.read_sql_query("SELECT * FROM fits ORDER BY created_at", self._conn)
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM fits").fetchone()[0]
+
+    def clear(self):
+        for path, in self._conn.execute("SELECT path FROM fits").fetchall():
+            full_path = os.path.join(self.directory, path)
+            if os.path.exists(full_path):
+                os.remove(full_path)
+        with self._conn:
+            self._conn.execute("DELETE FROM fits")
+        self.hits = self.misses = 0
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy import linalg, stats
+from scipy.special import expit
+from sklearn.linear_model import lasso_path
+from sklearn.model_selection import KFold
+
+
+def as_arrays(X, y, feature_names=None, constant=True):
+    """
+    Convierte X, y a arreglos float64 sin reset_index ni copias de DataFrame y agrega la constante
+    como primera columna (como sm.add_constant).
+    """
+    if isinstance(X, pd.DataFrame):
+        feature_names = X.columns.tolist()
+    elif feature_names is None:
+        feature_names = [f"var{i}" for i in range(X.shape[1])]
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64).ravel()
+    if constant:
+        X = np.column_stack([np.ones(len(X)), X])
+        feature_names = ["const"] + list(feature_names)
+    return X, y, list(feature_names)
+
+
+def _inverse_gram(gram):
+    """
+    Inversa de X'X con una factorización de Cholesky; si la matriz no es definida positiva
+    (columnas colineales) se usa la pseudo-inversa, como hace statsmodels.
+    """
+    try:
+        factor = linalg.cho_factor(gram, lower=True)
+        return linalg.cho_solve(factor, np.eye(len(gram)))
+    except linalg.LinAlgError:
+        return np.linalg.pinv(gram)
+
+
+class OLSStatistics:
+    """
+    Estadísticos de OLS (X'X, X'y, n, suma de residuos) y la inversa de X'X, obtenidos con una
+    sola factorización de Cholesky. La suma de residuos se calcula desde los residuos y no como
+    y'y - beta'X'y, que pierde precisión (cancelación) con targets de magnitud grande.
+
+    Quitar una variable no requiere reajustar: la inversa, los coeficientes y la suma de residuos
+    del modelo reducido se obtienen con una actualización de rango uno (O(p^2)).
+    """
+
+    def __init__(self, X, y, feature_names=None, constant=True):
+        X, y, self.feature_names = as_arrays(X, y, feature_names, constant)
+        self.n_samples = len(y)
+        self.gram = X.T @ X
+        self.xty = X.T @ y
+        self.inverse = _inverse_gram(self.gram)
+        self.coef = self.inverse @ self.xty
+        residuals = y - X @ self.coef
+        self.rss = float(residuals @ residuals)
+        self.active = list(range(len(self.feature_names)))
+
+    def remove(self, name: str):
+        """
+        Quita una variable del modelo con una actualización de rango uno de la inversa:
+        A' = A_-j,-j - a_j a_j' / a_jj ;  beta' = beta_-j - a_j beta_j / a_jj ;  RSS' = RSS + beta_j^2 / a_jj
+        """
+        j = [self.feature_names[i] for i in self.active].index(name)
+        a_jj = self.inverse[j, j]
+        a_j = np.delete(self.inverse[:, j], j)
+        beta_j = self.coef[j]
+        self.inverse = np.delete(np.delete(self.inverse, j, axis=0), j, axis=1) - np.outer(a_j, a_j) / a_jj
+        self.coef = np.delete(self.coef, j) - a_j * beta_j / a_jj
+        self.rss += beta_j ** 2 / a_jj
+        del self.active[j]
+        return self
+
+    def table(self) -> pd.DataFrame:
+        """
+        Coeficientes, errores estándar, estadístico t y p-values (dos colas) del modelo actual.
+        """
+        df_resid = self.n_samples - len(self.active)
+        sigma2 = self.rss / df_resid
+        std_err = np.sqrt(np.clip(np.diag(self.inverse), 0, None) * sigma2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_values = self.coef / std_err
+        p_values = 2 * stats.t.sf(np.abs(t_values), df_resid)
+        return pd.DataFrame({"coef": self.coef, "std_err": std_err, "t": t_values, "p_value": p_values},
+                            index=[self.feature_names[i] for i in self.active])
+
+
+def ols_pvalues(X, y, feature_names=None, constant=True) -> pd.DataFrame:
+    """
+    Tabla OLS (coef, std_err, t, p_value) calculada en NumPy, sin statsmodels.
+
+    Parámetros:
+    - X: DataFrame o arreglo de features
+    - y: Series o arreglo del target
+    - feature_names: nombres de las columnas si X es un arreglo
+    - constant: agrega el intercepto ('const')
+
+    Retorna:
+    - DataFrame indexado por variable
+    """
+    return OLSStatistics(X, y, feature_names, constant).table()
+
+
+def backward_elimination(X, y, feature_names=None, p_threshold=0.05, constant=True, verbose=False) -> dict:
+    """
+    Eliminación hacia atrás por p-value: en cada paso se quita la variable con mayor p-value
+    (si supera p_threshold). La factorización se hace una sola vez; cada paso es una
+    actualización de rango uno de la inversa de X'X.
+
+    Retorna:
+    - dict con "selected" (variables que quedan, sin 'const'), "removed" (lista de
+      (variable, p_value) en orden de eliminación) y "table" (tabla OLS final)
+    """
+    ols = OLSStatistics(X, y, feature_names, constant)
+    removed = []
+    while True:
+        table = ols.table()
+        candidates = table["p_value"].drop("const", errors="ignore")
+        if candidates.empty or candidates.max() <= p_threshold:
+            break
+        worst = candidates.idxmax()
+        removed.append((worst, float(candidates[worst])))
+        if verbose:
+            print(f"Eliminada: {worst} (p = {candidates[worst]:.4f})")
+        ols.remove(worst)
+
+    selected = [name for name in table.index if name != "const"]
+    if verbose:
+        print(f"\nVariables seleccionadas (p <= {p_threshold}): {selected}")
+    return {"selected": selected, "removed": removed, "table": table}
+
+
+def logit_pvalues(X, y, feature_names=None, constant=True, max_iter=100, tol=1e-8) -> pd.DataFrame:
+    """
+    Regresión logística binaria por Newton-Raphson (cada iteración resuelve con Cholesky) y
+    p-values de Wald a partir de la inversa del Hessiano, como sm.Logit.
+
+    Retorna:
+    - DataFrame indexado por variable con coef, std_err, z y p_value
+    """
+    X, y, names = as_arrays(X, y, feature_names, constant)
+    coef = np.zeros(X.shape[1])
+    for _ in range(max_iter):
+        prob = expit(X @ coef)
+        gradient = X.T @ (y - prob)
+        hessian = (X * (prob * (1 - prob))[:, None]).T @ X
+        try:
+            step = linalg.cho_solve(linalg.cho_factor(hessian, lower=True), gradient)
+        except linalg.LinAlgError:
+            step = np.linalg.lstsq(hessian, gradient, rcond=None)[0]
+        coef += step
+        if np.max(np.abs(step)) < tol:
+            break
+
+    prob = expit(X @ coef)
+    covariance = _inverse_gram((X * (prob * (1 - prob))[:, None]).T @ X)
+    std_err = np.sqrt(np.clip(np.diag(covariance), 0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_values = coef / std_err
+    p_values = 2 * stats.norm.sf(np.abs(z_values))
+    return pd.DataFrame({"coef": coef, "std_err": std_err, "z": z_values, "p_value": p_values}, index=names)
+
+
+def _lasso_fold(X, y, train, test, alphas):
+    # Centra con las medias del fold (equivale a ajustar el intercepto) y recorre el camino
+    # de alphas de mayor a menor: cada alpha arranca desde la solución del anterior (warm start)
+    X_mean, y_mean = X[train].mean(axis=0), y[train].mean()
+    X_train, y_train = X[train] - X_mean, y[train] - y_mean
+    _, coefs, _ = lasso_path(X_train, y_train, alphas=alphas, precompute=True)
+    residuals = (y[test] - y_mean)[:, None] - (X[test] - X_mean) @ coefs
+    return np.mean(residuals ** 2, axis=0)
+
+
+def lasso_path_cv(X, y, feature_names=None, alphas=None, n_alphas=100, eps=1e-3, cv=5, n_jobs=-1,
+                  verbose=False) -> dict:
+    """
+    Selección con Lasso: el camino de alphas (con warm starts) se calcula en paralelo en cada fold,
+    se elige el alpha con menor MSE promedio de validación y se reajusta con todos los datos.
+
+    Parámetros:
+    - alphas: grilla de alphas (por defecto n_alphas valores log-espaciados como LassoCV)
+    - cv: número de folds (consecutivos, como LassoCV)
+    - n_jobs: procesos para los folds
+
+    Retorna:
+    - dict con "selected", "coef" (Series), "intercept", "alpha", "alphas" y "mse_path" (n_alphas x folds)
+    """
+    X, y, names = as_arrays(X, y, feature_names, constant=False)
+    if alphas is None:
+        X_centered = X - X.mean(axis=0)
+        alpha_max = np.max(np.abs(X_centered.T @ (y - y.mean()))) / len(y)
+        alphas = np.logspace(np.log10(alpha_max), np.log10(alpha_max * eps), n_alphas)
+    alphas = np.sort(np.asarray(alphas, dtype=float))[::-1]
+
+    folds = KFold(n_splits=cv).split(X)
+    mse_path = Parallel(n_jobs=n_jobs)(delayed(_lasso_fold)(X, y, train, test, alphas) for train, test in folds)
+    mse_path = np.column_stack(mse_path)
+    best = int(np.argmin(mse_path.mean(axis=1)))
+
+    # Camino completo hasta el mejor alpha (warm start) con todos los datos
+    _, coefs, _ = lasso_path(X - X.mean(axis=0), y - y.mean(), alphas=alphas[:best + 1], precompute=True)
+    coef = pd.Series(coefs[:, -1], index=names)
+    selected = coef[coef != 0].index.tolist()
+
+    if verbose:
+        print(f"Best alpha: {alphas[best]:.6f}")
+        print("Lasso coefficients:")
+        print(coef)
+        print("\nSelected features by Lasso:")
+        print(selected)
+    intercept = float(y.mean() - X.mean(axis=0) @ coefs[:, -1])
+    return {"selected": selected, "coef": coef, "intercept": intercept, "alpha": float(alphas[best]),
+            "alphas": alphas, "mse_path": mse_path}
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# split{k}_{test|train}_{scorer}: puntaje de un fold (scorer es 'score' con una sola métrica)
+_SPLIT_COLUMN = re.compile(r"^split(\d+)_(test|train)_(.+)$")
+# Columnas resumen por candidato que se conservan (mean_test_score, std_fit_time, rank_test_score, ...)
+_SUMMARY_COLUMN = re.compile(r"^(mean|std|rank)_")
+
+
+def _as_frame(all_grid_results) -> pd.DataFrame:
+    if isinstance(all_grid_results, pd.DataFrame):
+        return all_grid_results.reset_index(drop=True)
+    return pd.concat(list(all_grid_results), ignore_index=True)
+
+
+def _params_text(params) -> str:
+    if not isinstance(params, dict):
+        return "{}"
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def tidy_grid_results(all_grid_results):
+    """
+    Normaliza los cv_results_ de evaluate_*_models en dos tablas tipadas:
+
+    - candidates: una fila por (Model, candidate) con params (JSON), las columnas mean_*, std_* y
+      rank_* originales
+    - folds: formato largo con una fila por (Model, candidate, fold, split, scorer) y su score
+
+    Parámetros:
+    - all_grid_results: DataFrame o lista de DataFrames con cv_results_ y la columna 'Model'
+
+    Retorna:
+    - (candidates, folds)
+    """
+    df = _as_frame(all_grid_results)
+    names = df["Model"].astype(str)
+    model = pd.Categorical(names, categories=pd.unique(names))  # orden de aparición, como en los gráficos
+    candidate = df.groupby("Model", sort=False).cumcount().to_numpy(dtype=np.int32)
+
+    candidates = pd.DataFrame({"Model": model, "candidate": candidate,
+                               "params": df["params"].map(_params_text).to_numpy(dtype=object)})
+    for col in df.columns:
+        if _SUMMARY_COLUMN.match(col):
+            candidates[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+
+    split_columns = [(col, _SPLIT_COLUMN.match(col)) for col in df.columns]
+    split_columns = [(col, match) for col, match in split_columns if match]
+    if split_columns:
+        values = df[[col for col, _ in split_columns]].to_numpy(dtype=np.float64)
+        n_rows, n_cols = values.shape
+        folds = pd.DataFrame({
+            "Model": pd.Categorical.from_codes(np.repeat(model.codes, n_cols), model.categories),
+            "candidate": np.repeat(candidate, n_cols),
+            "fold": np.tile([int(match.group(1)) for _, match in split_columns], n_rows).astype(np.int16),
+            "split": pd.Categorical(np.tile([match.group(2) for _, match in split_columns], n_rows)),
+            "scorer": pd.Categorical(np.tile([match.group(3) for _, match in split_columns], n_rows)),
+            "score": values.ravel(),
+        })
+    else:
+        folds = pd.DataFrame({"Model": pd.Categorical([]), "candidate": np.array([], dtype=np.int32),
+                              "fold": np.array([], dtype=np.int16), "split": pd.Categorical([]),
+                              "scorer": pd.Categorical([]), "score": np.array([], dtype=np.float64)})
+    return candidates, folds
+
+
+def grid_fingerprint(all_grid_results) -> str:
+    """
+    Hash del contenido de los resultados (modelo, params y puntajes) para saber si un caché sigue vigente.
+    """
+    df = _as_frame(all_grid_results)
+    numeric = df.select_dtypes(include="number")
+    keys = pd.DataFrame({"Model": df["Model"].astype(str), "params": df["params"].map(_params_text)})
+    digest = hashlib.sha256()
+    digest.update(",".join(numeric.columns).encode())
+    digest.update(pd.util.hash_pandas_object(keys, index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(numeric, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class GridResults:
+    """
+    Resultados de búsqueda de hiperparámetros de todos los modelos, normalizados una sola vez
+    (ver tidy_grid_results) y con consultas vectorizadas que reutilizan los gráficos de plotter.
+
+    Los puntajes siguen la convención de sklearn (mayor es mejor: neg_root_mean_squared_error,
+    accuracy, ...). maximize=False solo cambia el signo del valor que se reporta (RMSE positivo).
+    """
+
+    def __init__(self, candidates: pd.DataFrame, folds: pd.DataFrame, fingerprint: str = None):
+        self.candidates = candidates
+        self.folds = folds
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def from_cv_results(cls, all_grid_results):
+        candidates, folds = tidy_grid_results(all_grid_results)
+        return cls(candidates, folds, grid_fingerprint(all_grid_results))
+
+    @classmethod
+    def coerce(cls, all_grid_results):
+        # Los gráficos aceptan tanto GridResults como la lista de DataFrames de siempre
+        if isinstance(all_grid_results, cls):
+            return all_grid_results
+        return cls.from_cv_results(all_grid_results)
+
+    @property
+    def models(self) -> list:
+        return list(self.candidates["Model"].cat.categories)
+
+    def metric(self, column: str = "mean_test_score", maximize: bool = True) -> pd.Series:
+        values = self.candidates[column]
+        return values if maximize else -values
+
+    def best(self, column: str = "mean_test_score", maximize: bool = True, metric_name: str = "metric_val") -> pd.DataFrame:
+        """
+        Mejor candidato de cada modelo (mayor puntaje en column), con el valor reportado en metric_name.
+        """
+        return self._pick(column, maximize, metric_name, "idxmax")
+
+    def worst(self, column: str = "mean_test_score", maximize: bool = True, metric_name: str = "metric_val") -> pd.DataFrame:
+        return self._pick(column, maximize, metric_name, "idxmin")
+
+    def _pick(self, column, maximize, metric_name, how):
+        scores = self.candidates[column]
+        valid = scores.notna()
+        index = getattr(scores[valid].groupby(self.candidates["Model"][valid], observed=True), how)()
+        picked = self.candidates.loc[index.to_numpy()].copy()
+        picked[metric_name] = self.metric(column, maximize).loc[picked.index]
+        return picked.reset_index(drop=True)
+
+    def ranks(self, column: str = "mean_test_score") -> pd.DataFrame:
+        """
+        Candidatos con su ranking dentro del modelo (rank_model) y entre todos los modelos (rank_global);
+        1 es el mejor.
+        """
+        scores = self.candidates[column]
+        ranked = self.candidates.copy()
+        ranked["rank_model"] = scores.groupby(self.candidates["Model"], observed=True).rank(
+            method="min", ascending=False).astype("Int32")
+        ranked["rank_global"] = scores.rank(method="min", ascending=False).astype("Int32")
+        return ranked.sort_values(["rank_global", "Model", "candidate"], ignore_index=True)
+
+    def fold_scores(self, split: str = "test", scorer: str = "score", maximize: bool = True,
+                    metric_name: str = "metric_val", candidates: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        Puntaje de cada fold (formato largo). Con candidates (p. ej. el resultado de best) se
+        filtran solo esos (Model, candidate).
+        """
+        folds = self.folds[(self.folds["split"] == split).to_numpy() & (self.folds["scorer"] == scorer).to_numpy()]
+        if candidates is not None:
+            keys = pd.MultiIndex.from_arrays([candidates["Model"].astype(str), candidates["candidate"]])
+            folds = folds[pd.MultiIndex.from_arrays([folds["Model"].astype(str), folds["candidate"]]).isin(keys)]
+        folds = folds.reset_index(drop=True)
+        folds[metric_name] = folds["score"] if maximize else -folds["score"]
+        return folds
+
+    def save(self, directory: str, compression: str = "zstd"):
+        """
+        Guarda candidates y folds como Parquet y un manifest.json con el fingerprint de los resultados.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.candidates.to_parquet(os.path.join(directory, "candidates.parquet"), index=False, compression=compression)
+        self.folds.to_parquet(os.path.join(directory, "folds.parquet"), index=False, compression=compression)
+        manifest = {"fingerprint": self.fingerprint, "models": self.models,
+                    "candidates": len(self.candidates), "folds": len(self.folds)}
+        with open(os.path.join(directory, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        return manifest
+
+    @classmethod
+    def load(cls, directory: str):
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+        return cls(pd.read_parquet(os.path.join(directory, "candidates.parquet")),
+                   pd.read_parquet(os.path.join(directory, "folds.parquet")), manifest["fingerprint"])
+
+    @classmethod
+    def cached(cls, directory: str, all_grid_results=None):
+        """
+        Lee los resultados normalizados de directory. Si se pasan all_grid_results y no coinciden
+        con el caché (o no hay caché) se normalizan de nuevo y se guardan.
+        """
+        manifest_path = os.path.join(directory, "manifest.json")
+        if all_grid_results is None:
+            return cls.load(directory)
+        fingerprint = grid_fingerprint(all_grid_results)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                if json.load(f).get("fingerprint") == fingerprint:
+                    return cls.load(directory)
+        candidates, folds = tidy_grid_results(all_grid_results)
+        results = cls(candidates, folds, fingerprint)
+        results.save(directory)
+        return results
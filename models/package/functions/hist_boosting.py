@@ -0,0 +1,123 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+
+# HistGradientBoosting admite como máximo max_bins (255) categorías por columna categórica nativa
+MAX_BINS = 255
+
+# Valores por defecto para la búsqueda: muchas iteraciones y early stopping sobre el 10% del train
+HIST_GB_DEFAULTS = {
+    'max_iter': 500,
+    'early_stopping': True,
+    'validation_fraction': 0.1,
+    'n_iter_no_change': 10,
+    'random_state': 42,
+}
+
+
+def _columns(feature_types: dict, target_column: str = None) -> list:
+    return [col for col in feature_types if col != target_column]
+
+
+def categorical_mask(feature_types: dict, encoder=None, target_column: str = None, max_bins: int = MAX_BINS,
+                     verbose: bool = False) -> np.ndarray:
+    """
+    Máscara de columnas categóricas en el orden de las features (el mismo de prepare_*_data y
+    CustomPreprocessor), para categorical_features de HistGradientBoosting.
+
+    Las categóricas con más de max_bins categorías en el encoder (p. ej. referencia) quedan como
+    numéricas (su código ordinal), porque HistGradientBoosting no las admite como nativas.
+
+    Parámetros:
+    - feature_types: dict {columna: 'categorical' | 'numeric'}
+    - encoder: OrdinalEncoder entrenado (el de prepare_*_data) para conocer la cardinalidad
+    - target_column: columna objetivo a excluir si está en feature_types
+    - verbose: informa las categóricas que quedan como numéricas
+    """
+    columns = _columns(feature_types, target_column)
+    cat_cols = [col for col in columns if feature_types[col] == 'categorical']
+    cardinality = {}
+    if encoder is not None and hasattr(encoder, 'categories_'):
+        cardinality = {col: len(categories) for col, categories in zip(cat_cols, encoder.categories_)}
+
+    mask = np.zeros(len(columns), dtype=bool)
+    for i, col in enumerate(columns):
+        if feature_types[col] != 'categorical':
+            continue
+        if cardinality.get(col, 0) > max_bins:
+            if verbose:
+                print(f"'{col}' tiene {cardinality[col]} categorías (> {max_bins}): se usa como numérica (código ordinal).")
+            continue
+        mask[i] = True
+    return mask
+
+
+def make_hist_gradient_boosting(feature_types: dict, encoder=None, task: str = 'regression', target_column: str = None,
+                                **params):
+    """
+    HistGradientBoostingRegressor / Classifier con las categóricas nativas según feature_types y
+    early stopping (HIST_GB_DEFAULTS, que se pueden reemplazar con params).
+
+    Se usa como cualquier modelo de la grilla de evaluate_*_models:
+        {'HistGradientBoosting': {'model': make_hist_gradient_boosting(feature_types, encoder),
+                                  'params': {'learning_rate': [0.05, 0.1], 'max_leaf_nodes': [31, 63]}}}
+    """
+    if task not in ('regression', 'classification'):
+        raise ValueError("task must be 'regression' or 'classification'.")
+    estimator = HistGradientBoostingRegressor if task == 'regression' else HistGradientBoostingClassifier
+    mask = categorical_mask(feature_types, encoder, target_column, params.get('max_bins', MAX_BINS), verbose=True)
+    return estimator(categorical_features=mask if mask.any() else None, **{**HIST_GB_DEFAULTS, **params})
+
+
+class FeatureBinner(BaseEstimator, TransformerMixin):
+    """
+    Discretiza una vez las columnas numéricas en a lo sumo max_bins intervalos (cuantiles sobre una
+    submuestra, como el binning interno de HistGradientBoosting) y deja las categóricas como códigos.
+
+    Con los datos ya binned, cada ajuste de la búsqueda (candidato x fold) obtiene los mismos
+    intervalos sin volver a calcular cuantiles sobre valores continuos, y X se guarda en float32.
+    Los valores faltantes y los códigos negativos (categoría desconocida) quedan como NaN, que
+    HistGradientBoosting trata como faltantes.
+
+    Para usar el modelo con datos crudos el binner entrenado se pasa a CustomPreprocessor(binner=...).
+    """
+
+    def __init__(self, feature_types: dict, target_column: str = None, max_bins: int = MAX_BINS,
+                 subsample: int = 200_000, random_state: int = 42):
+        self.feature_types = feature_types
+        self.target_column = target_column
+        self.max_bins = max_bins
+        self.subsample = subsample
+        self.random_state = random_state
+
+    def _numeric_positions(self):
+        columns = _columns(self.feature_types, self.target_column)
+        return [i for i, col in enumerate(columns) if self.feature_types[col] == 'numeric']
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=np.float64)
+        rng = np.random.RandomState(self.random_state)
+        rows = rng.choice(len(X), self.subsample, replace=False) if len(X) > self.subsample else slice(None)
+        self.thresholds_ = {}
+        for position in self._numeric_positions():
+            values = X[rows, position]
+            values = values[~np.isnan(values)]
+            distinct = np.unique(values)
+            if len(distinct) <= self.max_bins:
+                thresholds = (distinct[:-1] + distinct[1:]) / 2  # un intervalo por valor distinto
+            else:
+                percentiles = np.linspace(0, 100, self.max_bins + 1)[1:-1]
+                thresholds = np.unique(np.percentile(values, percentiles, method='midpoint'))
+            self.thresholds_[position] = thresholds
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        X_binned = X.astype(np.float32)
+        X_binned[X_binned < 0] = np.nan  # códigos de categorías desconocidas
+        for position, thresholds in self.thresholds_.items():
+            values = X[:, position]
+            binned = np.searchsorted(thresholds, values, side='left').astype(np.float32)
+            binned[np.isnan(values)] = np.nan
+            X_binned[:, position] = binned
+        return X_binned
@@ -0,0 +1,257 @@
+import json
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier, SGDRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+from .model_transformer import CustomPreprocessor
+
+
+def update_encoder_categories(encoder: OrdinalEncoder, X_cat: pd.DataFrame) -> OrdinalEncoder:
+    """
+    Agrega al vocabulario de un OrdinalEncoder ya entrenado las categorías nuevas de X_cat.
+
+    Las categorías nuevas se agregan al final (después de NaN si el encoder lo tiene), así que los
+    códigos existentes, incluido el de NaN, no cambian y los pesos ya aprendidos siguen siendo
+    válidos. Las categorías quedan sin ordenar, por eso el encoder se entrena con las columnas como
+    object: así sklearn codifica con un diccionario y no con búsqueda binaria (CustomPreprocessor.transform
+    también pasa esas columnas como object).
+    """
+    for i, col in enumerate(X_cat.columns):
+        categories = encoder.categories_[i]
+        values = pd.unique(X_cat[col].dropna().astype(object).to_numpy())
+        new_values = pd.Index(values).difference(pd.Index(categories[~pd.isna(categories)]), sort=False)
+        if len(new_values) == 0:
+            continue
+        encoder.categories_[i] = np.concatenate([categories.astype(object), new_values.to_numpy(dtype=object)])
+    return encoder
+
+
+class IncrementalTrainer:
+    """
+    Entrenamiento incremental con estimadores que soportan partial_fit (SGDRegressor / SGDClassifier).
+
+    Cada llamada a partial_fit consume solo los registros nuevos respecto al checkpoint
+    (timestamp_column del último registro procesado): los posteriores y, con el mismo timestamp,
+    los que no se habían visto (según key_columns, o la fila completa) y actualiza:
+    - el vocabulario del OrdinalEncoder (categorías nuevas al final, códigos estables)
+    - las estadísticas del StandardScaler (partial_fit)
+    - el modelo, precedido de un StandardScaler propio sobre la salida de CustomPreprocessor
+      (SGD necesita todas las columnas en escala, incluidos los códigos ordinales)
+
+    save() escribe un pipeline versionado con la misma forma que save_pipeline_models
+    (("preprocessor", CustomPreprocessor), ("regressor", modelo)), que la API carga sin cambios.
+    """
+
+    def __init__(self, feature_types: dict, target_column: str, task: str = 'regression', model=None,
+                 classes: list = None, timestamp_column: str = 'fecha_inicio', key_columns: list = None):
+        if task not in ('regression', 'classification'):
+            raise ValueError("task must be 'regression' or 'classification'.")
+        self.feature_types = {col: t for col, t in feature_types.items() if col != target_column}
+        self.target_column = target_column
+        self.task = task
+        self.timestamp_column = timestamp_column
+        self.key_columns = key_columns
+        self.cat_cols = [col for col, t in self.feature_types.items() if t == 'categorical']
+        self.num_cols = [col for col, t in self.feature_types.items() if t == 'numeric']
+
+        if model is None:
+            model = SGDRegressor(random_state=42) if task == 'regression' else SGDClassifier(loss='log_loss', random_state=42)
+        if not hasattr(model, 'partial_fit'):
+            raise ValueError(f"{type(model).__name__} does not support partial_fit.")
+        self.model = Pipeline([("scaler", StandardScaler()), ("model", model)])
+
+        self.encoder = None
+        self.scaler = StandardScaler() if self.num_cols else None
+        self.target_encoder = None
+        if task == 'classification' and classes is not None:
+            self.target_encoder = OrdinalEncoder(categories=[list(classes)]).fit(pd.DataFrame({target_column: list(classes)}))
+
+        self.checkpoint = None  # timestamp del último registro procesado
+        self.checkpoint_keys = set()  # hashes de los registros ya procesados con timestamp == checkpoint
+        self.n_records_seen = 0
+        self.version = 0
+
+    def __setstate__(self, state):
+        # Estados guardados antes de deduplicar por llave en el checkpoint
+        state.setdefault('key_columns', None)
+        state.setdefault('checkpoint_keys', set())
+        self.__dict__.update(state)
+
+    def _record_keys(self, df: pd.DataFrame) -> np.ndarray:
+        columns = self.key_columns or list(df.columns)
+        return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+    def new_records(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Filtra los registros posteriores al checkpoint y los del mismo timestamp que todavía no
+        se procesaron (p.ej. registros que llegaron después de guardar el checkpoint).
+        """
+        if self.checkpoint is None:
+            return df
+        timestamps = pd.to_datetime(df[self.timestamp_column])
+        at_checkpoint = (timestamps == self.checkpoint).to_numpy()
+        keep = (timestamps > self.checkpoint).to_numpy()
+        if at_checkpoint.any():
+            seen = pd.Index(self._record_keys(df[at_checkpoint])).isin(list(self.checkpoint_keys))
+            keep[np.flatnonzero(at_checkpoint)[~seen]] = True
+        return df[keep]
+
+    def _advance_checkpoint(self, df: pd.DataFrame):
+        # El checkpoint avanza al mayor timestamp procesado y guarda las llaves de ese timestamp
+        timestamps = pd.to_datetime(df[self.timestamp_column])
+        latest = timestamps.max()
+        if pd.isna(latest):
+            return
+        keys = set(self._record_keys(df[(timestamps == latest).to_numpy()]).tolist())
+        if self.checkpoint is not None and latest == self.checkpoint:
+            self.checkpoint_keys |= keys
+        elif self.checkpoint is None or latest > self.checkpoint:
+            self.checkpoint, self.checkpoint_keys = latest, keys
+
+    def _encode_target(self, y: pd.Series) -> np.ndarray:
+        if self.task == 'regression':
+            return y.to_numpy(dtype=float)
+        if self.target_encoder is None:
+            # Sin clases explícitas se toman las del primer lote; partial_fit no admite clases nuevas después
+            classes = sorted(pd.unique(y.astype(object)))
+            self.target_encoder = OrdinalEncoder(categories=[classes]).fit(pd.DataFrame({self.target_column: classes}))
+        return self.target_encoder.transform(y.astype(object).to_frame()).ravel()
+
+    def partial_fit(self, df: pd.DataFrame, verbose: bool = True):
+        """
+        Actualiza encoder, scaler y modelo con los registros nuevos de df y avanza el checkpoint.
+
+        Parámetros:
+        - df: DataFrame (o chunk de iter_csv_data) con las features, el target y timestamp_column
+
+        Retorna:
+        - self
+        """
+        df = self.new_records(df)
+        columns = list(self.feature_types) + [self.target_column]
+        # SGD no admite valores faltantes: se descartan las filas incompletas
+        batch = df.loc[df[columns].notna().all(axis=1), columns]
+        if batch.empty:
+            if verbose:
+                print("No hay registros nuevos para entrenar.")
+            return self
+
+        if self.cat_cols:
+            X_cat = batch[self.cat_cols].astype(object)
+            if self.encoder is None:
+                self.encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1).fit(X_cat)
+            else:
+                update_encoder_categories(self.encoder, X_cat)
+        if self.scaler is not None:
+            self.scaler.partial_fit(batch[self.num_cols])
+
+        X = CustomPreprocessor(self.encoder, self.scaler, self.feature_types).transform(batch)
+        y = self._encode_target(batch[self.target_column])
+
+        self.model.named_steps["scaler"].partial_fit(X)
+        X_scaled = self.model.named_steps["scaler"].transform(X)
+        if self.task == 'classification':
+            classes = np.arange(len(self.target_encoder.categories_[0]), dtype=float)
+            self.model.named_steps["model"].partial_fit(X_scaled, y, classes=classes)
+        else:
+            self.model.named_steps["model"].partial_fit(X_scaled, y)
+
+        self._advance_checkpoint(df)
+        self.n_records_seen += len(batch)
+        if verbose:
+            print(f"Entrenados {len(batch)} registros nuevos ({len(df) - len(batch)} descartados por valores faltantes). "
+                  f"Checkpoint: {self.checkpoint}")
+        return self
+
+    def fit_chunks(self, chunks, verbose: bool = True):
+        """
+        Entrena con un iterable de chunks (por ejemplo iter_csv_data) en orden cronológico.
+        """
+        for chunk in chunks:
+            self.partial_fit(chunk, verbose=verbose)
+        return self
+
+    def build_pipeline(self):
+        """
+        Pipeline con el estado actual (mismo formato que save_pipeline_models y
+        save_pipeline_models_categorical_y en clasificación).
+        """
+        if self.n_records_seen == 0:
+            raise ValueError("The trainer has not seen any records yet.")
+        pipeline = Pipeline([
+            ("preprocessor", CustomPreprocessor(self.encoder, self.scaler, self.feature_types)),
+            ("regressor", self.model)
+        ])
+        if self.task == 'classification':
+            return {"pipeline": pipeline, "target_encoder": self.target_encoder}
+        return pipeline
+
+    def save(self, output_dir: str, name: str) -> str:
+        """
+        Guarda una nueva versión del pipeline (<name>_v0001_pipeline.joblib, ...) junto con el
+        estado del entrenador (<name>_incremental_state.joblib) y el checkpoint en JSON.
+
+        Retorna:
+        - ruta del pipeline guardado
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.version += 1
+        path = os.path.join(output_dir, f"{name}_v{self.version:04d}_pipeline.joblib")
+        joblib.dump(self.build_pipeline(), path)
+        joblib.dump(self, os.path.join(output_dir, f"{name}_incremental_state.joblib"))
+        with open(os.path.join(output_dir, f"{name}_checkpoint.json"), "w") as f:
+            json.dump({
+                "version": self.version,
+                "pipeline": os.path.basename(path),
+                "checkpoint": None if self.checkpoint is None else self.checkpoint.isoformat(),
+                "n_records_seen": self.n_records_seen,
+            }, f, indent=2)
+        print(f"Guardado pipeline: {path}")
+        return path
+
+    @staticmethod
+    def load(output_dir: str, name: str):
+        """
+        Carga el estado guardado por save(), o None si todavía no existe.
+        """
+        path = os.path.join(output_dir, f"{name}_incremental_state.joblib")
+        if not os.path.exists(path):
+            return None
+        return joblib.load(path)
+
+
+def train_incremental(data, feature_types: dict, target_column: str, output_dir: str, name: str,
+                      task: str = 'regression', model=None, classes: list = None,
+                      timestamp_column: str = 'fecha_inicio', key_columns: list = None, verbose: bool = True):
+    """
+    Continúa el entrenamiento desde el último checkpoint guardado en output_dir (o empieza uno nuevo)
+    con los registros posteriores al checkpoint, y guarda una nueva versión del pipeline.
+
+    Parámetros:
+    - data: DataFrame o iterable de chunks en orden cronológico
+    - feature_types: dict {columna: 'categorical' | 'numeric'}
+    - target_column: columna objetivo
+    - output_dir, name: ubicación y nombre de los pipelines versionados
+    - task: 'regression' o 'classification'
+    - model: estimador con partial_fit (por defecto SGDRegressor / SGDClassifier)
+    - key_columns: columnas que identifican un registro (p.ej. ['op', 'fecha_inicio', 'maquina']) para
+      no repetir los que comparten el timestamp del checkpoint; por defecto la fila completa
+
+    Retorna:
+    - trainer: IncrementalTrainer actualizado
+    - path: ruta del nuevo pipeline (None si no había registros nuevos)
+    """
+    trainer = IncrementalTrainer.load(output_dir, name)
+    if trainer is None:
+        trainer = IncrementalTrainer(feature_types, target_column, task=task, model=model, classes=classes,
+                                     timestamp_column=timestamp_column, key_columns=key_columns)
+
+    n_before = trainer.n_records_seen
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    trainer.fit_chunks(chunks, verbose=verbose)
+    if trainer.n_records_seen == n_before:
+        return trainer, None
+    return trainer, trainer.save(output_dir, name)
@@ -0,0 +1,277 @@
+import bz2
+import copy
+import hashlib
+import json
+import lzma
+import pickle
+import platform
+import struct
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+import sklearn
+
+try:
+    import zstandard
+except ImportError:  # Códec opcional: sin zstandard se usan los de la librería estándar
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# Encabezado: firma + largo del manifiesto (uint32 little-endian); después el manifiesto JSON y los payloads
+MAGIC = b"CADMODEL"
+FORMAT_VERSION = 1
+ARTIFACT_EXTENSION = ".cadm"
+_HEADER = struct.Struct("<8sI")
+
+CODECS = {
+    "none": (lambda data, level: data, lambda data: data),
+    "zlib": (lambda data, level: zlib.compress(data, level), zlib.decompress),
+    "bz2": (lambda data, level: bz2.compress(data, level), bz2.decompress),
+    "lzma": (lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+}
+if zstandard is not None:
+    CODECS["zstd"] = (lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+                      lambda data: zstandard.ZstdDecompressor().decompress(data))
+if lz4_frame is not None:
+    CODECS["lz4"] = (lambda data, level: lz4_frame.compress(data, compression_level=level), lz4_frame.decompress)
+
+# Arreglos que nunca se pasan a float32: los umbrales de los árboles compilados se comparan
+# exactamente contra el valor de la feature y redondearlos cambia la rama en los empates
+FLOAT32_UNSAFE = {"threshold"}
+
+
+def _float64_arrays(obj, path="", seen=None):
+    """
+    Recorre pipelines, dicts, listas y atributos de estimadores y retorna (dueño, clave, ruta, arreglo)
+    para cada arreglo float64. Los objetos sin __dict__ (p. ej. sklearn.tree._tree.Tree) no se tocan.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return []
+    seen.add(id(obj))
+
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, (list, tuple)):
+        items = enumerate(obj)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        items = vars(obj).items()
+    else:
+        return []
+
+    found = []
+    for key, value in items:
+        child_path = f"{path}.{key}" if path else str(key)
+        if isinstance(value, np.ndarray):
+            if value.dtype == np.float64:
+                found.append((obj, key, child_path, value))
+        elif isinstance(value, (dict, list, tuple)) or hasattr(value, "__dict__"):
+            found.extend(_float64_arrays(value, child_path, seen))
+    return found
+
+
+def _replace(owner, key, value):
+    if isinstance(owner, (dict, list)):
+        owner[key] = value
+    elif isinstance(owner, tuple):
+        raise TypeError("Cannot replace an item of a tuple.")
+    else:
+        setattr(owner, key, value)
+
+
+def _predictions(model, X_sample):
+    pipeline = model["pipeline"] if isinstance(model, dict) else model
+    method = getattr(pipeline, "predict_proba", None) or pipeline.predict
+    return np.asarray(method(X_sample), dtype=np.float64)
+
+
+def downcast_float32(model, X_sample, rtol: float = 1e-5, atol: float = 1e-6, min_size: int = 256):
+    """
+    Pasa a float32 los arreglos float64 del modelo (coef_, datos de KNN, arreglos compilados, ...)
+    cuando no cambian las predicciones sobre X_sample. Cada arreglo se prueba por separado y se
+    revierte si las predicciones dejan de coincidir con las originales dentro de rtol / atol.
+
+    Parámetros:
+    - model: pipeline o dict {"pipeline", "target_encoder"} (se modifica en el lugar)
+    - X_sample: filas de validación con las columnas del preprocesador
+    - min_size: los arreglos más chicos no se tocan (el ahorro no compensa)
+
+    Retorna:
+    - lista con la ruta de cada arreglo convertido
+    """
+    expected = _predictions(model, X_sample)
+    converted = []
+    for owner, key, path, array in _float64_arrays(model):
+        if array.size < min_size or str(key) in FLOAT32_UNSAFE or isinstance(owner, tuple):
+            continue
+        _replace(owner, key, array.astype(np.float32))
+        try:
+            ok = np.allclose(_predictions(model, X_sample), expected, rtol=rtol, atol=atol)
+        except Exception:
+            ok = False
+        if ok:
+            converted.append(path)
+        else:
+            _replace(owner, key, array)
+    return converted
+
+
+def _model_info(model) -> dict:
+    """
+    Nombre del estimador, tarea, features (con su tipo categórico/numérico) y clases del modelo.
+    """
+    pipeline = model["pipeline"] if isinstance(model, dict) else model
+    estimator = pipeline.steps[-1][1] if hasattr(pipeline, "steps") else pipeline
+    info = {"estimator": f"{type(estimator).__module__}.{type(estimator).__name__}",
+            "task": "classification" if hasattr(estimator, "predict_proba") else "regression"}
+
+    preprocessor = getattr(pipeline, "named_steps", {}).get("preprocessor")
+    if preprocessor is not None and hasattr(preprocessor, "features"):
+        info["features"] = dict(preprocessor.features)
+    elif hasattr(estimator, "feature_names_in_"):
+        info["features"] = {name: "numeric" for name in estimator.feature_names_in_}
+
+    target_encoder = model.get("target_encoder") if isinstance(model, dict) else None
+    classes = getattr(estimator, "classes_", None)
+    if target_encoder is not None and hasattr(target_encoder, "categories_"):
+        classes = target_encoder.categories_[0]
+    if classes is not None:
+        info["classes"] = [c.item() if hasattr(c, "item") else c for c in np.asarray(classes).tolist()]
+    return info
+
+
+def save_artifact(models: dict, path: str, metrics: dict = None, codec: str = "zlib", level: int = 3,
+                  X_sample=None, float32: bool = True) -> dict:
+    """
+    Guarda uno o varios modelos en un artefacto versionado: manifiesto JSON + un payload
+    comprimido por modelo. Para clasificación el dict {"pipeline", "target_encoder"} se guarda tal cual.
+
+    Parámetros:
+    - models: {nombre_modelo: pipeline o dict}
+    - path: ruta del archivo (.cadm)
+    - metrics: {nombre_modelo: {métrica: valor}} que se copian al manifiesto
+    - codec: 'zlib', 'bz2', 'lzma', 'none' (y 'zstd' / 'lz4' si están instalados)
+    - level: nivel de compresión del códec
+    - X_sample: filas para validar la conversión a float32 (sin X_sample no se convierte nada)
+    - float32: intenta pasar a float32 los arreglos donde no cambia las predicciones
+
+    Retorna:
+    - manifiesto escrito
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}'. Available: {sorted(CODECS)}.")
+    compress = CODECS[codec][0]
+    metrics = metrics or {}
+
+    entries, payloads, offset = {}, [], 0
+    for name, model in models.items():
+        converted = []
+        if float32 and X_sample is not None:
+            model = copy.deepcopy(model)
+            converted = downcast_float32(model, X_sample)
+        raw = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+        payload = compress(raw, level)
+        entries[name] = {
+            **_model_info(model),
+            "metrics": {k: float(v) for k, v in metrics.get(name, {}).items()},
+            "offset": offset,
+            "length": len(payload),
+            "raw_length": len(raw),
+            "codec": codec,
+            "level": level,
+            "sha256": hashlib.sha256(payload).hexdigest(),
+            "float32": converted,
+        }
+        payloads.append(payload)
+        offset += len(payload)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "hash": hashlib.sha256("".join(e["sha256"] for e in entries.values()).encode()).hexdigest(),
+        "libraries": {"python": platform.python_version(), "numpy": np.__version__, "sklearn": sklearn.__version__},
+        "models": entries,
+    }
+    manifest_bytes = json.dumps(manifest, ensure_ascii=False, default=str).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        for payload in payloads:
+            f.write(payload)
+    return manifest
+
+
+def is_artifact(path: str) -> bool:
+    """
+    True si el archivo empieza con la firma del formato (independiente de la extensión).
+    """
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _read_header(f):
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError("File is too short to be a model artifact.")
+    magic, manifest_length = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("Not a model artifact (bad signature).")
+    manifest = json.loads(f.read(manifest_length).decode("utf-8"))
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {manifest.get('format_version')} "
+                         f"(expected {FORMAT_VERSION}).")
+    return manifest, _HEADER.size + manifest_length
+
+
+def read_manifest(path: str) -> dict:
+    """
+    Lee solo el manifiesto (sin tocar los payloads).
+    """
+    with open(path, "rb") as f:
+        return _read_header(f)[0]
+
+
+def load_artifact(path: str, model_name: str = None, expected_features=None, verify: bool = True):
+    """
+    Carga un modelo de un artefacto leyendo únicamente su payload.
+
+    Parámetros:
+    - model_name: modelo a cargar; puede omitirse si el artefacto tiene uno solo
+    - expected_features: nombres de features que se esperan (p. ej. las del config de la API);
+      si no coinciden con las del manifiesto se lanza ValueError
+    - verify: comprueba el sha256 del payload antes de deserializarlo
+
+    Retorna:
+    - el pipeline (o dict {"pipeline", "target_encoder"}) tal como se guardó
+    """
+    with open(path, "rb") as f:
+        manifest, payload_start = _read_header(f)
+        models = manifest["models"]
+        if model_name is None:
+            if len(models) != 1:
+                raise ValueError(f"Artifact has several models, choose one of {list(models)}.")
+            model_name = next(iter(models))
+        if model_name not in models:
+            raise KeyError(f"Model '{model_name}' not found in artifact. Available: {list(models)}.")
+        entry = models[model_name]
+
+        if expected_features is not None and "features" in entry:
+            if set(expected_features) != set(entry["features"]):
+                raise ValueError(f"Feature mismatch for '{model_name}': artifact has {sorted(entry['features'])}, "
+                                 f"expected {sorted(expected_features)}.")
+        if entry["codec"] not in CODECS:
+            raise ValueError(f"Codec '{entry['codec']}' is not available in this environment.")
+
+        f.seek(payload_start + entry["offset"])
+        payload = f.read(entry["length"])
+
+    if len(payload) != entry["length"]:
+        raise ValueError(f"Artifact is truncated: payload of '{model_name}' is incomplete.")
+    if verify and hashlib.sha256(payload).hexdigest() != entry["sha256"]:
+        raise ValueError(f"Checksum mismatch for '{model_name}': the artifact is corrupted.")
+    return pickle.loads(CODECS[entry["codec"]][1](payload))
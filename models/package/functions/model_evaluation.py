@@ -1,7 +1,6 @@
-import time
 import pandas as pd
-from sklearn.model_selection import GridSearchCV, cross_val_predict
 from sklearn.metrics import auc, mean_absolute_error, mean_squared_error, precision_recall_curve, r2_score, roc_auc_score, root_mean_squared_error
+from .model_selection import run_model_selection
 
 
 def evaluate_regression_models(
@@ -11,10 +10,15 @@ def evaluate_regression_models(
     X_test=None,
     y_test=None,
     scoring: str = "neg_root_mean_squared_error",
-    cv: int = 5
+    cv: int = 5,
+    search: str = "grid",
+    n_iter: int = 10,
+    n_jobs: int = -1,
+    cache=None
 ):
     """
-    Evaluate multiple regression models using GridSearchCV and cross-validation metrics.
+    Evaluate multiple regression models with the shared-fold model selection engine
+    (run_model_selection) and cross-validation metrics.
     Optionally evaluate on test set.
 
     Parameters:
@@ -25,10 +29,16 @@ def evaluate_regression_models(
     - y_test: optional, test target
     - scoring: scoring method for GridSearchCV
     - cv: number of cross-validation folds
+    - search: 'grid', 'random' (n_iter candidates per model) or 'halving'
+    - n_iter: candidates per model for random search
+    - n_jobs: processes shared by all (model, params, fold) fits
+    - cache: optional ExperimentCache or directory; fits already computed on the same data, folds
+      and params are reloaded instead of refitted
 
     Returns:
     - tuned_results: dict with best models and metrics (train CV and test if provided)
-    - summary_metrics: DataFrame summarizing metrics for all models
+    - summary_metrics: DataFrame summarizing metrics for all models ("CV Fit Time (s)" is the summed fit +
+      score time of the model's CV fits, not wall-clock time: all models share one process pool)
     - all_grid_results: DataFrame with full grid search results
     - best_models: dict with best estimators per model_name
     """
@@ -37,24 +47,17 @@ def evaluate_regression_models(
     all_grid_results = []
     best_models = {}
 
-    for name, config in models.items():
-        print(f"Evaluating: {name}")
-        start_time = time.time()
-
-        grid = GridSearchCV(
-            estimator=config["model"],
-            param_grid=config["params"],
-            cv=cv,
-            scoring=scoring,
-            n_jobs=-1
-        )
+    selection = run_model_selection(models, X_train, y_train, scoring=scoring, cv=cv, search=search,
+                                    n_iter=n_iter, n_jobs=n_jobs, classifier=False, cache=cache)
 
-        grid.fit(X_train, y_train)
-        best_model = grid.best_estimator_
-        training_time = time.time() - start_time
+    for name in models:
+        print(f"Evaluating: {name}")
+        grid = selection[name]
+        best_model = grid["best_model"]
+        fit_time = grid["fit_time"]
 
-        # CV predictions on training set
-        y_pred_cv = cross_val_predict(best_model, X_train, y_train, cv=cv)
+        # CV predictions on training set (from the same fold fits of the search)
+        y_pred_cv = grid["y_pred_cv"]
 
         # Metrics on training CV
         rmse_cv = root_mean_squared_error(y_train, y_pred_cv)
@@ -72,14 +75,14 @@ def evaluate_regression_models(
 
         result_metrics = {
             "Best Model": best_model,
-            "Best Params": grid.best_params_,
+            "Best Params": grid["best_params"],
             "RMSE CV": rmse_cv,
             "MAE CV": mae_cv,
             "R2 CV": r2_cv,
             "RMSE Test": rmse_test,
             "MAE Test": mae_test,
             "R2 Test": r2_test,
-            "Training Time (s)": training_time
+            "CV Fit Time (s)": fit_time
         }
 
         tuned_results[name] = result_metrics
@@ -88,7 +91,7 @@ def evaluate_regression_models(
         print(pd.Series(result_metrics).drop("Best Model"))
         print("\n" + "=" * 50 + "\n")
 
-        grid_df = pd.DataFrame(grid.cv_results_)
+        grid_df = grid["cv_results"]
         grid_df["Model"] = name
         all_grid_results.append(grid_df)
 
@@ -98,10 +101,8 @@ def evaluate_regression_models(
 
     return tuned_results, summary_metrics, pd.concat(all_grid_results, ignore_index=True), best_models
 
-from sklearn.model_selection import GridSearchCV, cross_val_predict
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 import pandas as pd
-import time
 
 def evaluate_classification_models(
     models: dict,
@@ -111,10 +112,15 @@ def evaluate_classification_models(
     y_test=None,
     scoring: str = "accuracy",
     cv: int = 5,
-    average: str = "weighted"  # para precision, recall, f1 en multiclass
+    average: str = "weighted",  # para precision, recall, f1 en multiclass
+    search: str = "grid",
+    n_iter: int = 10,
+    n_jobs: int = -1,
+    cache=None
 ):
     """
-    Evaluate multiple classification models using GridSearchCV and cross-validation metrics.
+    Evaluate multiple classification models with the shared-fold model selection engine
+    (run_model_selection) and cross-validation metrics.
     Optionally evaluate on test set.
 
     Parameters:
@@ -124,10 +130,15 @@ def evaluate_classification_models(
     - scoring: scoring for GridSearchCV (e.g. 'accuracy', 'f1_weighted')
     - cv: cross-validation folds
     - average: method for averaging metrics in multiclass (default 'weighted')
+    - search: 'grid', 'random' (n_iter candidates per model) or 'halving'
+    - n_iter: candidates per model for random search
+    - n_jobs: processes shared by all (model, params, fold) fits
+    - cache: optional ExperimentCache or directory; fits already computed on the same data, folds
+      and params are reloaded instead of refitted
 
     Returns:
     - tuned_results: dict with best models and metrics
-    - summary_metrics: DataFrame summary of metrics per model
+    - summary_metrics: DataFrame summary of metrics per model ("CV Fit Time (s)" as in evaluate_regression_models)
     - all_grid_results: DataFrame with full grid search results
     - best_models: dict with best estimators
     """
@@ -136,24 +147,17 @@ def evaluate_classification_models(
     all_grid_results = []
     best_models = {}
 
-    for name, config in models.items():
-        print(f"Evaluating: {name}")
-        start_time = time.time()
-
-        grid = GridSearchCV(
-            estimator=config["model"],
-            param_grid=config["params"],
-            cv=cv,
-            scoring=scoring,
-            n_jobs=-1
-        )
+    selection = run_model_selection(models, X_train, y_train, scoring=scoring, cv=cv, search=search,
+                                    n_iter=n_iter, n_jobs=n_jobs, classifier=True, cache=cache)
 
-        grid.fit(X_train, y_train)
-        best_model = grid.best_estimator_
-        training_time = time.time() - start_time
+    for name in models:
+        print(f"Evaluating: {name}")
+        grid = selection[name]
+        best_model = grid["best_model"]
+        fit_time = grid["fit_time"]
 
-        # CV predictions on training set
-        y_pred_cv = cross_val_predict(best_model, X_train, y_train, cv=cv)
+        # CV predictions and probabilities on training set (from the same fold fits of the search)
+        y_pred_cv = grid["y_pred_cv"]
 
         # Metrics on training CV
         acc_cv = accuracy_score(y_train, y_pred_cv)
@@ -161,7 +165,7 @@ def evaluate_classification_models(
         rec_cv = recall_score(y_train, y_pred_cv, average=average, zero_division=0)
         f1_cv = f1_score(y_train, y_pred_cv, average=average, zero_division=0)
 
-        y_score_cv = cross_val_predict(best_model, X_train, y_train, cv=cv, method='predict_proba')[:, 1]
+        y_score_cv = grid["y_proba_cv"][:, 1]
 
         # Calcular ROC AUC en entrenamiento CV:
         roc_auc_cv = roc_auc_score(y_train, y_score_cv)
@@ -181,11 +185,11 @@ def evaluate_classification_models(
             precision_test, recall_test, _ = precision_recall_curve(y_test, y_score_test)
             auc_pr_test = auc(recall_test, precision_test)
         else:
-            acc_test = prec_test = rec_test = f1_test =roc_auc_test= None
+            acc_test = prec_test = rec_test = f1_test =roc_auc_test=auc_pr_test= None
 
         result_metrics = {
             "Best Model": best_model,
-            "Best Params": grid.best_params_,
+            "Best Params": grid["best_params"],
             "ROC AUC CV": roc_auc_cv,
             "PR AUC CV":auc_pr_cv,
             "Accuracy CV": acc_cv,
@@ -198,7 +202,7 @@ def evaluate_classification_models(
             "Precision Test": prec_test,
             "Recall Test": rec_test,
             "F1 Score Test": f1_test,
-            "Training Time (s)": training_time
+            "CV Fit Time (s)": fit_time
         }
 
         tuned_results[name] = result_metrics
@@ -207,7 +211,7 @@ def evaluate_classification_models(
         print(pd.Series(result_metrics).drop("Best Model"))
         print("\n" + "=" * 50 + "\n")
 
-        grid_df = pd.DataFrame(grid.cv_results_)
+        grid_df = grid["cv_results"]
         grid_df["Model"] = name
         all_grid_results.append(grid_df)
 
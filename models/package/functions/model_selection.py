@@ -0,0 +1,361 @@
+import time
+import warnings
+from itertools import chain
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from sklearn.base import clone, is_classifier
+from sklearn.exceptions import FitFailedWarning
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, ParameterSampler, check_cv
+from sklearn.utils import _safe_indexing
+
+from .experiment_cache import ExperimentCache, dataset_fingerprint, estimator_fingerprint, fold_fingerprint
+
+
+class _PrecomputedResponses:
+    """
+    Estimador ajustado visto por el scorer: predict / predict_proba devuelven las salidas ya
+    calculadas sobre el fold de validación; todo lo demás (classes_, decision_function, tags)
+    se delega al estimador.
+    """
+
+    def __init__(self, estimator, responses: dict):
+        self._estimator = estimator
+        self._responses = responses
+
+    def __getattr__(self, name):
+        if name in self._responses:
+            response = self._responses[name]
+
+            def precomputed(X, **kwargs):
+                return response
+
+            # Los scorers de sklearn (>= 1.4) eligen la salida por el __name__ del método
+            precomputed.__name__ = name
+            return precomputed
+        return getattr(self._estimator, name)
+
+
+def _fit_and_score(estimator, params, X, y, train, test, scorer, with_proba):
+    """
+    Ajusta una combinación (modelo, params) en un fold y devuelve su score junto con las
+    predicciones (y probabilidades) sobre el fold de validación, para no tener que reajustar
+    después con cross_val_predict. El scorer usa esas mismas predicciones (una sola predicción
+    por fold).
+
+    Si el ajuste o la evaluación fallan, el score es NaN (como error_score=np.nan en GridSearchCV)
+    y se devuelve el error para avisar desde el proceso principal.
+
+    Retorna:
+    - (score, y_pred, y_proba, fit_time, score_time)
+    - error: descripción de la excepción, o None
+    """
+    est = clone(estimator).set_params(**params)
+    X_train, y_train = _safe_indexing(X, train), _safe_indexing(y, train)
+    X_test, y_test = _safe_indexing(X, test), _safe_indexing(y, test)
+
+    fit_time = score_time = 0.0
+    start = time.time()
+    try:
+        est.fit(X_train, y_train)
+        fit_time = time.time() - start
+
+        start = time.time()
+        responses = {"predict": est.predict(X_test)}
+        if with_proba and hasattr(est, "predict_proba"):
+            responses["predict_proba"] = est.predict_proba(X_test)
+        score = scorer(_PrecomputedResponses(est, responses), X_test, y_test)
+        score_time = time.time() - start
+    except Exception as e:
+        return (np.nan, None, None, fit_time, score_time), f"{type(e).__name__}: {e}"
+    return (score, responses["predict"], responses.get("predict_proba"), fit_time, score_time), None
+
+
+def _fit_task(key, estimator, params, X, y, train, test, scorer, with_proba):
+    # Envoltorio para el pool: devuelve la clave de la tarea junto con su resultado
+    return (key,) + _fit_and_score(estimator, params, X, y, train, test, scorer, with_proba)
+
+
+def _run_tasks(parallel, tasks, cache, models, candidates):
+    # Resultados de las tareas a medida que terminan; con caché, cada ajuste nuevo se guarda al llegar
+    for task_key, result, error in parallel(tasks):
+        name, cand_idx, fold_idx = task_key[:3]
+        if error is not None:
+            # Los ajustes fallidos no se guardan en el caché: pueden deberse a un error transitorio
+            warnings.warn(f"Fit failed for {name} with params {candidates[name][cand_idx]} on fold {fold_idx}, "
+                          f"its score is set to NaN. {error}", FitFailedWarning)
+        elif cache is not None:
+            _, _, _, _, fit_key, n_train = task_key
+            cache.put(fit_key, result, model=name, estimator=models[name]["model"],
+                      params=candidates[name][cand_idx], fold=fold_idx, n_train=n_train)
+        yield task_key[:4], result
+
+
+def _candidates(config: dict, search: str, n_iter: int, random_state: int):
+    params = config.get("params") or {}
+    if search == "random" and params:
+        # Con listas, ParameterSampler muestrea sin reemplazo (a lo sumo toda la grilla)
+        return list(ParameterSampler(params, n_iter=n_iter, random_state=random_state))
+    return list(ParameterGrid(params))
+
+
+def _subsample(train, n_resources: int, random_state: int):
+    # Submuestra reproducible del fold de entrenamiento para las rondas de successive halving
+    if n_resources >= len(train):
+        return train
+    rng = np.random.RandomState(random_state)
+    return np.sort(rng.choice(train, size=n_resources, replace=False))
+
+
+class _CandidateState:
+    """
+    Acumula los folds de cada candidato y conserva solo las predicciones fuera de fold
+    del mejor candidato de cada modelo (memoria acotada aunque la grilla sea grande).
+    """
+
+    def __init__(self, n_samples: int, n_splits: int):
+        self.n_samples = n_samples
+        self.n_splits = n_splits
+        self.pending = {}
+        self.best = {}
+
+    def add(self, name, cand_idx, fold_idx, test, result, keep_predictions):
+        folds = self.pending.setdefault((name, cand_idx), {})
+        folds[fold_idx] = (test,) + result
+        if len(folds) < self.n_splits:
+            return None
+        del self.pending[(name, cand_idx)]
+
+        scores = np.array([folds[k][1] for k in range(self.n_splits)], dtype=float)
+        mean_score = np.nan_to_num(scores.mean(), nan=-np.inf)
+        # Un candidato con algún fold fallido no tiene predicciones completas: no puede ser el mejor
+        if keep_predictions and not np.isnan(scores).any():
+            best = self.best.get(name)
+            # Mismo desempate que GridSearchCV: ante empate gana el candidato de menor índice
+            if best is None or mean_score > best["mean_score"] or (mean_score == best["mean_score"] and cand_idx < best["cand_idx"]):
+                y_pred, y_proba = None, None
+                for k in range(self.n_splits):
+                    test_k, _, pred_k, proba_k = folds[k][:4]
+                    if y_pred is None:
+                        y_pred = np.empty(self.n_samples, dtype=np.asarray(pred_k).dtype)
+                        if proba_k is not None:
+                            y_proba = np.empty((self.n_samples, proba_k.shape[1]), dtype=proba_k.dtype)
+                    y_pred[test_k] = pred_k
+                    if y_proba is not None:
+                        y_proba[test_k] = proba_k
+                self.best[name] = {"cand_idx": cand_idx, "mean_score": mean_score, "y_pred": y_pred, "y_proba": y_proba}
+        return scores, [folds[k][4] for k in range(self.n_splits)], [folds[k][5] for k in range(self.n_splits)]
+
+
+def _results_frame(candidates, fold_scores, fit_times, score_times, extra=None):
+    """
+    Arma un DataFrame con el mismo formato que GridSearchCV.cv_results_.
+    """
+    n_splits = fold_scores.shape[1]
+    results = {"mean_fit_time": fit_times.mean(axis=1), "std_fit_time": fit_times.std(axis=1),
+               "mean_score_time": score_times.mean(axis=1), "std_score_time": score_times.std(axis=1)}
+    param_names = sorted({key for params in candidates for key in params})
+    for key in param_names:
+        results[f"param_{key}"] = [params.get(key, np.nan) for params in candidates]
+    results["params"] = candidates
+    for k in range(n_splits):
+        results[f"split{k}_test_score"] = fold_scores[:, k]
+    results["mean_test_score"] = fold_scores.mean(axis=1)
+    results["std_test_score"] = fold_scores.std(axis=1)
+    ranks = pd.Series(np.nan_to_num(results["mean_test_score"], nan=-np.inf)).rank(method="min", ascending=False)
+    results["rank_test_score"] = ranks.astype(int).to_numpy()
+    if extra:
+        results.update(extra)
+    return pd.DataFrame(results)
+
+
+def run_model_selection(
+    models: dict,
+    X,
+    y,
+    scoring: str = None,
+    cv=5,
+    search: str = "grid",
+    n_iter: int = 10,
+    halving_factor: int = 3,
+    min_resources: int = None,
+    n_jobs: int = -1,
+    random_state: int = 42,
+    classifier: bool = None,
+    verbose: bool = True,
+    cache=None,
+):
+    """
+    Selección de modelos con un solo pool de procesos para todos los modelos.
+
+    - Los folds de CV se construyen una vez y se comparten entre todos los modelos.
+    - Todas las tareas (modelo, params, fold) se reparten en el mismo pool (joblib).
+    - Las predicciones fuera de fold (y predict_proba en clasificación) del mejor candidato salen
+      de los mismos ajustes de la búsqueda, sin reajustar con cross_val_predict.
+    - search: 'grid' (todas las combinaciones), 'random' (n_iter combinaciones por modelo) o
+      'halving' (successive halving: cada ronda entrena con más filas solo el mejor
+      1/halving_factor de los candidatos; la última ronda usa todas las filas). Como en
+      HalvingGridSearchCV, cv_results tiene una fila por (ronda, candidato) con iter y n_resources.
+    - Un ajuste que falla recibe score NaN y un FitFailedWarning, como error_score=np.nan en GridSearchCV.
+
+    Parámetros:
+    - models: dict {model_name: {"model": estimator, "params": grid_params}}
+    - X, y: datos de entrenamiento
+    - scoring: métrica para elegir el mejor candidato (como en GridSearchCV; por defecto accuracy / R²)
+    - cv: número de folds o splitter de sklearn
+    - n_jobs: procesos del pool (-1 = todos)
+    - classifier: fuerza folds estratificados (por defecto se infiere del primer modelo)
+    - cache: ExperimentCache o directorio; los ajustes (modelo, params, fold) y los modelos finales
+      ya calculados con los mismos datos, estimador, folds y scorer se leen del caché en vez de reajustarse
+
+    Retorna:
+    - dict {model_name: {"best_params", "best_index", "best_score", "cv_results" (DataFrame),
+      "y_pred_cv", "y_proba_cv", "fit_time", "best_model"}}; best_model se reajusta con todos los datos.
+    """
+    if isinstance(cache, str):
+        # Un caché abierto aquí desde un directorio se cierra al terminar, también si la búsqueda falla
+        with ExperimentCache(cache) as directory_cache:
+            return run_model_selection(models, X, y, scoring=scoring, cv=cv, search=search, n_iter=n_iter,
+                                       halving_factor=halving_factor, min_resources=min_resources, n_jobs=n_jobs,
+                                       random_state=random_state, classifier=classifier, verbose=verbose,
+                                       cache=directory_cache)
+    if classifier is None:
+        classifier = is_classifier(next(iter(models.values()))["model"])
+    splitter = check_cv(cv, y, classifier=classifier)
+    # Folds construidos una sola vez y compartidos por todos los modelos
+    folds = list(splitter.split(X, y))
+    n_splits = len(folds)
+
+    # Los workers reciben arreglos NumPy (joblib los comparte por memmap en lugar de copiarlos)
+    # (las matrices dispersas, p. ej. one-hot de FeatureEncoder, se pasan tal cual en CSR)
+    if sp.issparse(X):
+        X_array = X.tocsr()
+    else:
+        X_array = X.to_numpy() if isinstance(X, pd.DataFrame) else np.asarray(X)
+    y_array = y.to_numpy() if isinstance(y, pd.Series) else np.asarray(y)
+
+    candidates = {name: _candidates(config, search, n_iter, random_state) for name, config in models.items()}
+    # Sin scoring se usa la métrica de estimator.score (accuracy / R²) desde las predicciones del fold,
+    # en lugar de llamar a score(), que volvería a predecir
+    scorers = {name: check_scoring(config["model"], scoring=scoring or ("accuracy" if is_classifier(config["model"]) else "r2"))
+               for name, config in models.items()}
+
+    # Rondas de successive halving: (candidatos vivos por modelo, filas por fold de entrenamiento)
+    n_train = min(len(train) for train, _ in folds)
+    if search == "halving":
+        max_candidates = max(len(c) for c in candidates.values())
+        n_rounds = max(1, int(np.ceil(np.log(max_candidates) / np.log(halving_factor))) + 1) if max_candidates > 1 else 1
+        if min_resources is None:
+            min_resources = max(n_train // (halving_factor ** (n_rounds - 1)), 2 * n_splits)
+        resources = [min(n_train, min_resources * halving_factor ** r) for r in range(n_rounds)]
+        resources[-1] = n_train
+    else:
+        resources = [n_train]
+
+    if cache is not None:
+        data_key = dataset_fingerprint(X, y)
+        candidate_keys = {name: [estimator_fingerprint(config["model"], params) for params in candidates[name]]
+                          for name, config in models.items()}
+        scorer_keys = {name: repr(scorer) for name, scorer in scorers.items()}
+
+    alive = {name: list(range(len(c))) for name, c in candidates.items()}
+    # Resultados por (ronda, candidato): en halving cada ronda agrega sus propias filas, como HalvingGridSearchCV
+    history = {name: {"scores": {}, "fit": {}, "score": {}, "n_resources": {}} for name in models}
+    start_time = time.time()
+
+    with Parallel(n_jobs=n_jobs, return_as="generator_unordered") as parallel:
+        for round_idx, n_resources in enumerate(resources):
+            last_round = round_idx == len(resources) - 1
+            state = _CandidateState(len(y_array), n_splits)
+            tasks, cached = [], []
+            for name, config in models.items():
+                if not last_round and len(alive[name]) <= 1:
+                    continue  # Un solo candidato: solo hace falta la ronda final
+                with_proba = classifier and hasattr(config["model"], "predict_proba")
+                for cand_idx in alive[name]:
+                    for fold_idx, (train, test) in enumerate(folds):
+                        if not last_round:
+                            train = _subsample(train, n_resources, random_state + fold_idx)
+                        task_key = (name, cand_idx, fold_idx, test)
+                        if cache is not None:
+                            fit_key = cache.key(data_key, candidate_keys[name][cand_idx], fold_fingerprint(train, test),
+                                                scorer_keys[name], with_proba)
+                            result = cache.get(fit_key)
+                            if result is not None:
+                                cached.append((task_key, result))
+                                continue
+                            task_key = task_key + (fit_key, len(train))
+                        tasks.append(delayed(_fit_task)(
+                            task_key, config["model"], candidates[name][cand_idx],
+                            X_array, y_array, train, test, scorers[name], with_proba,
+                        ))
+
+            if verbose:
+                from_cache = f", {len(cached)} from cache" if cache is not None else ""
+                print(f"Round {round_idx}: {len(tasks)} fits{from_cache} ({n_resources} training rows per fold)")
+
+            for (name, cand_idx, fold_idx, test), result in chain(cached, _run_tasks(parallel, tasks, cache, models, candidates)):
+                finished = state.add(name, cand_idx, fold_idx, test, result, keep_predictions=last_round)
+                if finished is not None:
+                    scores, fit_times, score_times = finished
+                    row = (round_idx, cand_idx)
+                    history[name]["scores"][row] = scores
+                    history[name]["fit"][row] = fit_times
+                    history[name]["score"][row] = score_times
+                    history[name]["n_resources"][row] = n_resources
+
+            if not last_round:
+                # Sobreviven los mejores 1/halving_factor candidatos de cada modelo
+                for name in models:
+                    if len(alive[name]) <= 1:
+                        continue
+                    round_scores = {c: history[name]["scores"][(round_idx, c)] for c in alive[name]}
+                    ranked = sorted(alive[name], key=lambda c: (-np.nan_to_num(round_scores[c].mean(), nan=-np.inf), c))
+                    alive[name] = ranked[:max(1, int(np.ceil(len(ranked) / halving_factor)))]
+
+    if verbose:
+        print(f"Model selection finished in {time.time() - start_time:.1f} s")
+
+    results = {}
+    for name, config in models.items():
+        if name not in state.best:
+            raise ValueError(f"All candidates of {name} failed on at least one fold; see the FitFailedWarning messages.")
+        h = history[name]
+        evaluated = sorted(h["scores"])  # (ronda, candidato)
+        fold_scores = np.array([h["scores"][row] for row in evaluated])
+        fit_times = np.array([h["fit"][row] for row in evaluated])
+        score_times = np.array([h["score"][row] for row in evaluated])
+        extra = None
+        if search == "halving":
+            extra = {"iter": [r for r, _ in evaluated], "n_resources": [h["n_resources"][row] for row in evaluated]}
+        cv_results = _results_frame([candidates[name][c] for _, c in evaluated], fold_scores, fit_times, score_times, extra)
+        if search == "halving":
+            # Como HalvingGridSearchCV: primero los candidatos que llegaron a rondas más avanzadas
+            order = cv_results.assign(_score=cv_results["mean_test_score"].fillna(-np.inf)).sort_values(
+                ["iter", "_score"], ascending=False, kind="stable").index
+            cv_results.loc[order, "rank_test_score"] = np.arange(1, len(order) + 1)
+
+        best = state.best[name]
+        best_params = candidates[name][best["cand_idx"]]
+        if cache is not None:
+            model_key = cache.key(data_key, candidate_keys[name][best["cand_idx"]], "full")
+            best_model = cache.get_model(model_key)
+            if best_model is None:
+                best_model = clone(config["model"]).set_params(**best_params).fit(X, y)
+                cache.put_model(model_key, best_model, model=name, params=best_params, n_train=len(y_array))
+        else:
+            best_model = clone(config["model"]).set_params(**best_params).fit(X, y)
+
+        results[name] = {
+            "best_params": best_params,
+            "best_index": evaluated.index((len(resources) - 1, best["cand_idx"])),
+            "best_score": best["mean_score"],
+            "cv_results": cv_results,
+            "y_pred_cv": best["y_pred"],
+            "y_proba_cv": best["y_proba"],
+            "fit_time": float(fit_times.sum() + score_times.sum()),
+            "best_model": best_model,
+        }
+    return results
@@ -1,24 +1,115 @@
 from sklearn.base import BaseEstimator, TransformerMixin
 import numpy as np
 import pandas as pd
+from .encoding import FeatureEncoder
+from .hist_boosting import MAX_BINS, categorical_mask
 
 class CustomPreprocessor(BaseEstimator, TransformerMixin):
-    def __init__(self, encoder, scaler, features):
+    def __init__(self, encoder, scaler, features, compiled=False, binner=None):
         self.encoder = encoder
         self.scaler = scaler
         self.features = features
+        self.compiled = compiled
+        self.binner = binner
         self.cat_cols = [col for col, t in features.items() if t == 'categorical']
         self.num_cols = [col for col, t in features.items() if t == 'numeric']
+        if compiled:
+            self.compile()
+
+    def __setstate__(self, state):
+        # Los pipelines guardados antes del modo compilado no tienen este atributo
+        state.setdefault('compiled', False)
+        state.setdefault('binner', None)
+        super().__setstate__(state)
+
+    def categorical_mask(self, max_bins=MAX_BINS):
+        """
+        Columnas de la salida que HistGradientBoosting puede tratar como categóricas nativas
+        (ver functions.hist_boosting.categorical_mask).
+
+        Con FeatureEncoder la salida sigue el orden de get_feature_names_out (ordinales, target,
+        numéricas, one-hot, hashing) y solo las columnas 'ordinal' son códigos de categoría.
+        """
+        if isinstance(self.encoder, FeatureEncoder):
+            cardinality = {}
+            if self.encoder.ordinal_encoder_ is not None:
+                cardinality = {col: len(categories) for col, categories in
+                               zip(self.encoder.ordinal_cols_, self.encoder.ordinal_encoder_.categories_)}
+            names = self.encoder.get_feature_names_out()
+            return np.array([name in cardinality and cardinality[name] <= max_bins for name in names], dtype=bool)
+        return categorical_mask(self.features, self.encoder, max_bins=max_bins)
+
+    def _check_binner(self):
+        # FeatureBinner ubica las numéricas por el orden de features, que no es el de la salida de FeatureEncoder
+        if self.binner is not None and isinstance(self.encoder, FeatureEncoder):
+            raise ValueError("binner requires the ordinal encoder of prepare_*_data; "
+                             "FeatureEncoder output columns do not follow the features order.")
+
+    def _bin(self, X_transformed):
+        # Con FeatureBinner (HistGradientBoosting entrenado sobre datos binned) se aplica el mismo binning
+        return self.binner.transform(X_transformed) if self.binner is not None else X_transformed
 
     def fit(self, X, y=None):
         # No fit porque los transformadores ya están entrenados
+        self._check_binner()
+        return self
+
+    def compile(self):
+        """
+        Precalcula las tablas del modo compilado a partir del encoder y el scaler ya entrenados:
+        - diccionario categoría -> código por cada columna categórica (OrdinalEncoder.categories_)
+        - vectores de media y escala de las columnas numéricas (StandardScaler)
+        - posición de cada columna en el orden de features.keys()
+
+        Se puede llamar sobre pipelines ya guardados (joblib no ejecuta __init__ al cargar).
+        """
+        if isinstance(self.encoder, FeatureEncoder):
+            return self  # FeatureEncoder ya trabaja sin pasar por el DataFrame intermedio
+        positions = {col: i for i, col in enumerate(self.features)}
+
+        self._cat_lookup_ = []
+        if self.cat_cols:
+            unknown_code = None
+            if self.encoder.handle_unknown == 'use_encoded_value':
+                unknown_code = float(self.encoder.unknown_value)
+            for col, categories in zip(self.cat_cols, self.encoder.categories_):
+                lookup = {}
+                missing_code = unknown_code
+                for code, category in enumerate(categories):
+                    if pd.isna(category):
+                        missing_code = float(self.encoder.encoded_missing_value)
+                    else:
+                        lookup[category] = float(code)
+                self._cat_lookup_.append((col, positions[col], lookup, unknown_code, missing_code))
+
+        self._num_positions_ = np.array([positions[col] for col in self.num_cols], dtype=np.intp)
+        if self.scaler is not None and self.num_cols:
+            n_num = len(self.num_cols)
+            self._mean_ = self.scaler.mean_ if self.scaler.with_mean else np.zeros(n_num)
+            self._scale_ = self.scaler.scale_ if self.scaler.with_std else np.ones(n_num)
+        else:
+            self._mean_ = self._scale_ = None
+
         return self
 
     def transform(self, X):
+        if isinstance(self.encoder, FeatureEncoder):
+            # One-hot / hashing / target encoding: el encoder incluye el escalado (salida CSR o densa)
+            self._check_binner()
+            return self.encoder.transform(pd.DataFrame(X)[list(self.features)])
+        if self.compiled:
+            return self.transform_records(X)
+
         X = pd.DataFrame(X).copy()
         # Asegurarse que las columnas existen y estén en el orden correcto
         X_cat = X[self.cat_cols]
         X_num = X[self.num_cols]
+        # Columnas cuyo encoder tiene categorías object (p.ej. vocabulario ampliado por IncrementalTrainer,
+        # sin ordenar): se pasan como object para que sklearn codifique por diccionario y no con searchsorted
+        object_cols = [col for col, categories in zip(self.cat_cols, self.encoder.categories_)
+                       if categories.dtype == object and X_cat[col].dtype != object]
+        if object_cols:
+            X_cat = X_cat.astype({col: object for col in object_cols})
 
         X_cat_enc = self.encoder.transform(X_cat)
         X_num_scaled = self.scaler.transform(X_num)
@@ -31,4 +122,49 @@ class CustomPreprocessor(BaseEstimator, TransformerMixin):
 
         # Reordenar columnas según el orden de features.keys()
         X_transformed = X_transformed_df[list(self.features.keys())].to_numpy()
-        return X_transformed
+        return self._bin(X_transformed)
+
+    def transform_records(self, X):
+        """
+        Transformación sin pandas (modo compilado). Escribe directamente sobre un arreglo
+        float64 preasignado en el orden de features.keys(); el resultado es idéntico bit a bit
+        al de transform() con el DataFrame equivalente.
+
+        Parámetros:
+        - X: dict (una fila), lista de dicts, arreglo estructurado de NumPy o DataFrame
+
+        Retorna:
+        - np.ndarray de forma (n_filas, n_features)
+        """
+        if isinstance(self.encoder, FeatureEncoder):
+            return self.transform(pd.DataFrame([X] if isinstance(X, dict) else X))
+        if not hasattr(self, '_cat_lookup_'):
+            self.compile()
+
+        if isinstance(X, dict):
+            X = [X]
+        if isinstance(X, (pd.DataFrame, np.ndarray)):
+            column = lambda col: X[col]
+        else:
+            column = lambda col: [row[col] for row in X]
+
+        X_transformed = np.empty((len(X), len(self.features)), dtype=np.float64)
+
+        for col, position, lookup, unknown_code, missing_code in self._cat_lookup_:
+            codes = X_transformed[:, position]
+            for i, value in enumerate(column(col)):
+                code = lookup.get(value)
+                if code is None:
+                    code = missing_code if pd.isna(value) else unknown_code
+                    if code is None:
+                        raise ValueError(f"Found unknown categories ['{value}'] in column '{col}' during transform")
+                codes[i] = code
+
+        if self.num_cols:
+            X_num = np.array([column(col) for col in self.num_cols], dtype=np.float64).T
+            if self._mean_ is not None:
+                X_num -= self._mean_
+                X_num /= self._scale_
+            X_transformed[:, self._num_positions_] = X_num
+
+        return self._bin(X_transformed)
@@ -1,74 +1,61 @@
 import matplotlib.pyplot as plt
 import seaborn as sns
-import pandas as pd
 import numpy as np
-def plot_cv_metric_distribution(all_grid_results, metric_name="rmse", maximize=False):
+from joblib import Parallel, delayed
+from matplotlib.figure import Figure
+from sklearn.metrics import ConfusionMatrixDisplay
+
+from .grid_results import GridResults
+
+# A partir de este número de puntos los gráficos de predicción usan densidad / downsampling
+LARGE_DATA_THRESHOLD = 50_000
+
+def plot_cv_metric_distribution(all_grid_results, metric_name="rmse", maximize=False, per_fold=False):
     """
     Plot distribution of a CV metric per model with annotations of best and worst params,
     only if the model has hyperparameters.
 
     Parameters:
-    - all_grid_results: list of pd.DataFrame
+    - all_grid_results: list of pd.DataFrame or GridResults
         Each DataFrame is a GridSearchCV cv_results_ with a 'Model' column indicating model name.
+        A GridResults (e.g. GridResults.cached(...)) is reused without normalizing the results again.
     - metric_name: str
         Name of the metric to plot (used for labeling). Must be related to mean_test_score.
     - maximize: bool
         If True, metric is maximized (e.g. R2 score). If False, metric is minimized (e.g. RMSE).
+    - per_fold: bool
+        If True, plot the score of every CV fold instead of the mean per candidate.
 
     Returns:
     - cv_scores_df: pd.DataFrame
-        Concatenated DataFrame with the metric computed.
+        One row per candidate (see GridResults.candidates) with the metric computed. Unlike the raw
+        cv_results_ rows, params is a JSON string and the param_* and split* columns are not included
+        (per-fold scores are in GridResults.folds).
     """
-    # Concatenate all results
-    cv_scores_df = pd.concat(all_grid_results, ignore_index=True)
-
-    # Compute metric values:
-    if maximize:
-        cv_scores_df[metric_name] = cv_scores_df["mean_test_score"]
-    else:
-        cv_scores_df[metric_name] = -cv_scores_df["mean_test_score"]
+    results = GridResults.coerce(all_grid_results)
+    cv_scores_df = results.candidates.copy()
+    cv_scores_df[metric_name] = results.metric(maximize=maximize)
+    plot_df = results.fold_scores(maximize=maximize, metric_name=metric_name) if per_fold else cv_scores_df
 
     plt.figure(figsize=(12, 6))
-    sns.stripplot(data=cv_scores_df, x=metric_name, y="Model", jitter=True, alpha=0.5)
+    sns.stripplot(data=plot_df, x=metric_name, y="Model", jitter=True, alpha=0.5)
     plt.xlabel(f"{metric_name.upper()} (Cross-Validation)")
     plt.title(f"Distribution of {metric_name.upper()} by Model")
 
-    for model in cv_scores_df["Model"].unique():
-        df_model = cv_scores_df[cv_scores_df["Model"] == model]
-
-        if maximize:
-            best_idx = df_model[metric_name].idxmax()
-            worst_idx = df_model[metric_name].idxmin()
-        else:
-            best_idx = df_model[metric_name].idxmin()
-            worst_idx = df_model[metric_name].idxmax()
-
-        best_row = df_model.loc[best_idx]
-        worst_row = df_model.loc[worst_idx]
-
-        # Check if params exist and are not empty dict
-        if best_row["params"] and best_row["params"] != {}:
+    best = results.best(maximize=maximize, metric_name=metric_name)
+    worst = results.worst(maximize=maximize, metric_name=metric_name)
+    for rows, label, offset, color in [(best, "Best", 15, 'green'), (worst, "Worst", -20, 'red')]:
+        # Only models with hyperparameters
+        for row in rows[rows["params"] != "{}"].itertuples(index=False):
             plt.annotate(
-                f"Best: {best_row['params']}",
-                xy=(best_row[metric_name], model),
+                f"{label}: {row.params}",
+                xy=(getattr(row, metric_name), row.Model),
                 textcoords='offset points',
-                xytext=(0, 15),
+                xytext=(0, offset),
                 ha='center',
                 fontsize=7,
-                color='green',
-                arrowprops=dict(arrowstyle="->", color='green', lw=0.8)
-            )
-
-        if worst_row["params"] and worst_row["params"] != {}:
-            plt.annotate(
-                f"Worst: {worst_row['params']}",
-                xy=(worst_row[metric_name], model),
-                textcoords='offset points',
-                xytext=(0, -20),
-                ha='center',
-                fontsize=7,
-                color='red',
-                arrowprops=dict(arrowstyle="->", color='red', lw=0.8)
+                color=color,
+                arrowprops=dict(arrowstyle="->", color=color, lw=0.8)
             )
 
     plt.tight_layout()
@@ -81,27 +68,17 @@ def plot_best_metric_per_model(all_grid_results, metric='mean_test_score', maxim
     Plot best metric per model from GridSearchCV results.
 
     Parameters:
-    - all_grid_results: list of pd.DataFrame with GridSearchCV cv_results_ and 'Model' column
+    - all_grid_results: list of pd.DataFrame with GridSearchCV cv_results_ and 'Model' column, or GridResults
     - metric: str, metric column to use from cv_results_ (e.g., 'mean_test_score')
     - maximize: bool, True if metric is better when higher, False if lower
 
     Returns:
-    - best_metric_df: pd.DataFrame with best metric row per model
+    - best_metric_df: pd.DataFrame with best metric row per model (a GridResults.candidates row:
+      Model, candidate, params as a JSON string, mean_*/std_*/rank_* and metric_val; no param_* or
+      split* columns, use json.loads(row.params) to get the params dict)
     """
-
-    # Concatenate all results
-    cv_scores_df = pd.concat(all_grid_results, ignore_index=True)
-
-    # Adjust metric sign if needed (neg metrics like neg_root_mean_squared_error)
-    if not maximize:
-        cv_scores_df['metric_val'] = -cv_scores_df[metric]
-    else:
-        cv_scores_df['metric_val'] = cv_scores_df[metric]
-
-    # Get index of best metric per model
-    idx_best = cv_scores_df.groupby('Model')['metric_val'].idxmax() if maximize else cv_scores_df.groupby('Model')['metric_val'].idxmin()
-
-    best_metric_df = cv_scores_df.loc[idx_best].copy()
+    # Scores follow sklearn's convention (higher is better); metric_val flips the sign of neg metrics
+    best_metric_df = GridResults.coerce(all_grid_results).best(metric, maximize=maximize)
 
     plt.figure(figsize=(10, 6))
     sns.barplot(
@@ -124,7 +101,67 @@ def plot_best_metric_per_model(all_grid_results, metric='mean_test_score', maxim
     return best_metric_df
 
 
-def plot_dataprediction(y_train, y_test, y_pred_train, y_pred_test):
+def _new_figure(figsize, output_path=None, nrows=1, ncols=1):
+    """
+    Con output_path la figura se crea sin pyplot (matplotlib.figure.Figure): no usa el backend
+    interactivo ni el registro global de figuras (no quedan figuras abiertas en reportes batch).
+    Sin output_path se usa plt.subplots como siempre.
+    """
+    if output_path is not None:
+        fig = Figure(figsize=figsize)
+        return fig, fig.subplots(nrows, ncols)
+    return plt.subplots(nrows, ncols, figsize=figsize)
+
+
+def _finish(fig, output_path=None, dpi=100):
+    fig.tight_layout()
+    if output_path is not None:
+        fig.savefig(output_path, dpi=dpi, bbox_inches="tight")
+        return output_path
+    plt.show()
+
+
+def _is_large(n_rows, large_data):
+    return n_rows > LARGE_DATA_THRESHOLD if large_data is None else large_data
+
+
+def lttb_downsample(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: reduce una serie a n_out puntos conservando su forma visual
+    (picos y valles). El primer y el último punto se conservan; de cada bucket intermedio se
+    elige el punto que forma el triángulo de mayor área con el elegido antes y el promedio del
+    bucket siguiente.
+
+    Retorna:
+    - (x, y) con n_out puntos (o la serie original si ya es más corta)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(int), n)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2]
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return x[selected], y[selected]
+
+
+def plot_dataprediction(y_train, y_test, y_pred_train, y_pred_test, large_data=None, max_points=2000, output_path=None):
+    """
+    Serie de valores reales y predichos (train seguido de test).
+
+    Con muchos puntos (large_data=None: más de LARGE_DATA_THRESHOLD) cada serie se reduce a
+    max_points con LTTB. Con output_path la figura se guarda en el archivo en lugar de mostrarse.
+    """
     # Concatenar valores reales y predichos
     y_real = np.concatenate([y_train, y_test])
     y_pred = np.concatenate([y_pred_train, y_pred_test])
@@ -132,46 +169,54 @@ def plot_dataprediction(y_train, y_test, y_pred_train, y_pred_test):
     # Índice donde termina el entrenamiento
     split_index = len(y_train)
 
-    plt.figure(figsize=(12,6))
-    plt.plot(y_real, label="Real", color="blue")
-    plt.plot(y_pred, label="Predicción", color="red", linestyle="--")
-
-    # Línea vertical para indicar la separación entre train y test
-    plt.axvline(x=split_index, color="black", linestyle=":", label="Inicio Test")
+    index = np.arange(len(y_real))
+    x_real, y_real_plot = index, y_real
+    x_pred, y_pred_plot = index, y_pred
+    if _is_large(len(y_real), large_data):
+        x_real, y_real_plot = lttb_downsample(index, y_real, max_points)
+        x_pred, y_pred_plot = lttb_downsample(index, y_pred, max_points)
 
-    plt.xlabel("Índice de muestra")
-    plt.ylabel("Valor")
-    plt.title("Valores reales vs Predicciones (Entrenamiento + Test)")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+    fig, ax = _new_figure((12, 6), output_path)
+    ax.plot(x_real, y_real_plot, label="Real", color="blue")
+    ax.plot(x_pred, y_pred_plot, label="Predicción", color="red", linestyle="--")
 
+    # Línea vertical para indicar la separación entre train y test
+    ax.axvline(x=split_index, color="black", linestyle=":", label="Inicio Test")
 
+    ax.set_xlabel("Índice de muestra")
+    ax.set_ylabel("Valor")
+    ax.set_title("Valores reales vs Predicciones (Entrenamiento + Test)")
+    ax.legend()
+    ax.grid(True)
+    return _finish(fig, output_path)
 
-def plot_dataprediction_comparison(y_train,y_pred_train,y_test,y_pred_test):
-    plt.figure(figsize=(12, 5))
 
-    # Plot de entrenamiento
-    plt.subplot(1, 2, 1)
-    plt.scatter(y_train, y_pred_train, alpha=0.6, color='blue', label='Predicciones')
-    plt.plot([y_train.min(), y_train.max()], [y_train.min(), y_train.max()], 'k--', lw=2, label='Referencia')
-    plt.xlabel('Valor real')
-    plt.ylabel('Predicción')
-    plt.title('Entrenamiento')
-    plt.legend()
+def plot_dataprediction_comparison(y_train, y_pred_train, y_test, y_pred_test, large_data=None, gridsize=60, output_path=None):
+    """
+    Predicción vs valor real para train y test.
 
-    # Plot de test
-    plt.subplot(1, 2, 2)
-    plt.scatter(y_test, y_pred_test, alpha=0.6, color='green', label='Predicciones')
-    plt.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'k--', lw=2, label='Referencia')
-    plt.xlabel('Valor real')
-    plt.ylabel('Predicción')
-    plt.title('Test')
-    plt.legend()
+    Con muchos puntos (large_data=None: más de LARGE_DATA_THRESHOLD) se dibuja la densidad con
+    hexbin (escala logarítmica) en lugar de un punto por fila.
+    """
+    y_train, y_pred_train = np.asarray(y_train), np.asarray(y_pred_train)
+    y_test, y_pred_test = np.asarray(y_test), np.asarray(y_pred_test)
+    large = _is_large(len(y_train) + len(y_test), large_data)
+
+    fig, axes = _new_figure((12, 5), output_path, 1, 2)
+    for ax, y_true, y_pred, color, title in [(axes[0], y_train, y_pred_train, 'blue', 'Entrenamiento'),
+                                             (axes[1], y_test, y_pred_test, 'green', 'Test')]:
+        if large:
+            density = ax.hexbin(y_true, y_pred, gridsize=gridsize, bins='log', mincnt=1, cmap='Blues')
+            fig.colorbar(density, ax=ax, label='Cantidad (log)')
+        else:
+            ax.scatter(y_true, y_pred, alpha=0.6, color=color, label='Predicciones')
+        ax.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()], 'k--', lw=2, label='Referencia')
+        ax.set_xlabel('Valor real')
+        ax.set_ylabel('Predicción')
+        ax.set_title(title)
+        ax.legend()
 
-    plt.tight_layout()
-    plt.show()
+    return _finish(fig, output_path)
 
 
 def corr_matrix_plot(corr_matrix):
@@ -181,37 +226,76 @@ def corr_matrix_plot(corr_matrix):
     plt.show()
 
 
-from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
-import matplotlib.pyplot as plt
-import numpy as np
+def confusion_matrices(y_train, y_pred_train, y_test, y_pred_test, labels=None):
+    """
+    Matrices de confusión de train y test con un solo np.bincount: cada par (real, predicho) se
+    codifica como split * k^2 + real * k + predicho. Igual que sklearn, las filas cuyo valor
+    no está en labels se ignoran y sin labels se usan los valores presentes ordenados.
 
-def plot_combined_confusion_matrix(y_train, y_pred_train, y_test, y_pred_test, labels=None):
-    y_all = np.concatenate([y_train, y_test])
-    y_pred_all = np.concatenate([y_pred_train, y_pred_test])
+    Retorna:
+    - (cm_train, cm_test, labels); la matriz combinada es cm_train + cm_test
+    """
+    y_true = np.concatenate([np.asarray(y_train).ravel(), np.asarray(y_test).ravel()])
+    y_pred = np.concatenate([np.asarray(y_pred_train).ravel(), np.asarray(y_pred_test).ravel()])
+    split = np.repeat([0, 1], [len(np.asarray(y_train).ravel()), len(np.asarray(y_test).ravel())])
+    labels = np.unique(np.concatenate([y_true, y_pred])) if labels is None else np.asarray(labels)
+    k = len(labels)
 
-    cm = confusion_matrix(y_all, y_pred_all, labels=labels)
-    disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=labels)
-    disp.plot(cmap="Blues")
-    plt.title("Matriz de Confusion (Train + Test)")
-    plt.show()
+    order = np.argsort(labels, kind='stable')
+    sorted_labels = labels[order]
 
-from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
-import matplotlib.pyplot as plt
+    def codes(values):
+        position = np.clip(np.searchsorted(sorted_labels, values), 0, k - 1)
+        valid = sorted_labels[position] == values
+        return order[position], valid
 
-def plot_confusion_matrices_separated(y_train, y_pred_train, y_test, y_pred_test, labels=None):
-    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    true_codes, true_valid = codes(y_true)
+    pred_codes, pred_valid = codes(y_pred)
+    valid = true_valid & pred_valid
+    flat = (split * k * k + true_codes * k + pred_codes)[valid]
+    cm = np.bincount(flat, minlength=2 * k * k).reshape(2, k, k)
+    return cm[0], cm[1], labels
 
-    # Entrenamiento
-    cm_train = confusion_matrix(y_train, y_pred_train, labels=labels)
-    disp_train = ConfusionMatrixDisplay(confusion_matrix=cm_train, display_labels=labels)
-    disp_train.plot(ax=axes[0], cmap='Blues', values_format='d')
-    axes[0].set_title("Matriz de Confusión - Entrenamiento")
 
-    # Test
-    cm_test = confusion_matrix(y_test, y_pred_test, labels=labels)
-    disp_test = ConfusionMatrixDisplay(confusion_matrix=cm_test, display_labels=labels)
-    disp_test.plot(ax=axes[1], cmap='Blues', values_format='d')
-    axes[1].set_title("Matriz de Confusión - Test")
+def _plot_confusion(ax, cm, labels, title):
+    ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=labels).plot(ax=ax, cmap='Blues', values_format='d')
+    ax.set_title(title)
 
-    plt.tight_layout()
-    plt.show()
+
+def plot_combined_confusion_matrix(y_train, y_pred_train, y_test, y_pred_test, labels=None, output_path=None):
+    cm_train, cm_test, display_labels = confusion_matrices(y_train, y_pred_train, y_test, y_pred_test, labels)
+    fig, ax = _new_figure((6.4, 4.8), output_path)
+    _plot_confusion(ax, cm_train + cm_test, display_labels, "Matriz de Confusion (Train + Test)")
+    return _finish(fig, output_path)
+
+
+def plot_confusion_matrices_separated(y_train, y_pred_train, y_test, y_pred_test, labels=None, output_path=None):
+    cm_train, cm_test, display_labels = confusion_matrices(y_train, y_pred_train, y_test, y_pred_test, labels)
+    fig, axes = _new_figure((12, 5), output_path, 1, 2)
+    _plot_confusion(axes[0], cm_train, display_labels, "Matriz de Confusión - Entrenamiento")
+    _plot_confusion(axes[1], cm_test, display_labels, "Matriz de Confusión - Test")
+    return _finish(fig, output_path)
+
+
+def _render(plot, output_path, kwargs):
+    if isinstance(plot, str):
+        plot = globals()[plot]
+    return plot(**kwargs, output_path=output_path)
+
+
+def render_figures(jobs, n_jobs=-1):
+    """
+    Genera varias figuras en archivos, en paralelo y sin pantalla (útil para reportes batch).
+    Cada figura se dibuja en un proceso aparte: matplotlib no es thread-safe (el layout de
+    texto comparte estado), así que no se usan hilos.
+
+    Parámetros:
+    - jobs: lista de dicts {"plot": función o nombre de función de este módulo,
+      "output_path": archivo de salida (.png, .pdf, .svg), "kwargs": argumentos de la función}
+    - n_jobs: procesos (-1 = todos los CPUs)
+
+    Retorna:
+    - lista de rutas generadas, en el orden de jobs
+    """
+    return Parallel(n_jobs=n_jobs, prefer="processes")(
+        delayed(_render)(job["plot"], job["output_path"], job.get("kwargs", {})) for job in jobs)
@@ -1,13 +1,46 @@
 import os
 import joblib
+import numpy as np
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 
-import os
-import joblib
-from sklearn.pipeline import Pipeline
+from .hist_boosting import MAX_BINS
+from .model_artifacts import ARTIFACT_EXTENSION, save_artifact
+
+
+def _save(obj, name, output_dir, artifact_format, metrics, codec, level, X_sample):
+    """
+    Guarda un modelo como joblib (formato original) o como artefacto versionado (.cadm).
+    """
+    if artifact_format == "joblib":
+        path = os.path.join(output_dir, f"{name}_pipeline.joblib")
+        joblib.dump(obj, path)
+    elif artifact_format == "cadm":
+        path = os.path.join(output_dir, f"{name}_pipeline{ARTIFACT_EXTENSION}")
+        save_artifact({name: obj}, path, metrics={name: (metrics or {}).get(name, {})}, codec=codec, level=level,
+                      X_sample=X_sample)
+    else:
+        raise ValueError("artifact_format must be 'joblib' or 'cadm'.")
+    return path
 
-def save_pipeline_models(preprocessor, best_models: dict, output_dir="model_pipelines"):
+def _check_categorical_features(preprocessor, name, model):
+    """
+    HistGradientBoosting con categóricas nativas: las columnas que el modelo trató como categóricas
+    deben ser las que CustomPreprocessor entrega como códigos; si no, el pipeline guardado
+    interpretaría mal las features.
+    """
+    is_categorical = getattr(model, "is_categorical_", None)
+    if is_categorical is None or not hasattr(preprocessor, "categorical_mask"):
+        return
+    expected = preprocessor.categorical_mask(getattr(model, "max_bins", MAX_BINS))
+    is_categorical = np.asarray(is_categorical, dtype=bool)
+    if len(is_categorical) != len(expected) or not np.array_equal(is_categorical, expected):
+        raise ValueError(f"Categorical features of '{name}' {is_categorical.tolist()} do not match "
+                         f"the preprocessor features {expected.tolist()}.")
+
+
+def save_pipeline_models(preprocessor, best_models: dict, output_dir="model_pipelines", artifact_format="joblib",
+                         metrics: dict = None, codec="zlib", level=3, X_sample=None):
     """
     Guarda un pipeline por cada modelo en best_models,
     usando el preprocesador ya armado.
@@ -16,22 +49,27 @@ def save_pipeline_models(preprocessor, best_models: dict, output_dir="model_pipe
     - preprocessor: transformador que incluye encoder + scaler ya configurados y entrenados
     - best_models: dict con estructura {nombre_modelo: modelo_entrenado}
     - output_dir: directorio donde se guardarán los pipelines (.joblib)
+    - artifact_format: 'joblib' (pickle sin comprimir) o 'cadm' (manifiesto + payload comprimido, ver model_artifacts)
+    - metrics: {nombre_modelo: {métrica: valor}} para el manifiesto ('cadm')
+    - codec, level: compresión del payload ('cadm')
+    - X_sample: filas para validar la conversión a float32 ('cadm')
     """
 
     os.makedirs(output_dir, exist_ok=True)
 
     for name, model in best_models.items():
+        _check_categorical_features(preprocessor, name, model)
         pipeline = Pipeline([
             ("preprocessor", preprocessor),
             ("regressor", model)
         ])
 
-        path = os.path.join(output_dir, f"{name}_pipeline.joblib")
-        joblib.dump(pipeline, path)
+        path = _save(pipeline, name, output_dir, artifact_format, metrics, codec, level, X_sample)
         print(f"Guardado pipeline: {path}")
 
 
-def save_pipeline_models_categorical_y(preprocessor, encoder_y, best_models: dict, output_dir="model_pipelines"):
+def save_pipeline_models_categorical_y(preprocessor, encoder_y, best_models: dict, output_dir="model_pipelines",
+                                      artifact_format="joblib", metrics: dict = None, codec="zlib", level=3, X_sample=None):
     """
     Crea y guarda un pipeline por cada modelo en best_models, incluyendo
     un preprocesador completo (encoder + scaler) y el encoder de y (como objeto aparte en el diccionario).
@@ -41,10 +79,12 @@ def save_pipeline_models_categorical_y(preprocessor, encoder_y, best_models: dic
     - encoder_y: transformador ya entrenado para variable objetivo (por ejemplo OrdinalEncoder)
     - best_models: dict con estructura {nombre_modelo: modelo_entrenado}
     - output_dir: directorio donde se guardarán los pipelines (.joblib)
+    - artifact_format, metrics, codec, level, X_sample: igual que en save_pipeline_models
     """
     os.makedirs(output_dir, exist_ok=True)
 
     for name, model in best_models.items():
+        _check_categorical_features(preprocessor, name, model)
         pipeline = Pipeline(steps=[
             ("preprocessor", preprocessor),
             ("regressor", model)
@@ -56,6 +96,5 @@ def save_pipeline_models_categorical_y(preprocessor, encoder_y, best_models: dic
             "target_encoder": encoder_y
         }
 
-        path = os.path.join(output_dir, f"{name}_pipeline.joblib")
-        joblib.dump(pipeline_with_target_encoder, path)
+        path = _save(pipeline_with_target_encoder, name, output_dir, artifact_format, metrics, codec, level, X_sample)
         print(f"Guardado: {path}")
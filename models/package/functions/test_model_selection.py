@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sklearn.datasets import make_classification, make_regression
+from sklearn.linear_model import LogisticRegression, Ridge
+from sklearn.model_selection import GridSearchCV
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+from .model_evaluation import evaluate_classification_models, evaluate_regression_models
+
+REGRESSION_MODELS = {
+    "Ridge": {"model": Ridge(), "params": {"alpha": [0.01, 1.0, 100.0]}},
+    "DecisionTree": {"model": DecisionTreeRegressor(random_state=0), "params": {"max_depth": [2, 4, None]}},
+}
+CLASSIFICATION_MODELS = {
+    "LogisticRegression": {"model": LogisticRegression(max_iter=1000), "params": {"C": [0.01, 1.0, 100.0]}},
+    "DecisionTree": {"model": DecisionTreeClassifier(random_state=0), "params": {"max_depth": [2, 4, None]}},
+}
+
+
+def assert_matches_grid_search(models, X, y, scoring, tuned_results, all_grid_results):
+    for name, config in models.items():
+        grid = GridSearchCV(config["model"], config["params"], cv=5, scoring=scoring).fit(X, y)
+        assert tuned_results[name]["Best Params"] == grid.best_params_
+        scores = all_grid_results.loc[all_grid_results["Model"] == name, "mean_test_score"].to_numpy()
+        np.testing.assert_allclose(scores, grid.cv_results_["mean_test_score"])
+
+
+def test_evaluate_regression_models_matches_grid_search():
+    X, y = make_regression(n_samples=200, n_features=6, noise=10.0, random_state=0)
+    tuned_results, summary, all_grid_results, best_models = evaluate_regression_models(
+        REGRESSION_MODELS, X, y, scoring="neg_root_mean_squared_error", cv=5, n_jobs=1)
+
+    assert set(best_models) == set(REGRESSION_MODELS)
+    assert summary["RMSE CV"].notna().all()
+    assert_matches_grid_search(REGRESSION_MODELS, X, y, "neg_root_mean_squared_error", tuned_results, all_grid_results)
+
+
+@pytest.mark.parametrize("scoring", ["roc_auc", "roc_auc_ovr_weighted"])
+def test_evaluate_classification_models_matches_grid_search(scoring):
+    X, y = make_classification(n_samples=200, n_features=6, random_state=0)
+    tuned_results, summary, all_grid_results, best_models = evaluate_classification_models(
+        CLASSIFICATION_MODELS, X, y, scoring=scoring, cv=5, n_jobs=1)
+
+    assert set(best_models) == set(CLASSIFICATION_MODELS)
+    assert summary["ROC AUC CV"].notna().all()
+    assert_matches_grid_search(CLASSIFICATION_MODELS, X, y, scoring, tuned_results, all_grid_results)
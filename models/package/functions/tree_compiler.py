@@ -0,0 +1,225 @@
+import os
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import expit, softmax
+from sklearn.base import BaseEstimator, ClassifierMixin, RegressorMixin
+from sklearn.ensemble import (GradientBoostingClassifier, GradientBoostingRegressor, RandomForestClassifier,
+                              RandomForestRegressor)
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+SUPPORTED_MODELS = (DecisionTreeRegressor, DecisionTreeClassifier, RandomForestRegressor, RandomForestClassifier,
+                    GradientBoostingRegressor, GradientBoostingClassifier)
+
+
+def _dense(X):
+    # Los árboles compilados recorren filas densas; las entradas CSR (one-hot) se densifican
+    return X.toarray() if sp.issparse(X) else np.asarray(X)
+
+
+def _flatten_trees(trees, normalize: bool):
+    """
+    Concatena los árboles en arreglos contiguos (feature, threshold, child, value).
+
+    Los nodos se renumeran por niveles de modo que los dos hijos de un nodo quedan juntos
+    (izquierdo = child, derecho = child + 1): bajar un nivel es child[nodo] + (x > umbral).
+    Las hojas tienen umbral NaN (la comparación siempre va a la derecha) y child = nodo - 1,
+    así que se quedan en su lugar y recorrer max_depth niveles deja cada fila en su hoja.
+    """
+    features, thresholds, children, values, missing_left, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        t = tree.tree_
+        n_nodes = t.node_count
+        mgl = getattr(t, "missing_go_to_left", None)
+
+        # Orden por niveles: order[nuevo] = nodo original
+        order = [0]
+        for node in order:
+            if t.children_left[node] != -1:
+                order.extend((t.children_left[node], t.children_right[node]))
+        order = np.asarray(order)
+        new_id = np.empty(n_nodes, dtype=np.int64)
+        new_id[order] = np.arange(n_nodes) + offset
+
+        left = t.children_left[order]
+        is_leaf = left == -1
+        features.append(np.where(is_leaf, 0, t.feature[order]))
+        thresholds.append(np.where(is_leaf, np.nan, t.threshold[order]))
+        children.append(np.where(is_leaf, np.arange(n_nodes) + offset - 1, new_id[np.where(is_leaf, 0, left)]))
+        missing_left.append(np.zeros(n_nodes, dtype=bool) if mgl is None else (mgl[order].astype(bool) & ~is_leaf))
+
+        value = t.value[order, 0, :].astype(np.float64)  # (n_nodes, n_outputs o n_clases)
+        if normalize:
+            # Probabilidades por hoja (las versiones de sklearn difieren en si value guarda conteos o fracciones)
+            totals = value.sum(axis=1, keepdims=True)
+            value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+        values.append(value)
+
+        roots.append(offset)
+        offset += n_nodes
+        max_depth = max(max_depth, t.max_depth)
+
+    return {
+        "feature": np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+        "threshold": np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+        "child": np.ascontiguousarray(np.concatenate(children), dtype=np.intp),
+        "value": np.ascontiguousarray(np.concatenate(values)),
+        "missing_left": np.concatenate(missing_left),
+        "roots": np.asarray(roots, dtype=np.intp),
+        "max_depth": max_depth,
+    }
+
+
+class CompiledTreeEnsemble(BaseEstimator):
+    """
+    Árbol, Random Forest o Gradient Boosting de sklearn aplanado en arreglos NumPy contiguos.
+
+    predict / predict_proba recorren todos los árboles para todo el lote a la vez (un paso
+    vectorizado por nivel), sin el costo fijo por llamada de sklearn. Se crea con from_sklearn y
+    reemplaza al modelo dentro del pipeline, después de CustomPreprocessor.
+    """
+
+    def __init__(self, kind: str = None, arrays: dict = None, tree_groups: int = 1, classes_=None,
+                 base_score=None, learning_rate: float = 1.0, batch_size: int = 512):
+        self.kind = kind
+        self.arrays = arrays
+        self.tree_groups = tree_groups
+        self.classes_ = classes_
+        self.base_score = base_score
+        self.learning_rate = learning_rate
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_sklearn(cls, model, batch_size: int = 512):
+        """
+        Compila un modelo ya entrenado (DecisionTree, RandomForest o GradientBoosting,
+        regresión o clasificación).
+        """
+        if not isinstance(model, SUPPORTED_MODELS):
+            raise TypeError(f"{type(model).__name__} is not a supported tree model.")
+        classes = getattr(model, "classes_", None)
+
+        if isinstance(model, (GradientBoostingRegressor, GradientBoostingClassifier)):
+            # estimators_ tiene forma (n_estimators, K): K = 1 en regresión y binario
+            n_groups = model.estimators_.shape[1]
+            trees = [model.estimators_[i, k] for k in range(n_groups) for i in range(model.estimators_.shape[0])]
+            n_features = model.n_features_in_
+            base_score = np.asarray(model._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0], dtype=np.float64)
+            kind = "gb_classifier" if isinstance(model, GradientBoostingClassifier) else "gb_regressor"
+            return cls(kind, _flatten_trees(trees, normalize=False), n_groups, classes, base_score,
+                       model.learning_rate, batch_size)
+
+        trees = model.estimators_ if hasattr(model, "estimators_") else [model]
+        if isinstance(model, (DecisionTreeClassifier, RandomForestClassifier)):
+            return cls("forest_classifier", _flatten_trees(trees, normalize=True), len(trees), classes,
+                       batch_size=batch_size)
+        return cls("forest_regressor", _flatten_trees(trees, normalize=False), len(trees), batch_size=batch_size)
+
+    def _leaves(self, X):
+        """
+        Índice global de la hoja de cada fila en cada árbol: arreglo (n_filas, n_árboles).
+        """
+        a = self.arrays
+        # sklearn compara los valores convertidos a float32 contra umbrales float64
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat = X.ravel()
+        has_nan = np.isnan(flat).any()
+        row_start = (np.arange(len(X)) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(a["roots"], (len(X), len(a["roots"])))
+        for _ in range(a["max_depth"]):
+            x = flat.take(row_start + a["feature"].take(nodes))
+            go_right = ~(x <= a["threshold"].take(nodes))
+            if has_nan:
+                go_right &= ~(np.isnan(x) & a["missing_left"].take(nodes))
+            nodes = a["child"].take(nodes) + go_right
+        return nodes
+
+    def _raw(self, X):
+        """
+        Suma (GB) o promedio (bosques) de los valores de hoja, por lotes de batch_size filas.
+        """
+        outputs = []
+        for start in range(0, max(len(X), 1), self.batch_size):
+            leaves = self._leaves(X[start:start + self.batch_size])
+            if self.kind.startswith("gb"):
+                # Árboles ordenados por grupo (clase) y dentro por iteración
+                n = leaves.shape[0]
+                values = self.arrays["value"][:, 0].take(leaves)
+                per_group = values.reshape(n, self.tree_groups, -1).sum(axis=2)
+                outputs.append(self.base_score + self.learning_rate * per_group)
+            else:
+                outputs.append(self.arrays["value"][leaves].mean(axis=1))  # (n, n_árboles, n_salidas) -> (n, n_salidas)
+        return np.concatenate(outputs)[:len(X)]
+
+    def predict_proba(self, X):
+        if self.kind == "gb_classifier":
+            raw = self._raw(_dense(X))
+            if self.tree_groups == 1:
+                p = expit(raw[:, 0])
+                return np.column_stack([1 - p, p])
+            return softmax(raw, axis=1)
+        if self.kind == "forest_classifier":
+            return self._raw(_dense(X))
+        raise AttributeError("predict_proba is only available for classifiers.")
+
+    def predict(self, X):
+        if self.kind in ("gb_classifier", "forest_classifier"):
+            return self.classes_[self.predict_proba(X).argmax(axis=1)]
+        raw = self._raw(_dense(X))
+        return raw[:, 0]
+
+    def fit(self, X, y=None):
+        # Se crea desde un modelo ya entrenado (from_sklearn)
+        return self
+
+
+class CompiledTreeRegressor(RegressorMixin, CompiledTreeEnsemble):
+    pass
+
+
+class CompiledTreeClassifier(ClassifierMixin, CompiledTreeEnsemble):
+    pass
+
+
+def compile_model(model, batch_size: int = 512):
+    """
+    Retorna la versión compilada de un modelo de árboles (CompiledTreeRegressor / CompiledTreeClassifier).
+    """
+    compiled = CompiledTreeEnsemble.from_sklearn(model, batch_size)
+    target = CompiledTreeClassifier if compiled.kind.endswith("classifier") else CompiledTreeRegressor
+    return target(**compiled.get_params())
+
+
+def compile_pipeline(pipeline, batch_size: int = 512):
+    """
+    Reemplaza el último paso del pipeline (el modelo) por su versión compilada y conserva el resto
+    (CustomPreprocessor). Acepta también el formato {"pipeline", "target_encoder"} de clasificación.
+
+    Retorna:
+    - pipeline (o dict) nuevo; el original no se modifica
+    """
+    if isinstance(pipeline, dict):
+        return {**pipeline, "pipeline": compile_pipeline(pipeline["pipeline"], batch_size)}
+    name, model = pipeline.steps[-1]
+    return Pipeline(pipeline.steps[:-1] + [(name, compile_model(model, batch_size))])
+
+
+def export_compiled_pipeline(pipeline_path: str, output_path: str = None, batch_size: int = 512) -> str:
+    """
+    Carga un pipeline guardado (p. ej. GradientBoosting_pipeline.joblib), compila su modelo y lo
+    guarda junto al original como <nombre>_compiled.joblib. El archivo resultante se carga y se usa
+    igual que el original (predict / predict_proba / classes_).
+
+    Retorna:
+    - ruta del archivo generado
+    """
+    if output_path is None:
+        root, ext = os.path.splitext(pipeline_path)
+        output_path = f"{root}_compiled{ext}"
+    joblib.dump(compile_pipeline(joblib.load(pipeline_path), batch_size), output_path)
+    print(f"Pipeline compilado guardado en: {output_path}")
+    return output_path
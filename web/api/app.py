@@ -1,12 +1,17 @@
-from typing import Any, Dict, Tuple,Type
-from fastapi import FastAPI
+from typing import Any, Dict, List, Type
+from fastapi import Body, FastAPI, HTTPException, Query, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, create_model
-import pandas as pd
-import joblib
-import boto3
-import json
-from io import BytesIO
+from pydantic import BaseModel, ValidationError
+import os
+import tempfile
+from artifact_cache import ArtifactCache, LocalS3Client
+from model_registry import ModelRegistry, ModelVersion
+from prediction_cache import PredictionCache
+from inference import InferenceExecutor, predict_classification_rows, predict_regression_rows
+from micro_batcher import MicroBatcher
+from form_options import FORM_FIELDS, FormOptionsCache
+from record_store import FILTER_COLUMNS, RecordStore, table_to_arrow_ipc, table_to_columnar_json
 
 # Inicializar app
 app = FastAPI()
@@ -20,105 +25,283 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Para modelo de regresión
-class RegressionData(BaseModel):
-    maquina: str
-    seccion: str
-    proceso: str
-    usuario: str
-    fabricadas: int
-    turno: str
-
-# Para modelo de clasificación
-class ClassificationData(BaseModel):
-    fabricadas: int
-    referencia: str
-    maquina: str
-    proceso: str
-
-# Función para leer archivos desde S3
-def load_from_s3(bucket: str, key: str):
-    s3 = boto3.client("s3")
-    response = s3.get_object(Bucket=bucket, Key=key)
-    return response["Body"].read()
-
 # Datos del bucket y configuración
 BUCKET_NAME = "proyectointegrador2025"
 CONFIG_KEY = "models/config/config.json"
 
-regression_model = None
-classification_model = None
-features_regression: Dict[str, Type] = {}
-features_classification: Dict[str, Type] = {}
+# Límite de registros por petición en los endpoints batch
+MAX_BATCH_SIZE = 5000
+# Opciones por campo en /form-options si no se indica limit, y máximo permitido
+FORM_OPTIONS_LIMIT = 10
+FORM_OPTIONS_MAX_LIMIT = 10000
 
-RegressionData = None
-ClassificationData = None
+# Cache local de artefactos (indexado por ETag) y carga de modelos
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "model_cache"))
+MODEL_MMAP_MODE = os.environ.get("MODEL_MMAP_MODE") or None  # 'r' para compartir arreglos entre workers
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "0") == "1"
+S3_LOCAL_ROOT = os.environ.get("S3_LOCAL_ROOT")  # Carpeta local que sustituye a S3 (pruebas)
+# Cache de predicciones por combinación de features (tamaño 0 = desactivado)
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+# Segundos entre revisiones del config para recargar automáticamente (0 = desactivado)
+MODEL_POLL_INTERVAL = float(os.environ.get("MODEL_POLL_INTERVAL", "0"))
+# Ejecución de modelos: 'thread' o 'process' (procesos con los modelos precargados)
+INFERENCE_MODE = os.environ.get("INFERENCE_MODE", "thread")
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0")) or None  # 0 = número de CPUs
+INFERENCE_MAX_PENDING = int(os.environ.get("INFERENCE_MAX_PENDING", "64"))  # por encima se responde 429
+INFERENCE_TIMEOUT = float(os.environ.get("INFERENCE_TIMEOUT", "10"))  # segundos por predicción (504)
+# Micro-batching de peticiones concurrentes (ventana 0 = desactivado)
+MICRO_BATCH_WINDOW_MS = float(os.environ.get("MICRO_BATCH_WINDOW_MS", "0"))
+MICRO_BATCH_MAX_ROWS = int(os.environ.get("MICRO_BATCH_MAX_ROWS", "256"))
+# Parquet de registros de producción para /data (ver record_store.py) y tamaño de página
+DATA_STORE_PATH = os.environ.get("DATA_STORE_PATH")
+DATA_PAGE_SIZE = int(os.environ.get("DATA_PAGE_SIZE", "500"))
+DATA_MAX_PAGE_SIZE = int(os.environ.get("DATA_MAX_PAGE_SIZE", "5000"))
 
-# Mapeo simple de string a tipos de Python/Pydantic
-type_mapping = {
-    "str": str,
-    "int": int,
-    "float": float,
-    "bool": bool,
-}
+artifact_cache = ArtifactCache(
+    BUCKET_NAME,
+    MODEL_CACHE_DIR,
+    client=LocalS3Client(S3_LOCAL_ROOT) if S3_LOCAL_ROOT else None,
+)
 
-def parse_features(features_dict: Dict[str, str]) -> Dict[str, Tuple[Type[Any], ...]]:
-    """
-    Convierte el dict {feature_name: 'type_str'} a
-    dict {feature_name: (Type, default_value)} para create_model
-    """
-    parsed = {}
-    for feature_name, type_str in features_dict.items():
-        pydantic_type = type_mapping.get(type_str.lower(), str)
-        parsed[feature_name] = (pydantic_type, ...)
-    return parsed
+# Registro de modelos: cada petición usa la versión publicada al momento de empezar
+model_registry = ModelRegistry(artifact_cache, CONFIG_KEY, mmap_mode=MODEL_MMAP_MODE, preload=PRELOAD_MODELS)
+
+prediction_cache = PredictionCache(max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+model_registry.add_reload_listener(prediction_cache.clear)
 
-def load_models_and_generate_schemas():
-    global regression_model, classification_model
-    global features_regression, features_classification
-    global RegressionData, ClassificationData
+# Opciones del formulario (categorías de los encoders), se recalculan al publicar otra versión
+form_options = FormOptionsCache()
+model_registry.add_reload_listener(form_options.clear)
 
-    config_data = json.loads(load_from_s3(BUCKET_NAME, CONFIG_KEY))
+# Initial load
+model_registry.reload()
 
-    regression_model = joblib.load(BytesIO(load_from_s3(BUCKET_NAME, config_data["regression_model"]["path"])))
-    classification_model = joblib.load(BytesIO(load_from_s3(BUCKET_NAME, config_data["classification_model"]["path"])))
+inference_executor = InferenceExecutor(
+    mode=INFERENCE_MODE,
+    max_workers=INFERENCE_WORKERS,
+    max_pending=INFERENCE_MAX_PENDING,
+    timeout=INFERENCE_TIMEOUT,
+)
+micro_batcher = MicroBatcher(inference_executor, window_ms=MICRO_BATCH_WINDOW_MS, max_rows=MICRO_BATCH_MAX_ROWS)
 
-    features_regression = config_data["regression_model"]["features"]
-    features_classification = config_data["classification_model"]["features"]
+record_store = RecordStore(DATA_STORE_PATH) if DATA_STORE_PATH else None
 
-    regression_fields = parse_features(features_regression)
-    classification_fields = parse_features(features_classification)
+@app.on_event("startup")
+def start_model_polling():
+    model_registry.start_polling(MODEL_POLL_INTERVAL)
+    inference_executor.start(model_registry.current)
 
-    RegressionData = create_model("RegressionData", **regression_fields)
-    ClassificationData = create_model("ClassificationData", **classification_fields)
+@app.on_event("shutdown")
+def stop_model_polling():
+    model_registry.stop_polling()
+    inference_executor.shutdown()
 
-    return RegressionData, ClassificationData
+def validate_record(schema: Type[BaseModel], record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valida un registro contra el schema de la versión en uso (los schemas cambian con el config,
+    por eso no se declaran en la firma de la ruta). Responde 422 como FastAPI si no es válido.
+    """
+    try:
+        return schema.model_validate(record).model_dump()
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False, include_context=False))
 
-# Initial load
-RegressionData, ClassificationData = load_models_and_generate_schemas()
+async def cached_predict(model_name: str, model_version: ModelVersion, rows: List[Dict[str, Any]], predict_rows) -> List[Dict[str, Any]]:
+    """
+    Resuelve cada fila desde el cache de predicciones y ejecuta una sola predicción
+    vectorizada (en el pool de inferencia, agrupada con otras peticiones si el micro-batching
+    está activo) con las filas que no estaban, que luego se guardan en el cache.
+
+    Retorna:
+    - lista de resultados en el mismo orden que rows
+    """
+    if not prediction_cache.enabled:
+        return await micro_batcher.run(predict_rows, model_version, rows)
+
+    keys = [PredictionCache.make_key(model_name, model_version.version, row) for row in rows]
+    results = [prediction_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        predicted = await micro_batcher.run(predict_rows, model_version, [rows[i] for i in missing])
+        for i, result in zip(missing, predicted):
+            prediction_cache.put(keys[i], result)
+            results[i] = result
+    return results
 
 # Endpoint de predicción
 @app.post("/predict-regression")
-def predict_regression(data: RegressionData):
-    df = pd.DataFrame([data.model_dump()])
-    prediction = regression_model.predict(df)[0]
-    return {"duration_minutes": round(prediction, 2)}
+async def predict_regression(data: Dict[str, Any] = Body(...)):
+    model_version = model_registry.current
+    row = validate_record(model_version.RegressionData, data)
+    result = (await cached_predict("regression_model", model_version, [row], predict_regression_rows))[0]
+    return {**result, "model_version": model_version.version}
 
 @app.post("/predict-classification")
-def predict_classification(data: ClassificationData):
-    df = pd.DataFrame([data.model_dump()])
-    original_classes = classification_model["target_encoder"]
-    pipeline = classification_model["pipeline"]
-    predicted_class = pipeline.predict(df)[0]
-    if(original_classes is not None):
-        decoded_predicted_class = original_classes.inverse_transform(predicted_class.reshape(-1,-1))
-    else:
-        decoded_predicted_class = predicted_class
-    probabilities = max(pipeline.predict_proba(df)[0])
-    return {"classification": str(decoded_predicted_class),"probabilty":float(probabilities)}
+async def predict_classification(data: Dict[str, Any] = Body(...)):
+    model_version = model_registry.current
+    row = validate_record(model_version.ClassificationData, data)
+    result = (await cached_predict("classification_model", model_version, [row], predict_classification_rows))[0]
+    return {**result, "model_version": model_version.version}
+
+def validate_records(schema: Type[BaseModel], records: List[Dict[str, Any]]):
+    """
+    Valida cada registro contra el schema dinámico.
+
+    Retorna:
+    - rows: lista de dicts validados (en el orden de entrada)
+    - row_indices: posición original de cada fila válida
+    - errors: dict {posición: lista de errores de validación}
+    """
+    if len(records) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds the limit of {MAX_BATCH_SIZE} records.")
+
+    rows, row_indices, errors = [], [], {}
+    for i, record in enumerate(records):
+        try:
+            rows.append(schema.model_validate(record).model_dump())
+            row_indices.append(i)
+        except ValidationError as e:
+            errors[i] = e.errors(include_url=False, include_context=False)
+    return rows, row_indices, errors
+
+def build_batch_response(n_records: int, predictions: Dict[int, Dict[str, Any]], errors: Dict[int, Any], model_version: str):
+    """
+    Arma la respuesta batch respetando el orden de entrada: cada posición
+    tiene su predicción o sus errores de validación.
+    """
+    results = []
+    for i in range(n_records):
+        if i in errors:
+            results.append({"index": i, "error": errors[i]})
+        else:
+            results.append({"index": i, **predictions[i]})
+    return {"n_records": n_records, "n_errors": len(errors), "results": results, "model_version": model_version}
+
+@app.post("/predict-regression/batch")
+async def predict_regression_batch(records: List[Dict[str, Any]]):
+    model_version = model_registry.current
+    rows, row_indices, errors = validate_records(model_version.RegressionData, records)
+    predictions = {}
+    if rows:
+        # Una sola llamada vectorizada sobre todas las filas válidas que no están en el cache
+        results = await cached_predict("regression_model", model_version, rows, predict_regression_rows)
+        predictions = dict(zip(row_indices, results))
+    return build_batch_response(len(records), predictions, errors, model_version.version)
+
+@app.post("/predict-classification/batch")
+async def predict_classification_batch(records: List[Dict[str, Any]]):
+    model_version = model_registry.current
+    rows, row_indices, errors = validate_records(model_version.ClassificationData, records)
+    predictions = {}
+    if rows:
+        results = await cached_predict("classification_model", model_version, rows, predict_classification_rows)
+        predictions = dict(zip(row_indices, results))
+    return build_batch_response(len(records), predictions, errors, model_version.version)
 
 @app.post("/reload-models")
-def reload_models():
-    global RegressionData, ClassificationData
-    RegressionData, ClassificationData = load_models_and_generate_schemas()
-    return {"status": "ok", "message": "Models, schemas and config reloaded successfully."}
+def reload_models(wait: bool = True):
+    """
+    Recarga config, schemas y modelos en segundo plano y publica la nueva versión de forma atómica.
+    Con wait=false responde de inmediato mientras la recarga continúa.
+    """
+    reload_thread = model_registry.reload_in_background()
+    if not wait:
+        return {"status": "accepted", "message": "Model reload started.", "model_version": model_registry.current.version}
+    reload_thread.join()
+    if model_registry.last_reload_error is not None:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {model_registry.last_reload_error}")
+    return {"status": "ok", "message": "Models, schemas and config reloaded successfully.",
+            "model_version": model_registry.current.version}
+
+@app.get("/model-version")
+def get_model_version():
+    model_version = model_registry.current
+    return {"model_version": model_version.version, "loaded_models": list(model_version.loaded_models())}
+
+@app.get("/prediction-cache/stats")
+def get_prediction_cache_stats():
+    return prediction_cache.stats()
+
+@app.get("/inference/stats")
+def get_inference_stats():
+    return {**inference_executor.stats(), "micro_batching": micro_batcher.stats()}
+
+@app.get("/form-options")
+def get_form_options(response: Response, field: str = None, prefix: str = "", limit: int = FORM_OPTIONS_LIMIT):
+    """
+    Opciones del formulario de predicción (referencia, maquina, seccion, proceso, usuario) tomadas
+    de las categorías de los encoders de los modelos en uso. Mismo formato que la lambda
+    anterior: {campo: [valores]}.
+
+    - field: un solo campo (por defecto todos)
+    - prefix: filtra por prefijo sin distinguir mayúsculas ni tildes
+    - limit: máximo de valores por campo
+    """
+    if field is not None and field not in FORM_FIELDS:
+        raise HTTPException(status_code=422, detail=f"field must be one of {list(FORM_FIELDS)}.")
+    if not 1 <= limit <= FORM_OPTIONS_MAX_LIMIT:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {FORM_OPTIONS_MAX_LIMIT}.")
+
+    model_version = model_registry.current
+    index = form_options.get(model_version)
+    fields = [field] if field is not None else list(FORM_FIELDS)
+    response.headers["X-Model-Version"] = model_version.version
+    response.headers["Cache-Control"] = "private, max-age=60"
+    return {name: index.search(name, prefix, limit) for name in fields}
+
+@app.get("/data")
+def get_data(
+    start: str = None,
+    end: str = None,
+    seccion: List[str] = Query(None),
+    maquina: List[str] = Query(None),
+    proceso: List[str] = Query(None),
+    usuario: List[str] = Query(None),
+    estado: List[str] = Query(None),
+    columns: str = None,
+    sort_by: str = "fecha_inicio",
+    order: str = "asc",
+    limit: int = None,
+    cursor: str = None,
+    count: bool = False,
+    format: str = "json",
+):
+    """
+    Registros de producción paginados. Los filtros (rango de fechas sobre fecha_inicio y uno o
+    varios valores por columna) se aplican en el scan del Parquet; columns (separadas por coma)
+    limita las columnas leídas y sort_by / order ordenan en el servidor.
+
+    Retorna una página en JSON columnar ({columna: [valores]}) o en Arrow IPC (format=arrow) y el
+    cursor de la página siguiente (next_cursor, o el header X-Next-Cursor en Arrow).
+    """
+    if record_store is None or not os.path.exists(record_store.path):
+        raise HTTPException(status_code=503, detail="Data store is not configured.")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=422, detail="order must be 'asc' or 'desc'.")
+    if format not in ("json", "arrow"):
+        raise HTTPException(status_code=422, detail="format must be 'json' or 'arrow'.")
+    limit = DATA_PAGE_SIZE if limit is None else limit
+    if not 1 <= limit <= DATA_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {DATA_MAX_PAGE_SIZE}.")
+
+    filter_values = dict(zip(FILTER_COLUMNS, (seccion, maquina, proceso, usuario, estado)))
+    try:
+        page = record_store.query(
+            columns=[c.strip() for c in columns.split(",") if c.strip()] if columns else None,
+            start=start, end=end, filters={k: v for k, v in filter_values.items() if v},
+            sort_by=sort_by, descending=order == "desc", limit=limit, cursor=cursor, count=count,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    table = page["table"]
+    if format == "arrow":
+        headers = {"X-Row-Count": str(table.num_rows)}
+        if page["next_cursor"]:
+            headers["X-Next-Cursor"] = page["next_cursor"]
+        if page["total"] is not None:
+            headers["X-Total-Count"] = str(page["total"])
+        return Response(table_to_arrow_ipc(table), media_type="application/vnd.apache.arrow.stream", headers=headers)
+    return {"columns": table.column_names, "n_rows": table.num_rows, "data": table_to_columnar_json(table),
+            "next_cursor": page["next_cursor"], "total": page["total"]}
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import tempfile
+from io import BytesIO
+
+import joblib
+from botocore.exceptions import ClientError
+
+
+class LocalS3Client:
+    """
+    Sustituto local del cliente S3 (solo get_object) que lee los objetos desde
+    <root>/<bucket>/<key>. Responde ETag y respeta IfNoneMatch como S3, por lo que sirve
+    para pruebas y desarrollo sin credenciales (variable S3_LOCAL_ROOT).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.get_object_calls = 0
+
+    def get_object(self, Bucket: str, Key: str, IfNoneMatch: str = None, **kwargs):
+        self.get_object_calls += 1
+        path = os.path.join(self.root, Bucket, Key)
+        if not os.path.exists(path):
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": f"{Key} not found"},
+                               "ResponseMetadata": {"HTTPStatusCode": 404}}, "GetObject")
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if IfNoneMatch is not None and IfNoneMatch == etag:
+            raise ClientError({"Error": {"Code": "304", "Message": "Not Modified"},
+                               "ResponseMetadata": {"HTTPStatusCode": 304}}, "GetObject")
+        return {"Body": BytesIO(body), "ETag": etag}
+
+
+def _is_not_modified(error: ClientError) -> bool:
+    code = error.response.get("Error", {}).get("Code")
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in ("304", "NotModified") or status == 304
+
+
+class ArtifactCache:
+    """
+    Cache local en disco de los artefactos del bucket, indexado por ETag / VersionId de S3.
+
+    Cada versión de un objeto se guarda en su propio archivo <cache_dir>/<bucket>/<key>.<hash del ETag>,
+    que no se modifica después de escrito. El archivo <key>.meta.json indica cuál es la versión
+    vigente (etag, version_id y nombre del archivo), así que cambiar de versión es un único rename
+    del .meta.json y un lector nunca combina datos nuevos con metadatos viejos. Las rutas de
+    versiones anteriores siguen siendo válidas para quien ya las tenga.
+
+    Las lecturas siguientes hacen un GET condicional (IfNoneMatch) y, si S3 responde 304,
+    se usa la copia local sin volver a descargar.
+    """
+
+    def __init__(self, bucket: str, cache_dir: str, client=None):
+        self.bucket = bucket
+        self.cache_dir = cache_dir
+        self.client = client
+
+    def _get_client(self):
+        if self.client is None:
+            import boto3
+            self.client = boto3.client("s3")
+        return self.client
+
+    def _base_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, self.bucket, key)
+
+    def _version_path(self, key: str, meta: dict) -> str:
+        # La ruta incluye el ETag (o el VersionId): cada versión del objeto tiene su propio archivo
+        tag = meta.get("etag") or meta.get("version_id") or ""
+        return f"{self._base_path(key)}.{hashlib.sha1(tag.encode()).hexdigest()[:16]}"
+
+    def _read_meta(self, meta_path: str):
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        # Metadatos del formato anterior (sin archivo versionado): se descarga de nuevo
+        return meta if "file" in meta else None
+
+    def _atomic_write(self, path: str, data: bytes):
+        # Escritura atómica: varios workers pueden compartir el mismo directorio de cache
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def fetch(self, key: str):
+        """
+        Asegura que la copia local de key esté al día.
+
+        Retorna:
+        - path: ruta local de la versión del artefacto (no cambia de contenido en recargas posteriores)
+        - meta: dict con 'etag' y 'version_id' de la copia local
+        - downloaded: True si hubo que descargar el objeto
+        """
+        base_path = self._base_path(key)
+        meta_path = base_path + ".meta.json"
+        meta = self._read_meta(meta_path)
+        request = {"Bucket": self.bucket, "Key": key}
+        if meta is not None and os.path.exists(os.path.join(os.path.dirname(base_path), meta["file"])):
+            request["IfNoneMatch"] = meta["etag"]
+
+        try:
+            response = self._get_client().get_object(**request)
+        except ClientError as e:
+            if "IfNoneMatch" in request and _is_not_modified(e):
+                return os.path.join(os.path.dirname(base_path), meta["file"]), meta, False
+            raise
+
+        meta = {"etag": response.get("ETag"), "version_id": response.get("VersionId")}
+        path = self._version_path(key, meta)
+        meta["file"] = os.path.basename(path)
+        # Primero los datos (archivo nuevo) y después el .meta.json que apunta a ellos
+        self._atomic_write(path, response["Body"].read())
+        self._atomic_write(meta_path, json.dumps(meta).encode())
+        return path, meta, True
+
+    def get_bytes(self, key: str) -> bytes:
+        path, _, _ = self.fetch(key)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def load_joblib(self, key: str, mmap_mode: str = None):
+        """
+        Carga un artefacto joblib desde la copia local.
+
+        Con mmap_mode='r' los arreglos de NumPy de archivos sin comprimir se mapean en memoria,
+        de modo que varios workers de uvicorn comparten las mismas páginas en lugar de tener
+        cada uno su copia.
+
+        Retorna:
+        - (objeto cargado, meta)
+        """
+        path, meta, _ = self.fetch(key)
+        return joblib.load(path, mmap_mode=mmap_mode), meta
@@ -0,0 +1,107 @@
+import bisect
+import threading
+import unicodedata
+from typing import Dict, List
+
+import pandas as pd
+
+from model_registry import MODEL_NAMES
+
+# Campos del formulario de predicción (mismo orden que lambda1)
+FORM_FIELDS = ("referencia", "maquina", "seccion", "proceso", "usuario")
+
+
+def _normalize(text: str) -> str:
+    # Búsqueda sin distinguir mayúsculas ni tildes ("sección" y "SECCION" coinciden)
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def _encoder_vocabularies(model) -> Dict[str, set]:
+    """
+    {columna: categorías} del OrdinalEncoder de un pipeline (CustomPreprocessor o el paso
+    'encoder' del formato anterior), sin el valor de faltantes.
+    """
+    pipeline = model["pipeline"] if isinstance(model, dict) else model
+    steps = getattr(pipeline, "named_steps", {})
+    preprocessor = steps.get("preprocessor")
+    if preprocessor is not None and hasattr(preprocessor, "cat_cols"):
+        encoder, columns = preprocessor.encoder, preprocessor.cat_cols
+    elif steps.get("encoder") is not None and hasattr(steps["encoder"], "feature_names_in_"):
+        encoder, columns = steps["encoder"], list(steps["encoder"].feature_names_in_)
+    else:
+        return {}
+
+    vocabularies = {}
+    for column, categories in zip(columns, getattr(encoder, "categories_", [])):
+        vocabularies[column] = {str(value) for value in categories if not pd.isna(value)}
+    return vocabularies
+
+
+class FormOptionIndex:
+    """
+    Listas de opciones por campo, ordenadas sin mayúsculas/tildes, con búsqueda por prefijo
+    en O(log n) (bisect sobre las claves normalizadas).
+    """
+
+    def __init__(self, vocabularies: Dict[str, set], version: str):
+        self.version = version
+        self._values = {}
+        self._keys = {}
+        for field, values in vocabularies.items():
+            ordered = sorted(values, key=lambda value: (_normalize(value), value))
+            self._values[field] = ordered
+            self._keys[field] = [_normalize(value) for value in ordered]
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._values)
+
+    def search(self, field: str, prefix: str = "", limit: int = None) -> List[str]:
+        values, keys = self._values.get(field, []), self._keys.get(field, [])
+        if prefix:
+            key = _normalize(prefix)
+            start = bisect.bisect_left(keys, key)
+            end = start
+            stop = len(keys) if limit is None else min(len(keys), start + limit)
+            while end < stop and keys[end].startswith(key):
+                end += 1
+            return values[start:end]
+        return values if limit is None else values[:limit]
+
+    def count(self, field: str) -> int:
+        return len(self._values.get(field, []))
+
+
+class FormOptionsCache:
+    """
+    Opciones del formulario derivadas de los encoders de los modelos cargados.
+
+    El índice se construye una vez por ModelVersion (cargando los modelos si hace falta) y se
+    descarta cuando el registro publica una versión nueva (ver ModelRegistry.add_reload_listener).
+    """
+
+    def __init__(self, fields=FORM_FIELDS):
+        self.fields = tuple(fields)
+        self._index = None
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def clear(self, _model_version=None):
+        with self._lock:
+            self._index = None
+
+    def get(self, model_version) -> FormOptionIndex:
+        index = self._index
+        if index is not None and index.version == model_version.version:
+            return index
+        with self._lock:
+            if self._index is None or self._index.version != model_version.version:
+                vocabularies = {field: set() for field in self.fields}
+                for name in MODEL_NAMES:
+                    for column, values in _encoder_vocabularies(model_version.get_model(name)).items():
+                        if column in vocabularies:
+                            vocabularies[column] |= values
+                self._index = FormOptionIndex(vocabularies, model_version.version)
+                self.builds += 1
+            return self._index
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+from fastapi import HTTPException
+
+from model_registry import load_model_file
+
+
+def predict_classes(model_version, df: pd.DataFrame):
+    """
+    Una sola llamada a predict_proba: la clase predicha es la de mayor probabilidad.
+
+    Retorna:
+    - clases decodificadas con el target_encoder (si existe)
+    - probabilidad de la clase predicha
+    """
+    classification_model = model_version.get_model("classification_model")
+    original_classes = classification_model["target_encoder"]
+    pipeline = classification_model["pipeline"]
+    probabilities = pipeline.predict_proba(df)
+    best = probabilities.argmax(axis=1)
+    predicted_classes = pipeline.classes_[best]
+    if(original_classes is not None):
+        decoded_predicted_classes = original_classes.inverse_transform(predicted_classes.reshape(-1, 1)).ravel()
+    else:
+        decoded_predicted_classes = predicted_classes
+    return decoded_predicted_classes, probabilities[range(len(best)), best]
+
+def predict_regression_rows(model_version, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    y_pred = model_version.get_model("regression_model").predict(df)
+    return [{"duration_minutes": round(float(prediction), 2)} for prediction in y_pred]
+
+def predict_classification_rows(model_version, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    decoded_predicted_classes, probabilities = predict_classes(model_version, df)
+    return [{"classification": str(predicted_class), "probabilty": float(probability)}
+            for predicted_class, probability in zip(decoded_predicted_classes, probabilities)]
+
+
+# Modelos cargados en cada proceso del pool: {nombre_modelo: (etag, modelo)}
+_worker_models: Dict[str, Tuple[str, Any]] = {}
+
+
+def expected_features(model_version) -> Dict[str, Any]:
+    # Features del config de cada modelo, para validar los artefactos igual que ModelVersion.get_model
+    return {name: model_version.config[name]["features"] for name in model_version.artifacts}
+
+
+class WorkerModels:
+    """
+    Vista de una ModelVersion dentro de un proceso del pool: solo viaja la ruta local versionada
+    (propia del ETag, ver ArtifactCache) y el ETag de cada artefacto; el modelo se carga una vez
+    por proceso y se reemplaza cuando cambia el ETag.
+    """
+
+    def __init__(self, artifacts: Dict[str, Tuple[str, str]], mmap_mode: str = None,
+                 features: Dict[str, Any] = None):
+        self.artifacts = artifacts
+        self.mmap_mode = mmap_mode
+        self.features = features or {}
+
+    def get_model(self, name: str):
+        path, etag = self.artifacts[name]
+        loaded = _worker_models.get(name)
+        if loaded is None or loaded[0] != etag:
+            model = load_model_file(path, self.mmap_mode, expected_features=self.features.get(name))
+            _worker_models[name] = loaded = (etag, model)
+        return loaded[1]
+
+
+def _preload_worker(artifacts: Dict[str, Tuple[str, str]], mmap_mode: str = None, features: Dict[str, Any] = None):
+    # Inicializador del pool: cada proceso arranca con los modelos de la versión actual en memoria
+    worker_models = WorkerModels(artifacts, mmap_mode, features)
+    for name in artifacts:
+        worker_models.get_model(name)
+
+
+def _predict_in_worker(predict_rows, artifacts, mmap_mode, features, rows):
+    return predict_rows(WorkerModels(artifacts, mmap_mode, features), pd.DataFrame(rows))
+
+
+class InferenceExecutor:
+    """
+    Ejecuta las predicciones fuera del event loop con concurrencia acotada.
+
+    - mode='thread': pool de hilos con los modelos de la ModelVersion (comparten memoria).
+    - mode='process': pool de procesos; cada proceso precarga los modelos y recibe solo las
+      filas a predecir, así las predicciones no compiten por el GIL con el servidor.
+    - Como máximo max_pending predicciones en ejecución o en cola; por encima se responde 429.
+    - Cada predicción tiene un timeout (504). El cupo se libera cuando la tarea termina de
+      verdad, no al vencer el timeout, para que la cola no crezca sin límite.
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: int = None, max_pending: int = 64, timeout: float = 10.0):
+        if mode not in ("thread", "process"):
+            raise ValueError("mode must be 'thread' or 'process'.")
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def start(self, model_version=None):
+        """
+        Crea el pool (si no existe). En modo proceso cada proceso precarga los modelos de model_version.
+        """
+        with self._lock:
+            if self._pool is not None:
+                return
+            if self.mode == "process":
+                initargs = ((model_version.artifacts, model_version.mmap_mode, expected_features(model_version))
+                            if model_version is not None else ({},))
+                self._pool = ProcessPoolExecutor(self.max_workers, initializer=_preload_worker, initargs=initargs)
+            else:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="inference")
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(status_code=429, detail="Inference queue is full, retry later.",
+                                    headers={"Retry-After": "1"})
+            self.pending += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.pending -= 1
+
+    def _submit(self, predict_rows, model_version, rows: List[Dict[str, Any]]):
+        if self._pool is None:
+            self.start(model_version)
+        if self.mode == "process":
+            return self._pool.submit(_predict_in_worker, predict_rows, model_version.artifacts, model_version.mmap_mode,
+                                     expected_features(model_version), rows)
+        return self._pool.submit(predict_rows, model_version, pd.DataFrame(rows))
+
+    async def run(self, predict_rows, model_version, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Ejecuta predict_rows(model_version, DataFrame(rows)) en el pool.
+
+        Retorna:
+        - lista de resultados en el orden de rows
+        """
+        self._acquire()
+        try:
+            future = self._submit(predict_rows, model_version, rows)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise HTTPException(status_code=504, detail=f"Prediction timed out after {self.timeout} seconds.")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "max_workers": self.max_workers, "max_pending": self.max_pending,
+                    "timeout_seconds": self.timeout, "pending": self.pending, "rejected": self.rejected,
+                    "timed_out": self.timed_out}
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
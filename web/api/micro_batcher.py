@@ -0,0 +1,107 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Agrupa las predicciones que llegan casi al mismo tiempo en una sola llamada vectorizada.
+
+    Las peticiones para el mismo modelo y versión se acumulan durante window_ms (o hasta max_rows
+    filas) y se ejecutan juntas con InferenceExecutor.run; cada petición recibe solo sus filas.
+    Con window_ms = 0 el batcher está desactivado y cada petición se ejecuta sola.
+    """
+
+    def __init__(self, executor, window_ms: float = 0.0, max_rows: int = 256, history: int = 1000):
+        self.executor = executor
+        self.window = window_ms / 1000.0
+        self.max_rows = max_rows
+        self._pending = {}  # {(predict_rows, version): lote en formación}
+        self._tasks = set()  # referencias a los lotes en ejecución (evita que el GC los cancele)
+        # Últimas muestras para las métricas (tamaño de lote y espera en cola)
+        self._batch_rows = deque(maxlen=history)
+        self._batch_requests = deque(maxlen=history)
+        self._queue_delays = deque(maxlen=history)
+        self.n_batches = 0
+        self.n_requests = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def run(self, predict_rows, model_version, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Encola las filas en el lote abierto de (predict_rows, versión) y espera sus resultados.
+        """
+        if not self.enabled:
+            return await self.executor.run(predict_rows, model_version, rows)
+
+        loop = asyncio.get_running_loop()
+        key = (predict_rows, model_version.version)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = {"model_version": model_version, "items": [], "n_rows": 0}
+            self._pending[key] = batch
+            batch["timer"] = loop.call_later(self.window, self._flush, key)
+
+        future = loop.create_future()
+        batch["items"].append((rows, future, time.perf_counter()))
+        batch["n_rows"] += len(rows)
+        if batch["n_rows"] >= self.max_rows:
+            batch["timer"].cancel()
+            self._flush(key)
+        return await future
+
+    def _flush(self, key):
+        batch = self._pending.pop(key, None)
+        if batch is not None:
+            task = asyncio.get_running_loop().create_task(self._execute(key[0], batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, predict_rows, batch):
+        items = batch["items"]
+        started = time.perf_counter()
+        self.n_batches += 1
+        self.n_requests += len(items)
+        self._batch_rows.append(batch["n_rows"])
+        self._batch_requests.append(len(items))
+        self._queue_delays.extend(started - enqueued for _, _, enqueued in items)
+
+        all_rows = [row for rows, _, _ in items for row in rows]
+        try:
+            results = await self.executor.run(predict_rows, batch["model_version"], all_rows)
+        except Exception as e:
+            # El mismo error (429, 504, ...) para todas las peticiones del lote
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        start = 0
+        for rows, future, _ in items:
+            if not future.done():
+                future.set_result(results[start:start + len(rows)])
+            start += len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        def summary(values, scale=1.0):
+            if not values:
+                return None
+            values = np.asarray(values, dtype=float) * scale
+            return {"mean": float(values.mean()), "p50": float(np.percentile(values, 50)),
+                    "p99": float(np.percentile(values, 99)), "max": float(values.max())}
+
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000.0,
+            "max_rows": self.max_rows,
+            "batches": self.n_batches,
+            "requests": self.n_requests,
+            "batch_rows": summary(self._batch_rows),
+            "batch_requests": summary(self._batch_requests),
+            "queue_delay_ms": summary(self._queue_delays, 1000.0),
+        }
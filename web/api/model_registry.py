@@ -0,0 +1,204 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Tuple, Type
+
+import joblib
+from pydantic import create_model
+
+from functions.model_artifacts import is_artifact, load_artifact
+from functions.model_transformer import CustomPreprocessor
+
+MODEL_NAMES = ("regression_model", "classification_model")
+
+# Mapeo simple de string a tipos de Python/Pydantic
+type_mapping = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": bool,
+}
+
+def parse_features(features_dict: Dict[str, str]) -> Dict[str, Tuple[Type[Any], ...]]:
+    """
+    Convierte el dict {feature_name: 'type_str'} a
+    dict {feature_name: (Type, default_value)} para create_model
+    """
+    parsed = {}
+    for feature_name, type_str in features_dict.items():
+        pydantic_type = type_mapping.get(type_str.lower(), str)
+        parsed[feature_name] = (pydantic_type, ...)
+    return parsed
+
+def enable_compiled_transform(pipeline):
+    """
+    Activa el modo compilado (sin pandas) del CustomPreprocessor del pipeline, si lo tiene.
+    """
+    preprocessor = pipeline.named_steps.get("preprocessor")
+    if isinstance(preprocessor, CustomPreprocessor):
+        preprocessor.set_params(compiled=True)
+
+
+def load_model_file(path: str, mmap_mode: str = None, expected_features=None):
+    """
+    Carga un modelo desde un .joblib o desde un artefacto versionado (se detecta por la firma del
+    archivo, no por la extensión) y activa el modo compilado del preprocesador.
+
+    En los artefactos se validan el manifiesto, las features esperadas y el checksum; mmap_mode
+    solo aplica a los .joblib (los payloads del artefacto están comprimidos).
+    """
+    if is_artifact(path):
+        model = load_artifact(path, expected_features=expected_features)
+    else:
+        model = joblib.load(path, mmap_mode=mmap_mode)
+    enable_compiled_transform(model["pipeline"] if isinstance(model, dict) else model)
+    return model
+
+
+class ModelVersion:
+    """
+    Versión inmutable de config + schemas + modelos. Una petición toma la versión actual
+    al comenzar y la usa hasta el final, aunque mientras tanto se publique otra.
+
+    Los modelos se cargan en su primer uso desde la copia local del artefacto descargada
+    al crear la versión. Esa ruta es propia del ETag (ver ArtifactCache), así que una recarga
+    posterior no cambia lo que carga una versión anterior.
+    """
+
+    def __init__(self, config: Dict[str, Any], config_etag: str, artifacts: Dict[str, Tuple[str, str]],
+                 mmap_mode: str = None, models: Dict[str, Any] = None):
+        self.config = config
+        self.config_etag = config_etag
+        self.artifacts = artifacts  # {nombre_modelo: (ruta_local_versionada, etag)}
+        self.mmap_mode = mmap_mode
+        self._models = dict(models or {})
+        self._lock = threading.Lock()
+
+        fingerprint = json.dumps([config_etag, sorted((name, etag) for name, (_, etag) in artifacts.items())])
+        self.version = hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+
+        self.features_regression = config["regression_model"]["features"]
+        self.features_classification = config["classification_model"]["features"]
+        self.RegressionData = create_model("RegressionData", **parse_features(self.features_regression))
+        self.ClassificationData = create_model("ClassificationData", **parse_features(self.features_classification))
+
+    def get_model(self, name: str):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = load_model_file(self.artifacts[name][0], self.mmap_mode,
+                                                     expected_features=self.config[name]["features"])
+            return self._models[name]
+
+    def loaded_models(self) -> Dict[str, Any]:
+        return dict(self._models)
+
+
+class ModelRegistry:
+    """
+    Registro de la versión de modelos en uso.
+
+    Las recargas construyen una ModelVersion completa (config, schemas y los modelos que la
+    versión anterior ya tenía en memoria) fuera del camino de las peticiones y la publican con
+    un único cambio de referencia. Opcionalmente un hilo revisa el config cada cierto tiempo y
+    recarga cuando su ETag cambia.
+    """
+
+    def __init__(self, artifact_cache, config_key: str, mmap_mode: str = None, preload: bool = False):
+        self.artifact_cache = artifact_cache
+        self.config_key = config_key
+        self.mmap_mode = mmap_mode
+        self.preload = preload
+        self.current: ModelVersion = None
+        self._reload_lock = threading.Lock()
+        self._stop_polling = threading.Event()
+        self._poller = None
+        self.last_reload_error = None
+        self._reload_listeners = []
+
+    def add_reload_listener(self, listener):
+        """
+        Registra una función que se llama con la nueva ModelVersion después de cada publicación
+        (p.ej. para invalidar caches que dependen de los modelos).
+        """
+        self._reload_listeners.append(listener)
+
+    def _build_version(self) -> ModelVersion:
+        config_path, config_meta, _ = self.artifact_cache.fetch(self.config_key)
+        with open(config_path) as f:
+            config = json.load(f)
+
+        artifacts = {}
+        for name in MODEL_NAMES:
+            path, meta, _ = self.artifact_cache.fetch(config[name]["path"])
+            artifacts[name] = (path, meta["etag"])
+
+        # Se reutilizan los modelos cuyo artefacto no cambió
+        models = {}
+        previous = self.current
+        if previous is not None:
+            for name, model in previous.loaded_models().items():
+                if previous.artifacts[name] == artifacts[name]:
+                    models[name] = model
+
+        new_version = ModelVersion(config, config_meta["etag"], artifacts, self.mmap_mode, models)
+
+        # Precarga fuera del camino de las peticiones: lo que estaba en memoria sigue en memoria
+        to_load = MODEL_NAMES if self.preload else (previous.loaded_models() if previous else ())
+        for name in to_load:
+            new_version.get_model(name)
+        return new_version
+
+    def reload(self) -> ModelVersion:
+        """
+        Carga una nueva versión y la publica de forma atómica. Las peticiones en curso terminan
+        con la versión anterior.
+        """
+        with self._reload_lock:
+            new_version = self._build_version()
+            self.current = new_version
+        for listener in self._reload_listeners:
+            listener(new_version)
+        return new_version
+
+    def _reload_safely(self):
+        # En segundo plano un error no debe tumbar el servicio: se conserva la versión anterior
+        try:
+            self.reload()
+            self.last_reload_error = None
+        except Exception as e:
+            self.last_reload_error = e
+            print(f"Error recargando modelos: {e}")
+
+    def reload_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self._reload_safely, name="model-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def _poll(self, interval: float):
+        while not self._stop_polling.wait(interval):
+            try:
+                _, meta, _ = self.artifact_cache.fetch(self.config_key)
+                # Se compara contra la versión publicada, no contra la copia local del cache
+                if self.current is None or meta["etag"] != self.current.config_etag:
+                    self._reload_safely()
+            except Exception as e:
+                print(f"Error revisando el config de modelos: {e}")
+
+    def start_polling(self, interval: float):
+        """
+        Inicia un hilo que revisa el config cada `interval` segundos (GET condicional) y recarga si cambió.
+        """
+        if self._poller is not None or interval <= 0:
+            return
+        self._stop_polling.clear()
+        self._poller = threading.Thread(target=self._poll, args=(interval,), name="model-poller", daemon=True)
+        self._poller.start()
+
+    def stop_polling(self):
+        if self._poller is not None:
+            self._stop_polling.set()
+            self._poller.join()
+            self._poller = None
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+class PredictionCache:
+    """
+    Cache LRU con TTL para resultados de predicción.
+
+    La clave es la tupla de features ya validadas y normalizadas por el schema más el nombre
+    y la versión del modelo, así que un resultado nunca se sirve con otra versión. Al publicar
+    una versión nueva el cache se vacía (ver ModelRegistry.add_reload_listener).
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # {clave: (expira_en, valor)}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(model_name: str, model_version: str, row: Dict[str, Any]) -> Hashable:
+        return (model_name, model_version, tuple(row.values()))
+
+    def get(self, key: Hashable):
+        """
+        Retorna el valor guardado o None si no existe o ya expiró.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self, *args):
+        # Acepta la versión nueva como argumento para usarse como listener de recarga
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
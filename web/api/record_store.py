@@ -0,0 +1,217 @@
+import base64
+import json
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Columna con la posición de cada registro en el orden físico (fecha_inicio); desempata el cursor
+ROW_ID = "_row"
+DATE_COLUMN = "fecha_inicio"
+FILTER_COLUMNS = ("seccion", "maquina", "proceso", "usuario", "estado")
+ROW_GROUP_SIZE = 5000
+
+
+def build_record_store(df: pd.DataFrame, path: str, row_group_size: int = ROW_GROUP_SIZE) -> int:
+    """
+    Escribe los registros de producción como Parquet ordenado por fecha_inicio, con row groups
+    chicos (sus estadísticas min/max permiten saltar bloques al filtrar por fecha) y la columna
+    _row con la posición de cada registro.
+
+    Las columnas categóricas se guardan como texto (Parquet igual las codifica con diccionario)
+    para poder compararlas y ordenarlas en los filtros.
+
+    Retorna:
+    - número de registros escritos
+    """
+    df = df.sort_values(DATE_COLUMN, kind="stable", ignore_index=True)
+    df = df.assign(**{col: df[col].astype(str).where(df[col].notna(), None)
+                      for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    df[ROW_ID] = pd.RangeIndex(len(df), name=None).to_numpy(dtype="int64")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, row_group_size=row_group_size, compression="zstd")
+    os.replace(tmp_path, path)  # los lectores nunca ven un archivo a medio escribir
+    return len(df)
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+
+
+class RecordStore:
+    """
+    Consulta paginada sobre el Parquet de registros (ver build_record_store).
+
+    - Los filtros (rango de fechas y valores de seccion, maquina, proceso, usuario, estado) se
+      pasan al scan de pyarrow: los row groups fuera del rango se descartan sin leerse.
+    - Solo se leen las columnas pedidas (más la de orden y _row).
+    - La paginación es por cursor (keyset): el cursor guarda el último (valor de orden, _row)
+      y la página siguiente se filtra a partir de ahí, sin OFFSET.
+    - Ordenando por fecha_inicio ascendente (el orden físico) el scan se detiene al llenar la
+      página, así que el costo depende del tamaño de página y no del historial.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._dataset = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    @property
+    def dataset(self) -> ds.Dataset:
+        # Se reabre si el archivo fue reemplazado (nuevo build)
+        mtime = os.path.getmtime(self.path)
+        with self._lock:
+            if self._dataset is None or mtime != self._mtime:
+                self._dataset = ds.dataset(self.path, format="parquet")
+                self._mtime = mtime
+            return self._dataset
+
+    @property
+    def columns(self) -> List[str]:
+        return [name for name in self.dataset.schema.names if name != ROW_ID]
+
+    def _scalar(self, column: str, value):
+        field_type = self.dataset.schema.field(column).type
+        if pa.types.is_timestamp(field_type) or pa.types.is_date(field_type):
+            value = pd.Timestamp(value)
+            if pa.types.is_timestamp(field_type) and field_type.tz is None and value.tz is not None:
+                value = value.tz_convert(None)
+            return pa.scalar(value, type=pa.timestamp("ns")).cast(field_type)
+        return pa.scalar(value).cast(field_type)
+
+    def _filter(self, start=None, end=None, filters: Dict[str, List[str]] = None):
+        expression = None
+
+        def add(condition):
+            nonlocal expression
+            expression = condition if expression is None else expression & condition
+
+        if start is not None:
+            add(ds.field(DATE_COLUMN) >= self._scalar(DATE_COLUMN, start))
+        if end is not None:
+            add(ds.field(DATE_COLUMN) <= self._scalar(DATE_COLUMN, end))
+        for column, values in (filters or {}).items():
+            if values:
+                add(ds.field(column).isin(pa.array(values, type=self.dataset.schema.field(column).type)))
+        return expression
+
+    def _after(self, sort_by: str, descending: bool, cursor: Dict[str, Any]):
+        # Registros posteriores al último de la página anterior en el orden (sort_by, _row); los nulos van al final
+        row = ds.field(ROW_ID)
+        column = ds.field(sort_by)
+        last_row = pa.scalar(cursor["row"], pa.int64())
+        if cursor["value"] is None:
+            return column.is_null() & (row < last_row if descending else row > last_row)
+        value = self._scalar(sort_by, cursor["value"])
+        beyond = column < value if descending else column > value
+        tie = (column == value) & (row < last_row if descending else row > last_row)
+        return beyond | tie | column.is_null()
+
+    def query(self, columns: Optional[List[str]] = None, start=None, end=None, filters: Dict[str, List[str]] = None,
+              sort_by: str = DATE_COLUMN, descending: bool = False, limit: int = 500, cursor: str = None,
+              count: bool = False) -> Dict[str, Any]:
+        """
+        Retorna:
+        - dict con "table" (pyarrow.Table de la página, sin _row), "next_cursor" (None en la última
+          página) y "total" (registros que cumplen los filtros, solo si count=True)
+        """
+        schema_names = set(self.dataset.schema.names) - {ROW_ID}
+        columns = list(columns) if columns else self.columns
+        unknown = (set(columns) | {sort_by} | set(filters or {})) - schema_names
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}.")
+
+        state = {"sort": sort_by, "desc": descending}
+        expression = self._filter(start, end, filters)
+        total = self.dataset.count_rows(filter=expression) if count else None
+        if cursor is not None:
+            previous = decode_cursor(cursor)
+            if previous.get("sort") != sort_by or previous.get("desc") != descending:
+                raise ValueError("Cursor was created with a different sort order.")
+            after = self._after(sort_by, descending, previous)
+            expression = after if expression is None else expression & after
+
+        read_columns = list(dict.fromkeys(columns + [sort_by, ROW_ID]))
+        if sort_by == DATE_COLUMN and not descending:
+            # Orden físico: se leen los row groups en orden (los que no pueden cumplir el filtro se
+            # descartan por sus estadísticas) hasta completar la página (+1 para saber si hay más)
+            tables, n_rows = [], 0
+            schema = self.dataset.schema
+            for fragment in self.dataset.get_fragments(filter=expression):
+                for row_group in fragment.split_by_row_group(expression, schema=schema):
+                    part = row_group.to_table(columns=read_columns, filter=expression, schema=schema)
+                    if part.num_rows:
+                        tables.append(part)
+                        n_rows += part.num_rows
+                    if n_rows > limit:
+                        break
+                if n_rows > limit:
+                    break
+            if tables:
+                table = pa.concat_tables(tables)
+            else:
+                table = pa.schema([schema.field(name) for name in read_columns]).empty_table()
+            table = table.take(pc.sort_indices(table, sort_keys=[(ROW_ID, "ascending")])).slice(0, limit + 1)
+        else:
+            table = self.dataset.to_table(columns=read_columns, filter=expression)
+            order = "descending" if descending else "ascending"
+            keys = [(sort_by, order), (ROW_ID, order)]
+            table = table.take(pc.select_k_unstable(table, k=min(limit + 1, table.num_rows), sort_keys=keys))
+            table = table.take(pc.sort_indices(table, sort_keys=keys, null_placement="at_end"))
+
+        next_cursor = None
+        if table.num_rows > limit:
+            table = table.slice(0, limit)
+            last = table.slice(limit - 1, 1).to_pylist()[0]
+            value = last[sort_by]
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            next_cursor = encode_cursor({**state, "value": value, "row": last[ROW_ID]})
+        return {"table": table.select(columns), "next_cursor": next_cursor, "total": total}
+
+
+def table_to_columnar_json(table: pa.Table) -> Dict[str, List[Any]]:
+    """
+    {columna: [valores]} con fechas en ISO 8601 y nulos como null.
+    """
+    data = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if pa.types.is_timestamp(column.type) or pa.types.is_date(column.type):
+            column = pc.strftime(pc.cast(column, pa.timestamp("s"), safe=False), format="%Y-%m-%dT%H:%M:%S")
+        elif pa.types.is_floating(column.type):
+            column = pc.if_else(pc.is_nan(column), pa.scalar(None, column.type), column)
+        data[name] = column.to_pylist()
+    return data
+
+
+def table_to_arrow_ipc(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+if __name__ == "__main__":
+    # python record_store.py <Excel limpio> <salida.parquet>
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "models", "package")))
+    from functions.data_loader import load_excel_data
+
+    source, output = sys.argv[1], sys.argv[2]
+    n_rows = build_record_store(load_excel_data(source), output)
+    print(f"Record store guardado en {output} ({n_rows} registros)")
@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("botocore")
+pytest.importorskip("joblib")
+
+from artifact_cache import ArtifactCache, LocalS3Client
+
+BUCKET = "bucket"
+KEY = "models/config/config.json"
+
+
+def write_object(root, content: bytes):
+    path = os.path.join(root, BUCKET, KEY)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def s3_root(tmp_path):
+    root = str(tmp_path / "s3")
+    write_object(root, b'{"version": 1}')
+    return root
+
+
+def test_fetch_downloads_once_and_then_hits_the_cache(s3_root, tmp_path):
+    client = LocalS3Client(s3_root)
+    cache = ArtifactCache(BUCKET, str(tmp_path / "cache"), client=client)
+
+    path, meta, downloaded = cache.fetch(KEY)
+    assert downloaded
+    assert meta["etag"]
+    with open(path, "rb") as f:
+        assert f.read() == b'{"version": 1}'
+
+    # Segunda lectura: GET condicional, S3 responde 304 y se usa la copia local
+    cached_path, cached_meta, downloaded = cache.fetch(KEY)
+    assert not downloaded
+    assert cached_path == path
+    assert cached_meta == meta
+    assert client.get_object_calls == 2
+
+
+def test_fetch_refreshes_when_the_etag_changes(s3_root, tmp_path):
+    cache = ArtifactCache(BUCKET, str(tmp_path / "cache"), client=LocalS3Client(s3_root))
+    old_path, old_meta, _ = cache.fetch(KEY)
+
+    write_object(s3_root, b'{"version": 2}')
+    new_path, new_meta, downloaded = cache.fetch(KEY)
+
+    assert downloaded
+    assert new_meta["etag"] != old_meta["etag"]
+    assert new_path != old_path
+    assert cache.get_bytes(KEY) == b'{"version": 2}'
+    # La versión anterior sigue intacta para quien ya tenga su ruta
+    with open(old_path, "rb") as f:
+        assert f.read() == b'{"version": 1}'
+    with open(os.path.join(str(tmp_path / "cache"), BUCKET, KEY + ".meta.json")) as f:
+        assert json.load(f)["file"] == os.path.basename(new_path)
+
+
+def test_fetch_missing_key_raises(s3_root, tmp_path):
+    from botocore.exceptions import ClientError
+
+    cache = ArtifactCache(BUCKET, str(tmp_path / "cache"), client=LocalS3Client(s3_root))
+    with pytest.raises(ClientError):
+        cache.fetch("models/missing.joblib")